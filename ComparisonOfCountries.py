@@ -1,23 +1,27 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-import plotly.express as px
 import plotly.graph_objects as go
-from utils import custom_navigation
+import data
+import filters
+import neighbors
+import session_cache
+from utils import custom_navigation, export_buttons
 
 
 def app():
-    # Load Data
-    df = pd.read_excel("final_data.xlsx")
-
-    # Standardize column names
-    df.columns = df.columns.str.strip().str.title()
+    # Load Data (shared read-only view with standardized column names)
+    snapshot = data.get_snapshot()
+    df = snapshot.frame("title")
 
     # Identify numeric columns for aggregation
     numeric_columns = df.select_dtypes(include=['number']).columns.tolist()
 
     # Compute mean values for each continent (without modifying country-level data)
-    df_continent = df.groupby("Continent")[numeric_columns].mean().reset_index()
+    df_continent = session_cache.memo(
+        "continent_means", (snapshot.version,),
+        lambda: df.groupby("Continent")[numeric_columns].mean().reset_index()
+    )
 
     with st.container():
         col1, col2 = st.columns([5, 1])
@@ -102,20 +106,39 @@ def app():
             st.subheader("🌍 Select Countries")
             countries = df["Country"].unique()
             entity1 = st.selectbox("Select Country 1", countries, index=0)
-            entity2 = st.selectbox("Select Country 2", countries, index=1)
+
+            # Nearest neighbours of Country 1 on the standardized indicators; Country 2 starts at the closest
+            similar_k = st.slider("🔗 Similar countries to suggest", min_value=1, max_value=10, value=5)
+            similar = neighbors.get_index(snapshot).similar(entity1, similar_k)
+            st.markdown(
+                f"**Most similar to {entity1}:**\n" +
+                "\n".join(f"{rank}. {name} (distance {distance:.2f})" for rank, (name, distance) in enumerate(similar, 1))
+            )
+            entity2 = st.selectbox("Select Country 2", countries, index=list(countries).index(similar[0][0]))
             # Filter data for selected countries
-            df1 = df[df["Country"] == entity1].melt(id_vars=["Country"], value_vars=numeric_columns, var_name="Indicator", value_name="Value")
-            df2 = df[df["Country"] == entity2].melt(id_vars=["Country"], value_vars=numeric_columns, var_name="Indicator", value_name="Value")
+            # Melted per entity and memoized per session, so swapping one country keeps the other
+            df1, df2 = [
+                session_cache.memo(
+                    "country_melt", (snapshot.version, entity),
+                    lambda: df[df["Country"] == entity].melt(id_vars=["Country"], value_vars=numeric_columns, var_name="Indicator", value_name="Value")
+                )
+                for entity in (entity1, entity2)
+            ]
         else:
             st.subheader("🌎 Select Continents")
             continents = df["Continent"].dropna().unique()
             entity1 = st.selectbox("Select Continent 1", continents, index=1)
             entity2 = st.selectbox("Select Continent 2", continents, index=2)
             # Compute average values per continent
-            df1 = df[df["Continent"] == entity1].groupby("Continent")[numeric_columns].mean().reset_index()
-            df1 = df1.melt(id_vars=["Continent"], value_vars=numeric_columns, var_name="Indicator", value_name="Value")
-            df2 = df[df["Continent"] == entity2].groupby("Continent")[numeric_columns].mean().reset_index()
-            df2 = df2.melt(id_vars=["Continent"], value_vars=numeric_columns, var_name="Indicator", value_name="Value")
+            df1, df2 = [
+                session_cache.memo(
+                    "continent_melt", (snapshot.version, entity),
+                    lambda: df.take(filters.get_index(snapshot).select({"continent": [entity]}).rows)
+                    .groupby("Continent")[numeric_columns].mean().reset_index()
+                    .melt(id_vars=["Continent"], value_vars=numeric_columns, var_name="Indicator", value_name="Value")
+                )
+                for entity in (entity1, entity2)
+            ]
 
     # Filter data based on selected indicator
     if not show_all and selected_indicator != "All Indicators" and selected_indicator != "No indicators available for this category":
@@ -272,6 +295,11 @@ def app():
                     )
                 else:
                     st.info(f"🤝 {entity1} and {entity2} have *equal* scores for {selected_indicator}.")
+
+        export_buttons(
+            lambda: df_area[["Entity", "Indicator", "Value"]],
+            f"{entity1}_vs_{entity2}".replace(" ", "_")
+        )
     else:
         st.warning("No data available for the selected filters.")
     
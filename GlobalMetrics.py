@@ -1,32 +1,75 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+import data
+import figcache
+import figures
+import filters
+import prefetch
 from utils import custom_navigation
 
-def app():
-    # --- 1. Data Loading ---
-    df = pd.read_excel("final_data.xlsx")
-    df.columns = df.columns.str.strip().str.title()  # Standardize column names
-
-    # Define relevant indicators
-    indicators = [
-        "Purchasing Power Value", "Safety Value", "Health Care Value", "Climate Value",
-        "Cost Of Living Value", "Property Price To Income Value", "Pollution Value",
-        "Traffic Commute Time Value", "Quality Of Life Value"
+
+def raw_column(snapshot, indicator):
+    """Snapshot column name for one of this page's title-cased indicators."""
+    return snapshot.numeric_columns[[c.title() for c in snapshot.numeric_columns].index(indicator)]
+
+
+def global_view_key(snapshot, indicator, continents, robust=False):
+    return ("global_view", snapshot.version, robust, indicator, tuple(sorted(continents)))
+
+
+def continent_view_key(snapshot, indicator, continent, robust=False):
+    return ("continent_view", snapshot.version, robust, indicator, continent)
+
+
+def global_view(snapshot, indicator, continents, robust=False):
+    """Rows of ``continents`` with ``indicator`` present, and their continent averages."""
+    def build():
+        df = snapshot.frame("title", robust=robust)
+        rows = filters.get_index(snapshot).select({"continent": continents}, present=raw_column(snapshot, indicator)).rows
+        filtered = df.take(rows)
+        return filtered, filtered.groupby("Continent")[indicator].mean().reset_index()
+
+    return figcache.get_or_build(global_view_key(snapshot, indicator, continents, robust), build)
+
+
+def continent_view(snapshot, indicator, continent, robust=False):
+    """Rows of one continent with ``indicator`` present, and the per-country values."""
+    def build():
+        df = snapshot.frame("title", robust=robust)
+        rows = filters.get_index(snapshot).select({"continent": [continent]}, present=raw_column(snapshot, indicator)).rows
+        filtered = df.take(rows)
+        return filtered, filtered.groupby(["Continent", "Country"])[indicator].mean().reset_index()
+
+    return figcache.get_or_build(continent_view_key(snapshot, indicator, continent, robust), build)
+
+
+def global_charts(snapshot, indicator, continents, robust, color_scales):
+    """(key, build) pairs for the Global View bar and sunburst, in page order."""
+    color_scale = color_scales[data.INDICATOR_POLARITY[raw_column(snapshot, indicator)]]
+    key = (snapshot.version, robust, indicator, tuple(sorted(continents)))
+    return [
+        (("continent_bar",) + key,
+         lambda: figures.continent_bar(global_view(snapshot, indicator, continents, robust)[1], indicator, color_scale)),
+        (("continent_sunburst",) + key,
+         lambda: figures.continent_sunburst(global_view(snapshot, indicator, continents, robust)[1], indicator, color_scale)),
     ]
 
-    # Map indicators to their interpretation
-    indicator_polarity = {
-        "Quality Of Life Value": "higher_is_better",
-        "Purchasing Power Value": "higher_is_better",
-        "Cost Of Living Value": "lower_is_better",
-        "Property Price To Income Value": "lower_is_better",
-        "Safety Value": "higher_is_better",
-        "Health Care Value": "higher_is_better",
-        "Pollution Value": "lower_is_better",
-        "Traffic Commute Time Value": "lower_is_better",
-        "Climate Value": "higher_is_better"
-    }
+
+def continent_charts(snapshot, indicator, continent, robust, color_scales):
+    """(key, build) pairs for the Single Continent View scatter and sunburst, in page order."""
+    color_scale = color_scales[data.INDICATOR_POLARITY[raw_column(snapshot, indicator)]]
+    key = (snapshot.version, robust, indicator, continent)
+    return [
+        (("country_scatter",) + key,
+         lambda: figures.country_scatter(continent_view(snapshot, indicator, continent, robust)[0], indicator, continent, color_scale)),
+        (("country_sunburst",) + key,
+         lambda: figures.country_sunburst(continent_view(snapshot, indicator, continent, robust)[1], indicator, continent, color_scale)),
+    ]
+
+
+def app():
+    # --- 1. Data Loading ---
+    snapshot = data.get_snapshot()
+    df = snapshot.frame("title")  # Shared read-only view with standardized column names
 
     color_scales = {
         "higher_is_better": "RdYlGn",
@@ -96,18 +139,26 @@ def app():
         # Then select specific indicator from that group
         group_indicators = indicator_groups[selected_group]
         selected_indicator = st.selectbox("📊 Choose a Quality of Life Indicator", group_indicators)
+
+        robust_mode = st.checkbox(
+            "🛡️ Robust mode (clip outliers)", False,
+            help="Values more than 3.5 robust z-scores from the median are clipped to that fence (computed at load)"
+        )
+        if robust_mode:
+            df = snapshot.frame("title", robust=True)
+
+        raw_indicator = raw_column(snapshot, selected_indicator)
         
         # Allow user to either select multiple continents or focus on a single one
         continent_mode = st.radio("Display Mode", ["Global View", "Single Continent View"])
         
         if continent_mode == "Global View":
             selected_continents = st.multiselect("Select Continents", df["Continent"].unique(), default=df["Continent"].unique())
-            filtered_df = df[df["Continent"].isin(selected_continents)].dropna(subset=[selected_indicator])
-            df_continent = filtered_df.groupby("Continent")[selected_indicator].mean().reset_index()
+            # Shared across sessions, so switching display modes (or another user's earlier visit) is free
+            filtered_df, df_continent = global_view(snapshot, selected_indicator, selected_continents, robust_mode)
         else:
             selected_continent = st.selectbox("Select a Continent", df["Continent"].unique())
-            filtered_df = df[df["Continent"] == selected_continent].dropna(subset=[selected_indicator])
-            df_country = filtered_df.groupby(["Continent", "Country"])[selected_indicator].mean().reset_index()
+            filtered_df, df_country = continent_view(snapshot, selected_indicator, selected_continent, robust_mode)
 
     if filtered_df.empty:
         st.warning("No data available for the selected filters. Please adjust your selections.")
@@ -135,16 +186,20 @@ def app():
     col3.metric(f"Std Dev {stat_label}", f"{grouped_data[selected_indicator].std():.2f}")
     col4.metric(f"Min {stat_label}", f"{grouped_data[selected_indicator].min():.2f}")
     col5.metric(f"Max {stat_label}", f"{grouped_data[selected_indicator].max():.2f}")
+    if robust_mode:
+        fences = snapshot.robust[raw_indicator]
+        clipped = int(snapshot.outliers[filtered_df.index, snapshot.numeric_columns.index(raw_indicator)].sum())
+        st.caption(
+            f"Robust mode: {clipped} outlier(s) clipped to "
+            f"[{fences['lower']:.2f}, {fences['upper']:.2f}] (median {fences['median']:.2f})."
+        )
     # Add some space
     st.markdown("<br><br>", unsafe_allow_html=True)
     # --- 5. Bar Graph (Only in Global View) ---
     if continent_mode == "Global View":
+        bar_chart, sunburst_chart = global_charts(snapshot, selected_indicator, selected_continents, robust_mode, color_scales)
         st.subheader(f"{selected_indicator} by Continent")
-        fig = px.bar(
-            df_continent, x="Continent", y=selected_indicator, color=selected_indicator,
-            color_continuous_scale=color_scales[indicator_polarity[selected_indicator]],
-            title=f"Average {selected_indicator} Across Continents"
-        )
+        fig = figcache.get_or_build(*bar_chart)
         st.plotly_chart(fig, use_container_width=True)
 
     # --- 6. Sunburst Chart ---
@@ -153,52 +208,18 @@ def app():
     if continent_mode == "Global View":
         # Sunburst chart only for continents
         st.subheader(f"Sunburst Chart: {selected_indicator} Distribution")
-        sunburst_fig = px.sunburst(
-            df_continent,
-            path=["Continent"],  # Show only continents
-            values=selected_indicator,
-            color=selected_indicator,
-            color_continuous_scale=color_scales[indicator_polarity[selected_indicator]],
-            title=f"{selected_indicator} Distribution by Continent"
-            
-        )
+        sunburst_fig = figcache.get_or_build(*sunburst_chart)
         st.plotly_chart(sunburst_fig, use_container_width=True)
     else:
         # Scatter Plot for a Single Continent
+        scatter_chart, sunburst_chart = continent_charts(snapshot, selected_indicator, selected_continent, robust_mode, color_scales)
         st.subheader(f"Scatter Chart: {selected_indicator} Distribution")
-        scatter_fig = px.scatter(
-            filtered_df,
-            x="Country",
-            y=selected_indicator,
-            color=selected_indicator,
-            size=selected_indicator,
-            hover_name="Country",
-            title=f"{selected_indicator} Across {selected_continent}",
-            color_continuous_scale=color_scales[indicator_polarity[selected_indicator]]
-        )
-
-        # Update layout to increase width and adjust height if necessary
-        scatter_fig.update_layout(
-            width=1200,  # Increase width of the chart
-            height=600,  # Optional: increase height if you want
-            title=f"{selected_indicator} Across {selected_continent}",
-            xaxis_title="Country",
-            yaxis_title=selected_indicator,
-            margin=dict(l=20, r=20, t=40, b=40)
-        )
+        scatter_fig = figcache.get_or_build(*scatter_chart)
         st.plotly_chart(scatter_fig, use_container_width=True)
 
         # Sunburst chart for selected continent (continent → country)
         st.subheader(f"Sunburst Chart: {selected_indicator} Distribution")
-        sunburst_fig = px.sunburst(
-            df_country,
-            path=["Continent", "Country"],  # Continent → Country hierarchy
-            values=selected_indicator,
-            color=selected_indicator,
-            color_continuous_scale=color_scales[indicator_polarity[selected_indicator]],
-            title=f"{selected_indicator} Distribution in {selected_continent}"
-        )
-
+        sunburst_fig = figcache.get_or_build(*sunburst_chart)
         st.plotly_chart(sunburst_fig, use_container_width=True)
 
    
@@ -211,4 +232,17 @@ def app():
             <p>Data source: Numbeo Quality of Life Indices | Dashboard created with Streamlit</p>
             <p style="text-align: center; color: #888;">Team Visionaries</p>
         </div>
-    """, unsafe_allow_html=True)
\ No newline at end of file
+    """, unsafe_allow_html=True)
+
+    # --- Prefetch ---
+    # Likely next clicks: another indicator of the group, or (single continent) another continent
+    neighbours = [i for i in group_indicators if i != selected_indicator]
+    if continent_mode == "Global View":
+        tasks = [t for i in neighbours for t in global_charts(snapshot, i, selected_continents, robust_mode, color_scales)]
+    else:
+        tasks = [t for i in neighbours for t in continent_charts(snapshot, i, selected_continent, robust_mode, color_scales)]
+        tasks += [
+            t for c in df["Continent"].unique() if c != selected_continent
+            for t in continent_charts(snapshot, selected_indicator, c, robust_mode, color_scales)
+        ]
+    prefetch.schedule(tasks)
\ No newline at end of file
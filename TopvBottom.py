@@ -1,7 +1,15 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from utils import custom_navigation
+import composite
+import data
+import figures
+import filters
+import pareto
+import session_cache
+import simulator
+import stability
+from utils import custom_navigation, export_buttons, scenario_controls
 
 
 def app():
@@ -9,10 +17,10 @@ def app():
     # --- Page Configuration ---
 
     # --- Load Data ---
-    df = pd.read_excel("final_data.xlsx")
-
-    # --- Clean Column Names ---
-    df.columns = df.columns.str.strip().str.lower()  # Normalize column names
+    # Shared read-only view with normalized (lowercase) column names
+    snapshot = data.get_snapshot()
+    df = snapshot.frame("lower")
+    df_key = (snapshot.version,)  # Lineage of df, keys the memoized views derived from it
 
     # Create a proper sidebar with sections for better organization
     with st.sidebar:
@@ -45,11 +53,21 @@ def app():
     # Convert selected_indicator to lowercase for consistency
     selected_indicator = selected_indicator.lower()
 
-    view_type = st.sidebar.radio("📈 Choose Analysis Type", ["Top/Bottom Countries", "Top vs Bottom Comparison"])
+    view_type = st.sidebar.radio(
+        "📈 Choose Analysis Type",
+        ["Top/Bottom Countries", "Top vs Bottom Comparison", "Composite Index", "Pareto Ranking", "Rank Stability"]
+    )
+
+    num_countries = st.sidebar.slider("📌 Select Number of Countries", min_value=3, max_value=10, value=5)
+    rank_type = st.sidebar.radio("📊 Select Ranking Type", ["Top Countries", "Bottom Countries"])
 
-    if view_type == "Top/Bottom Countries" or view_type == "Top vs Bottom Comparison":
-        num_countries = st.sidebar.slider("📌 Select Number of Countries", min_value=3, max_value=10, value=5)
-        rank_type = st.sidebar.radio("📊 Select Ranking Type", ["Top Countries", "Bottom Countries"])
+    # --- What-if Scenario ---
+    base_df = df
+    scenario = scenario_controls(sorted(df["continent"].unique()))
+    if scenario:
+        scenario_values = simulator.simulate(snapshot, scenario, st.session_state.setdefault("_scenario_state", {}))
+        df = simulator.apply(df, scenario_values, data.COLUMN_STYLES["lower"])
+        df_key += ("scenario", scenario)
 
     # --- Continent Filter Option ---
     filter_continent = st.sidebar.checkbox("🌍 Geographic Filters")
@@ -57,7 +75,48 @@ def app():
     if filter_continent:
         continents = df["continent"].unique()
         selected_continent = st.sidebar.selectbox("🌍 Select a Continent", continents)
-        df = df[df["continent"] == selected_continent]
+        df_key += ("continent", selected_continent)
+        df = session_cache.memo(
+            "filter", df_key,
+            lambda: df.take(filters.get_index(snapshot).select({"continent": [selected_continent]}).rows)
+        )
+
+    # --- Composite Index Weights ---
+    if view_type == "Composite Index":
+        st.sidebar.subheader("⚖️ Indicator Weights")
+        model = composite.get_model(snapshot)
+        if scenario:
+            model = session_cache.memo(
+                "composite_model", (snapshot.version, scenario),
+                lambda: composite.scenario_model(snapshot, scenario, scenario_values)
+            )
+        weights = [
+            st.sidebar.slider(
+                col.replace(" Value", ""), min_value=0, max_value=10, value=5,
+                help="Lower is better: low values raise the score." if data.INDICATOR_POLARITY[col] == "lower_is_better"
+                else "Higher is better: high values raise the score."
+            )
+            for col in model.columns
+        ]
+
+    # --- Pareto Objectives ---
+    if view_type == "Pareto Ranking":
+        st.sidebar.subheader("🎯 Indicators to Balance")
+        pareto_indicators = st.sidebar.multiselect(
+            "Rank on all of",
+            [ind for group in indicator_groups.values() for ind in group],
+            default=["Purchasing Power Value", "Safety Value", "Health Care Value", "Pollution Value"],
+            help="A country is on front 1 when no other country is at least as good on every selected indicator "
+                 "and better on one. Lower-is-better indicators are inverted."
+        )
+
+    # --- Stability Noise ---
+    if view_type == "Rank Stability":
+        st.sidebar.subheader("🎲 Measurement Noise")
+        noise_pct = st.sidebar.slider(
+            "Noise level (%)", min_value=1, max_value=20, value=int(stability.NOISE * 100),
+            help="Standard deviation of the random relative error applied to every value in each draw."
+        )
 
     # --- Sidebar Filters for Min/Max Values (Styled like screenshot) ---
     if view_type == "Top/Bottom Countries":
@@ -80,7 +139,11 @@ def app():
                 f"</div>", unsafe_allow_html=True
             )
 
-            df = df[(df[selected_indicator] >= selected_min) & (df[selected_indicator] <= selected_max)]
+            df_key += ("range", selected_indicator, selected_min, selected_max)
+            df = session_cache.memo(
+                "filter", df_key,
+                lambda: df[(df[selected_indicator] >= selected_min) & (df[selected_indicator] <= selected_max)]
+            )
 
             # Color scheme info (optional)
             st.sidebar.markdown("---")
@@ -93,10 +156,16 @@ def app():
     # --- Top/Bottom Countries View ---
     if view_type == "Top/Bottom Countries":
         if rank_type == "Top Countries":
-            sorted_df = df.nlargest(num_countries, selected_indicator)
+            sorted_df = session_cache.memo(
+                "nlargest", df_key + (selected_indicator, num_countries),
+                lambda: df.nlargest(num_countries, selected_indicator)
+            )
             color_scale = "RdYlGn"  # Green for high values, Red for low values
         else:
-            sorted_df = df.nsmallest(num_countries, selected_indicator)
+            sorted_df = session_cache.memo(
+                "nsmallest", df_key + (selected_indicator, num_countries),
+                lambda: df.nsmallest(num_countries, selected_indicator)
+            )
             color_scale = "RdYlGn"  # Green for high values, Red for low values
             
         # --- Update Title with Continent (if selected) ---
@@ -144,7 +213,7 @@ def app():
 
         # --- Scatter Plot ---
         fig_scatter = px.scatter(
-            sorted_df, 
+            figures.project(sorted_df, ["country", selected_indicator]), 
             x="country", 
             y=selected_indicator, 
             size=selected_indicator, 
@@ -158,15 +227,35 @@ def app():
             yaxis_title=selected_indicator.replace('_', ' ').title(),
             margin=dict(l=20, r=20, t=40, b=20)
         )
-        st.plotly_chart(fig_scatter, use_container_width=True)
-
+        st.plotly_chart(figures.compact(fig_scatter), use_container_width=True)
+
+        if scenario:
+            # Ranks within the current filters, before and after the scenario
+            ascending = rank_type == "Bottom Countries"
+            baseline = base_df.loc[df.index, selected_indicator]
+            ranks = pd.DataFrame({
+                "Country": sorted_df["country"],
+                "Baseline": baseline[sorted_df.index].round(2),
+                "Scenario": sorted_df[selected_indicator].round(2),
+                "Baseline Rank": baseline.rank(ascending=ascending, method="min")[sorted_df.index].astype(int),
+                "Scenario Rank": df[selected_indicator].rank(ascending=ascending, method="min")[sorted_df.index].astype(int),
+            })
+            st.markdown("🧪 **What-if scenario:** " + "; ".join(simulator.describe(adjustment) for adjustment in scenario))
+            st.dataframe(ranks, hide_index=True, use_container_width=True)
+
+        export_buttons(
+            lambda: ranks if scenario else sorted_df[["country", "continent", selected_indicator]],
+            f"{rank_type.split()[0].lower()}_{selected_indicator.replace(' ', '_')}"
+        )
 
 
     # --- Top vs Bottom Comparison ---
     elif view_type == "Top vs Bottom Comparison":
-        top_countries = df.nlargest(num_countries, selected_indicator)
-        bottom_countries = df.nsmallest(num_countries, selected_indicator)
-        comparison_df = pd.concat([top_countries, bottom_countries])
+        comparison_df = session_cache.memo(
+            "top_vs_bottom", df_key + (selected_indicator, num_countries),
+            lambda: pd.concat([df.nlargest(num_countries, selected_indicator),
+                               df.nsmallest(num_countries, selected_indicator)])
+        )
 
         st.subheader(f"📌 Top vs Bottom Countries for {selected_indicator.replace('_', ' ').title()}")
         st.markdown(
@@ -177,7 +266,7 @@ def app():
 
         # --- Bar Chart Comparison ---
         fig_compare = px.bar(
-            comparison_df,
+            figures.project(comparison_df, ["country", selected_indicator]),
             x="country",
             y=selected_indicator,
             text=selected_indicator,
@@ -192,10 +281,154 @@ def app():
             margin=dict(l=20, r=20, t=40, b=20)
         )
         
-        st.plotly_chart(fig_compare, use_container_width=True)
+        st.plotly_chart(figures.compact(fig_compare), use_container_width=True)
+        export_buttons(
+            lambda: comparison_df[["country", "continent", selected_indicator]],
+            f"top_vs_bottom_{selected_indicator.replace(' ', '_')}"
+        )
         
         # --- Enhanced Insights Section ---
         st.subheader("🔍 Key Insights from the Comparison")
+
+    # --- Composite Index ---
+    elif view_type == "Composite Index":
+        # Scores for every entity; only changed weights are re-applied to last rerun's sums
+        scores = composite.scores(model, weights, st.session_state.setdefault("_composite_state", {}))
+        rows = composite.top_k(scores, df.index.to_numpy(), num_countries, largest=rank_type == "Top Countries")
+        title_continent = f" in {selected_continent}" if selected_continent else ""
+
+        st.subheader(f"📌 {rank_type} - Composite Index{title_continent}")
+        st.markdown(
+            "The composite index weights each indicator by the sliders in the sidebar. Indicators where lower is better are "
+            "inverted, so every bar segment shows how much that indicator adds to the score (0-100)."
+        )
+        if scenario:
+            st.caption("🧪 Scored on the what-if scenario's values.")
+
+        if sum(weights) == 0:
+            st.warning("Set at least one weight above zero to build the composite index.")
+        else:
+            contrib = composite.contributions(model, weights, rows)
+            countries = df.loc[rows, "country"].tolist()
+            contrib_df = pd.DataFrame({
+                "country": [country for country in countries for _ in model.columns],
+                "Indicator": [col.replace(" Value", "") for _ in countries for col in model.columns],
+                "Contribution": contrib.ravel(),
+            })
+
+            fig_composite = px.bar(
+                contrib_df,
+                x="country",
+                y="Contribution",
+                color="Indicator",
+                title=f"📊 {rank_type} by Composite Index{title_continent}",
+            )
+            fig_composite.update_layout(
+                xaxis_title="Country",
+                yaxis_title="Composite Score",
+                xaxis=dict(categoryorder="array", categoryarray=countries),
+                margin=dict(l=20, r=20, t=40, b=20)
+            )
+            st.plotly_chart(fig_composite, use_container_width=True)
+            # The export ranks every country in the current filters, not just the charted ones
+            export_buttons(
+                lambda: df[["country", "continent"]].assign(**{"composite score": scores[df.index.to_numpy()]})
+                .sort_values("composite score", ascending=rank_type != "Top Countries"),
+                "composite_index"
+            )
+
+    # --- Pareto Ranking ---
+    elif view_type == "Pareto Ranking":
+        title_continent = f" in {selected_continent}" if selected_continent else ""
+        st.subheader(f"📌 {rank_type} - Pareto Ranking{title_continent}")
+        st.markdown(
+            "Countries are layered into Pareto fronts: front 1 holds the countries no other country beats on every "
+            "selected indicator at once, front 2 those only beaten by front 1, and so on."
+        )
+
+        if len(pareto_indicators) < 2:
+            st.warning("Select at least two indicators to rank on.")
+        else:
+            pareto_columns = [col.lower() for col in pareto_indicators]
+
+            def rank_fronts():
+                # df's values, so a what-if scenario moves the fronts and the table alike
+                values = df[pareto_columns].to_numpy(dtype="float64")
+                depth = pareto.fronts(pareto.orient(values, pareto_indicators))
+                ranked = df[["country", "continent"] + pareto_columns].assign(Front=depth + 1)
+                return ranked.sort_values(["Front", "country"])
+
+            ranked = session_cache.memo("pareto", df_key + tuple(pareto_indicators), rank_fronts)
+            shown = ranked.head(num_countries) if rank_type == "Top Countries" else \
+                ranked.sort_values(["Front", "country"], ascending=[False, True]).head(num_countries)
+
+            st.dataframe(
+                shown.rename(columns=lambda col: col.title() if col != "Front" else col),
+                hide_index=True, use_container_width=True
+            )
+
+            fig_pareto = figures.pareto_scatter(
+                ranked, pareto_columns, pareto_indicators,
+                f"📊 Pareto Fronts ({ranked['Front'].max()} layers){title_continent}"
+            )
+            st.plotly_chart(fig_pareto, use_container_width=True)
+            export_buttons(lambda: ranked, "pareto_fronts")
+
+    # --- Rank Stability ---
+    elif view_type == "Rank Stability":
+        title_continent = f" in {selected_continent}" if selected_continent else ""
+        st.subheader(f"📌 How stable is the {rank_type.lower()} list? - {selected_indicator.title()}{title_continent}")
+        st.markdown(
+            f"Every value is perturbed by random noise of about **{noise_pct}%** in {stability.SAMPLES:,} draws and the "
+            f"countries are ranked again each time. The chart shows how often each country stays in the "
+            f"**{rank_type.lower().replace(' countries', '')} {num_countries}**."
+        )
+
+        raw_indicator = next(col for col in snapshot.numeric_columns if col.lower() == selected_indicator)
+        column = scenario_values.get(raw_indicator) if scenario else None
+        if column is not None:
+            st.caption("🧪 Ranked on the what-if scenario's values.")
+        with st.spinner("Simulating rankings..."):
+            result = stability.get_stability(
+                raw_indicator, selected_continent, num_countries,
+                largest=rank_type == "Top Countries", noise=noise_pct / 100, snapshot=snapshot,
+                scenario=scenario, column=column
+            )
+
+        countries = snapshot.labels["country"]
+        stability_rows = []
+        for w, position in enumerate(result.watch):
+            probability = result.top_probability[position]
+            if probability < 0.005 and result.baseline_rank[position] > num_countries:
+                continue
+            low, high = result.rank_interval(w)
+            stability_rows.append({
+                "Country": countries[result.rows[position]],
+                "Baseline Rank": int(result.baseline_rank[position]),
+                f"P(in {num_countries})": round(probability * 100, 1),
+                "Mean Rank": round(float(result.mean_rank[position]), 1),
+                "90% Rank Range": f"{low}-{high}",
+            })
+        stability_df = pd.DataFrame(stability_rows)
+
+        fig_stability = px.bar(
+            stability_df,
+            x="Country",
+            y=f"P(in {num_countries})",
+            color=stability_df["Baseline Rank"] <= num_countries,
+            color_discrete_map={True: "#2ca02c", False: "#7f7f7f"},
+            labels={"color": f"In baseline {num_countries}"},
+            title=f"📊 Probability of staying in the {rank_type.lower().replace(' countries', '')} {num_countries}{title_continent}",
+        )
+        fig_stability.update_layout(
+            xaxis_title="Country",
+            yaxis_title="Probability (%)",
+            margin=dict(l=20, r=20, t=40, b=20)
+        )
+        st.plotly_chart(fig_stability, use_container_width=True)
+        st.dataframe(stability_df, hide_index=True, use_container_width=True)
+        export_buttons(lambda: stability_df, f"rank_stability_{selected_indicator.replace(' ', '_')}")
+
     insights = {
         "purchasing power value": "### 🟢 High-Ranking Countries\n"
             "- **Higher salaries relative to the cost of living**, allow citizens to afford more goods and services.\n"
@@ -288,7 +521,8 @@ def app():
             "- It reflects how **balanced national development directly shapes lives**."
     }
     insight_text = insights.get(selected_indicator, "This analysis highlights key economic, social, and policy-driven differences between top and bottom-ranking countries.")
-    st.markdown(insight_text)
+    if view_type not in ("Composite Index", "Pareto Ranking", "Rank Stability"):
+        st.markdown(insight_text)
 
      # --- Footer ---
     st.divider()
@@ -4,13 +4,85 @@ import plotly.express as px
 import numpy as np
 import plotly.graph_objects as go
 
-from utils import custom_navigation
+import clustering
+import data
+import figcache
+import figures
+import filters
+import prefetch
+import search
+import session_cache
+import simulator
+import sketches
+from utils import custom_navigation, export_buttons, scenario_controls
+
+
+def build_indicator_map(filtered_df, indicator, color_scale, log_color, summary=None):
+    """Choropleth of a numeric indicator; colours span its 5th-95th percentile."""
+    if summary:
+        range_color = list(summary.quantile([0.05, 0.95], np.log if log_color else None))
+    else:
+        scale = np.log(filtered_df[indicator]) if log_color else filtered_df[indicator]
+        range_color = [scale.quantile(0.05), scale.quantile(0.95)]
+    return figures.indicator_map(filtered_df, indicator, color_scale, log_color, range_color)
+
+
+def indicator_map_key(snapshot, robust, scenario, indicator, continents, value_range, log_color):
+    return (
+        "indicator_map", snapshot.version, robust, tuple(scenario), indicator,
+        tuple(sorted(continents)), value_range, log_color
+    )
+
+
+def sorted_positions(key, positions, stop):
+    """The first ``stop`` of ``positions`` ordered by ``key`` (NaN last, ties in position order).
+
+    Same result as a stable argsort cut at ``stop``, but a page near the top
+    of a long table only needs a linear partition and a sort of that page.
+    """
+    if stop >= len(positions):
+        return positions[np.argsort(key, kind="stable")]
+    kth = np.partition(key, stop - 1)[stop - 1]
+    if np.isnan(kth):  # the page reaches into the NaNs
+        return positions[np.argsort(key, kind="stable")[:stop]]
+    better = np.flatnonzero(key < kth)
+    ties = np.flatnonzero(key == kth)[:stop - len(better)]
+    chosen = np.sort(np.concatenate([better, ties]))
+    return positions[chosen[np.argsort(key[chosen], kind="stable")]]
+
+
+def indicator_map_task(snapshot, indicator, continents, robust, log_preference, color_scales):
+    """(key, build) for the map of ``indicator`` over ``continents`` with the value filter untouched."""
+    matrix = snapshot.winsorized if robust else snapshot.matrix
+    column = matrix[:, snapshot.numeric_columns.index(indicator)]
+    summary = sketches.summarize(indicator, continents, snapshot, robust)
+    # Same rule as the sidebar: the log checkbox only appears for wide positive ranges
+    lo, hi = np.nanmin(column), np.nanmax(column)
+    log_color = bool(log_preference and lo > 0 and hi / lo > 10 and summary.min > 0)
+    color_scale = color_scales[data.INDICATOR_POLARITY.get(indicator, 'higher_is_better')]
+
+    def build():
+        rows = filters.get_index(snapshot).select({'continent': continents}, present=indicator).rows
+        return build_indicator_map(snapshot.frame(robust=robust).take(rows), indicator, color_scale, log_color, summary)
+
+    return indicator_map_key(snapshot, robust, (), indicator, continents, "full", log_color), build
+
+
+def prefetch_indicator_maps(snapshot, indicators, continents, robust, log_preference, color_scales):
+    """Queue the maps ``indicators`` would show next with the current continents and unfiltered values."""
+    return prefetch.schedule(
+        indicator_map_task(snapshot, indicator, continents, robust, log_preference, color_scales)
+        for indicator in indicators if indicator in snapshot.numeric_columns
+    )
+
 
 def app():
 
 
         # --- Data Loading and Preprocessing ---
-    df = pd.read_excel('final_data.xlsx')
+    # Shared read-only view; numerical indicators are already coerced to numeric at ingest
+    snapshot = data.get_snapshot()
+    df = snapshot.frame()
 
     # Define indicators (all columns except 'country' and 'continent')
     indicators = [col for col in df.columns if col not in ['country', 'continent']]
@@ -19,10 +91,6 @@ def app():
     numerical_indicators = [col for col in indicators if not col.endswith('Category')]
     categorical_indicators = [col for col in indicators if col.endswith('Category')]
 
-    # Coerce only numerical indicators to numeric
-    for col in numerical_indicators:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-
     # --- Configuration ---
 
     # Define consistent color maps for standard categories
@@ -43,17 +111,9 @@ def app():
         }
     }
 
-    # Define indicator polarity (whether higher is better or worse)
+    # Define indicator polarity (whether higher is better or worse), keyed by base indicator name
     indicator_polarity = {
-        'Pollution': 'lower_is_better',
-        'Climate': 'higher_is_better',
-        'Purchasing Power': 'higher_is_better',
-        'Cost of Living': 'lower_is_better',
-        'Property Price to Income': 'lower_is_better',
-        'Safety': 'higher_is_better',
-        'Health Care': 'higher_is_better',
-        'Quality of Life': 'higher_is_better',
-        'Traffic Commute Time': 'lower_is_better'
+        col.replace(' Value', ''): polarity for col, polarity in data.INDICATOR_POLARITY.items()
     }
 
     # Define red-to-green color scales based on polarity
@@ -251,9 +311,24 @@ def app():
             st.warning("Please select at least one continent.")
         #   selected_continents = [continents[0]]  # Default to first continent if none selected
         
+        # What-if scenario (adjusts indicators and the recomputed Quality of Life)
+        scenario = scenario_controls(continents)
+
         st.divider()
         st.subheader("📊 Indicator Filters")
 
+        robust_mode = st.checkbox(
+            "Robust mode (clip outliers)", False,
+            help="Values more than 3.5 robust z-scores from the median are clipped to that fence (computed at load)"
+        )
+        if robust_mode:
+            df = snapshot.frame(robust=True)
+        if scenario:
+            scenario_values = simulator.simulate(
+                snapshot, scenario, st.session_state.setdefault("_scenario_state", {}), robust_mode
+            )
+            df = simulator.apply(df, scenario_values)
+
         if is_categorical:
             unique_categories = sorted(df[selected_indicator].dropna().unique())
             
@@ -285,9 +360,11 @@ def app():
             
             # Add a switch for log scaling with better explanation
             use_log_scale = False
+            log_preference = True  # what the checkbox will say for the next wide-range indicator
             if min_val > 0 and max_val / min_val > 10:
                 use_log_scale = st.checkbox("Use logarithmic scale", value=True, 
                                         help="Recommended for data with wide ranges")
+                log_preference = use_log_scale
             
             # Filter range based on scaling choice
             if use_log_scale and min_val > 0:
@@ -300,7 +377,11 @@ def app():
                     (float(log_min), float(log_max)), 
                     step=(log_max - log_min) / 100
                 )
-                filter_range = (np.exp(log_filter_range[0]), np.exp(log_filter_range[1]))
+                # exp(log(x)) can round below x, so untouched handles map back to the exact extremes
+                filter_range = (
+                    min_val if log_filter_range[0] <= log_min else np.exp(log_filter_range[0]),
+                    max_val if log_filter_range[1] >= log_max else np.exp(log_filter_range[1])
+                )
                 st.write(f"Selected Range: {filter_range[0]:.2f} to {filter_range[1]:.2f}")
             else:
                 filter_range = st.slider(
@@ -316,6 +397,15 @@ def app():
             else:
                 color_info = "Green (better) to Red (worse)"
 
+        st.divider()
+        st.subheader("🧩 Country Profiles")
+        show_clusters = st.checkbox(
+            "Color map by profile cluster", False,
+            help="Groups countries with similar indicator profiles (k-means on standardized values)"
+        )
+        if show_clusters:
+            cluster_k = st.slider("Number of profiles", 2, 8, 4)
+
         # Show indicator information in a dedicated section
         st.divider()
         st.subheader("ℹ️ Indicator Information")
@@ -323,25 +413,36 @@ def app():
         
 
     # --- Data Filtering ---
+    # Continent and category selections are ORs/ANDs of precomputed bitsets
+    filter_index = filters.get_index(snapshot)
     if is_categorical:
         # Base filtering by continent and category
-        filtered_df = df[
-            (df['continent'].isin(selected_continents)) &
-            (df[selected_indicator].isin(selected_categories))
-        ].dropna(subset=[selected_indicator])
+        selection = filter_index.select({'continent': selected_continents, selected_indicator: selected_categories})
+        filtered_df = df.take(selection.rows)
     else:
-        # Base filtering by continent and value range
-        filtered_df = df[
-            (df['continent'].isin(selected_continents)) &
-            (df[selected_indicator] >= filter_range[0]) &
-            (df[selected_indicator] <= filter_range[1])
-        ].dropna(subset=[selected_indicator])
+        # Base filtering by continent and value range, memoized per session
+        def filter_rows():
+            selected = df.take(filter_index.select({'continent': selected_continents}, present=selected_indicator).rows)
+            values = selected[selected_indicator]
+            return selected[(values >= filter_range[0]) & (values <= filter_range[1])]
+
+        filtered_df = session_cache.memo(
+            "filter", (snapshot.version, robust_mode, scenario, selected_indicator, selected_continents, filter_range),
+            filter_rows
+        )
 
     # Show warning if no data after filtering
     if filtered_df.empty:
         st.warning("No data matches your selected filters. Please adjust your criteria.")
         st.stop()
 
+    # When the value filter keeps every row, stats come from merged per-continent sketches
+    summary = None
+    if not is_categorical and not scenario:
+        summary = sketches.summarize(selected_indicator, selected_continents, snapshot, robust_mode)
+        if summary.n != len(filtered_df):
+            summary = None
+
 
     # --- Choropleth Map Creation ---
     color_scale = color_scales[polarity]
@@ -368,7 +469,8 @@ def app():
                 }
                 
                 # Apply mapping and ensure sorting order is correct
-                filtered_df['numerical_value'] = filtered_df[selected_indicator].map(numerical_mapping)
+                plot_df = figures.project(filtered_df, ['country', selected_indicator])
+                plot_df['numerical_value'] = plot_df[selected_indicator].map(numerical_mapping)
                 
                 # Get actual categories present in the filtered data
                 present_categories = sorted(
@@ -378,7 +480,7 @@ def app():
                 
                 # Create the map with continuous color scale
                 fig = px.choropleth(
-                    filtered_df,
+                    plot_df,
                     locations='country',
                     locationmode='country names',
                     color='numerical_value',
@@ -429,7 +531,7 @@ def app():
                 
                 # Create the map with discrete color scheme
                 fig = px.choropleth(
-                    filtered_df,
+                    figures.project(filtered_df, ['country', selected_indicator]),
                     locations='country',
                     locationmode='country names',
                     color=selected_indicator,
@@ -439,81 +541,53 @@ def app():
                     title=f'World Map of {selected_indicator}',
                     scope="world"
                 )
-        else:
+            fig = figures.compact(figures.style_map(fig))
+        elif not show_clusters:
             # Determine if we should use log scale for visualization
-            if use_log_scale and filtered_df[selected_indicator].min() > 0:
-                filtered_df['Scale'] = np.log(filtered_df[selected_indicator])
-                hover_data = {
-                    selected_indicator: ':.2f',
-                    'Scale': False  # Hide the log value in the hover
-                }
-                color_column = 'Scale'
-                colorbar_title = f'Log of {selected_indicator}'
-            else:
-                filtered_df['Scale'] = filtered_df[selected_indicator]
-                hover_data = {selected_indicator: ':.2f'}
-                color_column = 'Scale'
-                colorbar_title = selected_indicator
-            
-            # Add continent to hover data
-            hover_data['continent'] = True
-        
+            log_color = use_log_scale and (summary.min if summary else filtered_df[selected_indicator].min()) > 0
+            # Shared across sessions; the prefetcher may already have built it
+            fig = figcache.get_or_build(
+                indicator_map_key(
+                    snapshot, robust_mode, scenario, selected_indicator, selected_continents,
+                    "full" if summary else filter_range, log_color
+                ),
+                lambda: build_indicator_map(filtered_df, selected_indicator, color_scale, log_color, summary)
+            )
+
+        if show_clusters:
+            # Discrete profile layer replaces the indicator colouring; filters still apply
+            clusters = clustering.get_clusters(cluster_k, snapshot)
+            filtered_df['Profile'] = [
+                clusters.names[c] if c != clustering.NO_DATA else "No data" for c in clusters.labels[filtered_df.index]
+            ]
             fig = px.choropleth(
-                filtered_df,
+                figures.project(filtered_df, ['country', 'continent', selected_indicator, 'Profile']),
                 locations='country',
                 locationmode='country names',
-                color=color_column,
+                color='Profile',
                 hover_name='country',
-                hover_data=hover_data,
-                color_continuous_scale=color_scale,
-                title=f'World Map of {selected_indicator}',
-                # Using robust quantiles for color range to handle outliers
-                range_color=[filtered_df[color_column].quantile(0.05), filtered_df[color_column].quantile(0.95)]
+                hover_data={selected_indicator: True, 'continent': True},
+                category_orders={'Profile': clusters.names},
+                color_discrete_sequence=px.colors.qualitative.Set2,
+                title=f'Country Profiles (k = {cluster_k})'
             )
-            
-            # Update colorbar title
-            fig.update_layout(coloraxis_colorbar=dict(title=colorbar_title))
-
-        # Improved layout for better readability
-        layout_update = dict(
-            paper_bgcolor='#0E1117',
-            plot_bgcolor='#0E1117',
-            font_color='white',
-            title_font_size=24,
-            geo=dict(
-                showframe=False,
-                showcoastlines=True,
-                coastlinecolor='rgba(255, 255, 255, 0.5)',
-                projection_type='equirectangular',
-                bgcolor='#0E1117',
-                landcolor='rgba(50, 50, 50, 0.2)',
-                lakecolor='#0E1117',
-                showcountries=True,
-                countrycolor='rgba(255, 255, 255, 0.3)',
-                showland=True
-            ),
-            margin={"r": 0, "t": 50, "l": 0, "b": 0}
-        )
-        
-        fig.update_layout(**layout_update)
-        fig.update_traces(marker_line_color='white', marker_line_width=0.3)
-        fig.update_geos(fitbounds=False, visible=True)
-        
-        # Enable map zoom and pan for better interactivity
-        fig.update_geos(projection_type="natural earth", showframe=True)
-        
-        # Add source citation to the figure
-        fig.add_annotation(
-            xref="paper", yref="paper",
-            x=0.01, y=0.01,
-            text="",
-            showarrow=False,
-            font=dict(size=10, color="rgba(255,255,255,0.5)"),
-            align="left"
-        )
-        
+            fig.update_layout(legend=dict(title='Profile'))
+            fig = figures.compact(figures.style_map(fig))
+
         # Allow the map to take more vertical space
         st.plotly_chart(fig, use_container_width=True, height=600)
+        if scenario:
+            st.info("🧪 What-if scenario: " + "; ".join(simulator.describe(adjustment) for adjustment in scenario))
+
+    if show_clusters:
+        with st.expander("Profile averages"):
+            profile_table = {
+                'Profile': clusters.names,
+                'Countries': np.bincount(clusters.labels[clusters.labels != clustering.NO_DATA], minlength=clusters.k),
+            }
+            for j, col in enumerate(clusters.columns):
+                profile_table[col.replace(' Value', '')] = np.round(clusters.profile_means[:, j], 2)
+            st.dataframe(profile_table, hide_index=True, use_container_width=True)
 
     # --- Supporting Information ---
     st.divider()
@@ -523,14 +597,22 @@ def app():
     with tab1:
         # First show numerical statistics for the value version
         if not filtered_df.empty:
-            avg_val = filtered_df[selected_indicator].mean()
-            min_val = filtered_df[selected_indicator].min()
-            max_val = filtered_df[selected_indicator].max()
-            median_val = filtered_df[selected_indicator].median()
-            std_val = filtered_df[selected_indicator].std()
-            
-            min_country = filtered_df.loc[filtered_df[selected_indicator].idxmin(), 'country']
-            max_country = filtered_df.loc[filtered_df[selected_indicator].idxmax(), 'country']
+            if summary:
+                # Merged continent sketches: no pass over the rows
+                avg_val, min_val, max_val = summary.mean, summary.min, summary.max
+                median_val = summary.quantile(0.5)
+                std_val = summary.std()
+
+                min_country = df.loc[summary.min_row, 'country']
+                max_country = df.loc[summary.max_row, 'country']
+            else:
+                # One gather of the filtered rows, then count/sum/deviations/min/max
+                fused = filters.summarize(filtered_df.index, df[selected_indicator].to_numpy())
+                avg_val, min_val, max_val, std_val = fused.mean, fused.min, fused.max, fused.std()
+                median_val = filtered_df[selected_indicator].median()
+
+                min_country = df.loc[fused.min_row, 'country']
+                max_country = df.loc[fused.max_row, 'country']
             
             # Create a metrics display row
             metric_cols = st.columns(5)
@@ -539,14 +621,25 @@ def app():
             metric_cols[2].metric("Std Dev", f"{std_val:.2f}")
             metric_cols[3].metric(f"Min ({min_country})", f"{min_val:.2f}")
             metric_cols[4].metric(f"Max ({max_country})", f"{max_val:.2f}")
+            if robust_mode:
+                fences = snapshot.robust[selected_indicator]
+                clipped = int(snapshot.outliers[filtered_df.index, snapshot.numeric_columns.index(selected_indicator)].sum())
+                st.caption(
+                    f"Robust mode: {clipped} outlier(s) clipped to "
+                    f"[{fences['lower']:.2f}, {fences['upper']:.2f}] (median {fences['median']:.2f})."
+                )
             
 
             # Then also show the category distribution if available
             if category_indicator and category_indicator in df.columns:
                 st.subheader("Category Distribution")
-                cat_df = df[df['continent'].isin(selected_continents)].dropna(subset=[category_indicator])
-                category_counts = cat_df[category_indicator].value_counts().reset_index()
-                category_counts.columns = ['Category', 'Count']
+                level_counts = filter_index.counts(
+                    category_indicator, filter_index.select({'continent': selected_continents})
+                )
+                category_counts = pd.DataFrame(
+                    sorted(((level, count) for level, count in level_counts.items() if count), key=lambda lc: -lc[1]),
+                    columns=['Category', 'Count']
+                )
                 
                 # Sort categories if they're standard
                 standard_categories = ['Very Low', 'Low', 'Moderate', 'High', 'Very High']
@@ -624,41 +717,49 @@ def app():
             # Apply sorting based on user selection
             ascending = sort_order == "Lowest First"
             
+            # Positions into filtered_df; the search index works on snapshot rows (= the frame index)
             if search_table:
-                filtered_table_df = filtered_df[
-                    filtered_df['country'].str.contains(search_table, case=False) | 
-                    filtered_df['continent'].str.contains(search_table, case=False)
-                ]
+                positions = np.flatnonzero(search.get_index(snapshot).mask(search_table)[filtered_df.index.to_numpy()])
             else:
-                filtered_table_df = filtered_df
+                positions = np.arange(len(filtered_df))
                 
-            # Apply sorting
+            # Sort key for the matching positions only (ascending, NaN last); None keeps the data order
+            table_values = filtered_df[selected_indicator].to_numpy()[positions]
+            sort_key = None
             if not is_categorical:
-                display_df = filtered_table_df.sort_values(by=selected_indicator, ascending=ascending)
+                sort_key = table_values if ascending else -table_values
             else:
                 # For categorical data, create a sorting order
                 if all(cat in ['Very Low', 'Low', 'Moderate', 'High', 'Very High'] 
-                    for cat in filtered_table_df[selected_indicator].unique()):
+                    for cat in pd.unique(table_values)):
                     cat_order = {'Very Low': 0, 'Low': 1, 'Moderate': 2, 'High': 3, 'Very High': 4}
-                    filtered_table_df['sort_key'] = filtered_table_df[selected_indicator].map(cat_order)
-                    display_df = filtered_table_df.sort_values(
-                        by='sort_key', 
-                        ascending=not ascending if polarity == 'higher_is_better' else ascending
-                    ).drop('sort_key', axis=1)
-                else:
-                    display_df = filtered_table_df
+                    sort_key = np.array([cat_order[cat] for cat in table_values])
+                    descending = ascending if polarity == 'higher_is_better' else not ascending
+                    if descending:
+                        sort_key = -sort_key
+
+            def table_positions(stop):
+                return positions[:stop] if sort_key is None else sorted_positions(sort_key, positions, stop)
             
+            # Server-side pagination: only the visible page is built and sent to the browser
+            col3, col4 = st.columns([1, 1])
+            with col3:
+                page_size = st.selectbox("Rows per page", [25, 50, 100, 250], index=1)
+            page_count = max(1, -(-len(positions) // page_size))
+            with col4:
+                page_number = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+            page_start = (page_number - 1) * page_size
+            page_positions = table_positions(page_start + page_size)[page_start:]
+
             # First define the original columns
             original_columns = ['country', 'continent', selected_indicator]
 
-            # Create a copy to avoid modifying the original
-            display_df = display_df.copy()
-
             # Create a mapping from original to capitalized columns for display
             display_columns = [col.capitalize() if col in ['country', 'continent'] else col for col in original_columns]
 
-            # Rename the DataFrame columns
-            display_df.columns = [col.capitalize() if col in ['country', 'continent'] else col for col in display_df.columns]
+            # Selecting the displayed columns gives a new frame, so it can be relabelled without a full copy
+            display_df = filtered_df.take(page_positions)[original_columns]
+            display_df.columns = display_columns
 
             # Now use the capitalized column names
             st.dataframe(
@@ -666,15 +767,18 @@ def app():
                 use_container_width=True,
                 hide_index=True
             )
+            if len(positions):
+                st.caption(f"Rows {page_start + 1:,}-{page_start + len(page_positions):,} of {len(positions):,}")
+            else:
+                st.caption("No rows match the search.")
             
-            # Add export functionality
-            csv = display_df[display_columns].to_csv(index=False)
-            st.download_button(
-                label="Download data as CSV",
-                data=csv,
-                file_name=f'{selected_indicator.replace(" ", "_")}_data.csv',
-                mime='text/csv',
-            )
+            # Add export functionality; the full sorted table is only built when a download is clicked
+            def export_table():
+                table = filtered_df[original_columns].take(table_positions(len(positions)))
+                table.columns = display_columns
+                return table
+
+            export_buttons(export_table, f'{selected_indicator.replace(" ", "_")}_data')
         else:
             st.info("No data available with the current filters.")
 
@@ -700,17 +804,29 @@ def app():
     </div>
     """, unsafe_allow_html=True)
 
+    # --- Prefetch ---
+    # The usual next click is another indicator of the same group, so build those maps in the background
+    if not is_categorical and not scenario and not show_clusters and selected_continents:
+        prefetch_indicator_maps(
+            snapshot,
+            [f"{name} Value" for name in indicator_groups[selected_group] if f"{name} Value" != selected_indicator],
+            selected_continents, robust_mode, log_preference, color_scales
+        )
+
 
 
     # Add caching for improved performance
-    @st.cache_data(ttl=3600)  # Cache for 1 hour
     def get_indicator_stats(indicator_name):
         """Get basic stats for an indicator to use in descriptions"""
-        stats = {
-            'min': float(df[indicator_name].min()),
-            'max': float(df[indicator_name].max()),
-            'mean': float(df[indicator_name].mean()),
-            'median': float(df[indicator_name].median()),
-            'std': float(df[indicator_name].std())
-        }
-        return stats
+        def build():
+            return {
+                'min': float(df[indicator_name].min()),
+                'max': float(df[indicator_name].max()),
+                'mean': float(df[indicator_name].mean()),
+                'median': float(df[indicator_name].median()),
+                'std': float(df[indicator_name].std())
+            }
+        # Shared across sessions and processes, keyed by everything df depends on
+        return figcache.get_or_build(
+            ("indicator_stats", snapshot.version, robust_mode, tuple(scenario), indicator_name), build
+        )
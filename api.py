@@ -0,0 +1,311 @@
+"""Headless JSON API over the shared data layer.
+
+Serves the dashboard's queries without rendering pages:
+
+    GET /v1/meta
+    GET /v1/top?indicator=Safety&k=5[&order=bottom][&continent=Europe]
+    GET /v1/continents?indicator=Safety[&continents=Europe,Asia]
+    GET /v1/compare?a=Germany&b=Europe
+    GET /v1/table?[continent=...][&indicator=...&min=...&max=...][&columns=...][&sort=...][&limit=100&offset=0]
+
+Answers come from the same snapshot, bitset filters, sketches and top-k
+helpers as the pages. Every response carries an ``ETag`` (the dataset
+version) and ``Last-Modified`` (the source file's mtime). A client polling
+with ``If-None-Match`` or ``If-Modified-Since`` gets a bodiless 304 until
+the data changes. That check needs only the current snapshot, so a 304
+never runs the query. Rendered bodies are also cached per (version, query),
+so repeated polling of a changed dataset costs one serialization.
+
+    python api.py [--host 127.0.0.1] [--port 8765]
+"""
+import argparse
+import email.utils
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+
+import composite
+import data
+import filters
+import metrics
+import sketches
+
+# --- Configuration ---
+API_HOST = os.environ.get("QOL_API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("QOL_API_PORT", "8765"))
+MAX_CACHED_RESPONSES = 512
+MAX_PAGE_SIZE = 1000
+
+_lock = threading.Lock()
+_responses = OrderedDict()  # (version, path, query) -> JSON body bytes
+data.on_swap(lambda version: data.evict(_lock, _responses, version, lambda key: key[0]))
+
+
+class BadRequest(ValueError):
+    """Invalid query parameters; reported to the client as HTTP 400."""
+
+
+def _number(value):
+    value = float(value)
+    return None if math.isnan(value) else round(value, 4)
+
+
+def _column(snapshot, name):
+    if not name:
+        raise BadRequest("missing 'indicator'")
+    wanted = name.strip().lower()
+    for col in snapshot.numeric_columns:
+        if wanted in (col.lower(), col.lower().removesuffix(" value")):
+            return col
+    raise BadRequest(f"unknown indicator {name!r}")
+
+
+def _continents(snapshot, value):
+    known = sorted(filters.get_index(snapshot).levels["continent"])
+    if not value:
+        return known
+    chosen = [c.strip() for c in value.split(",") if c.strip()]
+    unknown = [c for c in chosen if c not in known]
+    if unknown:
+        raise BadRequest(f"unknown continent(s): {', '.join(unknown)}")
+    return chosen
+
+
+def _int(query, name, default, lo, hi):
+    try:
+        value = int(query.get(name, default))
+    except ValueError:
+        raise BadRequest(f"'{name}' must be an integer")
+    if not lo <= value <= hi:
+        raise BadRequest(f"'{name}' must be between {lo} and {hi}")
+    return value
+
+
+def meta(snapshot, query):
+    return {
+        "version": snapshot.version,
+        "rows": int(snapshot.matrix.shape[0]),
+        "indicators": snapshot.numeric_columns,
+        "continents": _continents(snapshot, None),
+        "polarity": data.INDICATOR_POLARITY,
+    }
+
+
+def top(snapshot, query):
+    column = _column(snapshot, query.get("indicator"))
+    k = _int(query, "k", 5, 1, MAX_PAGE_SIZE)
+    order = query.get("order", "top")
+    if order not in ("top", "bottom"):
+        raise BadRequest("'order' must be 'top' or 'bottom'")
+    continents = _continents(snapshot, query.get("continent"))
+
+    rows = filters.get_index(snapshot).select({"continent": continents}, present=column).rows
+    values = snapshot.matrix[:, snapshot.numeric_columns.index(column)]
+    best = composite.top_k(values, rows, k, largest=order == "top")
+    countries, labels = snapshot.labels["country"], snapshot.labels["continent"]
+    return {
+        "indicator": column,
+        "order": order,
+        "polarity": data.INDICATOR_POLARITY.get(column),
+        "results": [
+            {"rank": i + 1, "country": countries[r], "continent": labels[r], "value": _number(values[r])}
+            for i, r in enumerate(best)
+        ],
+    }
+
+
+def continent_stats(snapshot, query):
+    column = _column(snapshot, query.get("indicator"))
+    results = []
+    for continent in _continents(snapshot, query.get("continents")):
+        sketch = sketches.summarize(column, [continent], snapshot)
+        results.append({
+            "continent": continent,
+            "count": sketch.n,
+            "mean": _number(sketch.mean) if sketch.n else None,
+            "median": _number(sketch.quantile(0.5)),
+            "std": _number(sketch.std()),
+            "min": _number(sketch.min),
+            "max": _number(sketch.max),
+        })
+    return {"indicator": column, "results": results}
+
+
+def _entity(snapshot, name):
+    if not name:
+        raise BadRequest("missing entity name")
+    countries = list(snapshot.labels["country"])
+    if name in countries:
+        values = snapshot.matrix[countries.index(name)]
+        return {"name": name, "type": "country", "values": {c: _number(v) for c, v in zip(snapshot.numeric_columns, values)}}
+    index = filters.get_index(snapshot)
+    if name in index.levels["continent"]:
+        # Continent values are country means, as on the comparison page
+        selection = index.select({"continent": [name]})
+        values = {
+            c: _number(index.stats(selection, c, snapshot.matrix[:, j]).mean)
+            for j, c in enumerate(snapshot.numeric_columns)
+        }
+        return {"name": name, "type": "continent", "values": values}
+    raise BadRequest(f"unknown country or continent {name!r}")
+
+
+def compare(snapshot, query):
+    a, b = _entity(snapshot, query.get("a")), _entity(snapshot, query.get("b"))
+    difference = {
+        c: None if a["values"][c] is None or b["values"][c] is None else _number(a["values"][c] - b["values"][c])
+        for c in snapshot.numeric_columns
+    }
+    return {"a": a, "b": b, "difference": difference}
+
+
+def table(snapshot, query):
+    index = filters.get_index(snapshot)
+    continents = _continents(snapshot, query.get("continent"))
+    columns = [_column(snapshot, c) for c in query["columns"].split(",")] if query.get("columns") else snapshot.numeric_columns
+    limit = _int(query, "limit", 100, 1, MAX_PAGE_SIZE)
+    offset = _int(query, "offset", 0, 0, 10 ** 9)
+
+    selection = index.select({"continent": continents})
+    rows = selection.rows
+    if query.get("indicator"):
+        column = _column(snapshot, query["indicator"])
+        values = snapshot.matrix[rows, snapshot.numeric_columns.index(column)]
+        try:
+            lo, hi = float(query.get("min", "-inf")), float(query.get("max", "inf"))
+        except ValueError:
+            raise BadRequest("'min' and 'max' must be numbers")
+        rows = rows[(values >= lo) & (values <= hi)]
+    if query.get("sort"):
+        sort_column = snapshot.numeric_columns.index(_column(snapshot, query["sort"]))
+        keys = snapshot.matrix[rows, sort_column]
+        order = np.argsort(keys if query.get("order") == "asc" else -keys, kind="stable")
+        rows = rows[order]
+
+    page = rows[offset:offset + limit]
+    positions = [snapshot.numeric_columns.index(c) for c in columns]
+    block = snapshot.matrix[page][:, positions]
+    countries, labels = snapshot.labels["country"], snapshot.labels["continent"]
+    return {
+        "total": int(rows.size),
+        "offset": offset,
+        "limit": limit,
+        "columns": ["country", "continent"] + columns,
+        "rows": [[countries[r], labels[r]] + [_number(v) for v in values] for r, values in zip(page, block)],
+    }
+
+
+ROUTES = {
+    "/v1/meta": meta,
+    "/v1/top": top,
+    "/v1/continents": continent_stats,
+    "/v1/compare": compare,
+    "/v1/table": table,
+}
+
+
+def validators(snapshot):
+    """(ETag, Last-Modified timestamp) of every response built from ``snapshot``."""
+    return f'"{snapshot.version}"', snapshot.stamp[0] / 1e9
+
+
+def respond(path, query_string, headers=None):
+    """Return (status, body bytes, snapshot) for a GET; bodies are cached per dataset version.
+
+    ``headers`` are the request's; if their validators match the current
+    snapshot the answer is a 304 with an empty body, without running the query.
+    """
+    handler = ROUTES.get(path)
+    if handler is None:
+        return 404, json.dumps({"error": f"unknown endpoint {path}"}).encode("utf-8"), None
+    snapshot = data.get_snapshot()
+    if headers is not None and _not_modified(headers, *validators(snapshot)):
+        return 304, b"", snapshot
+    query = dict(parse_qsl(query_string))
+    key = (snapshot.version, path, tuple(sorted(query.items())))
+    with _lock:
+        body = _responses.get(key)
+        if body is not None:
+            _responses.move_to_end(key)
+    metrics.record_cache("api_responses", body is not None)
+    if body is None:
+        try:
+            body = json.dumps(handler(snapshot, query)).encode("utf-8")
+        except BadRequest as exc:
+            return 400, json.dumps({"error": str(exc)}).encode("utf-8"), snapshot
+        with _lock:
+            if not data.retired(snapshot.version):
+                _responses[key] = body
+            while len(_responses) > MAX_CACHED_RESPONSES:
+                _responses.popitem(last=False)
+    return 200, body, snapshot
+
+
+def _not_modified(headers, etag, modified):
+    if_none_match = headers.get("If-None-Match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+        return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+    if_modified_since = headers.get("If-Modified-Since")
+    if if_modified_since:
+        try:
+            return int(modified) <= email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+class _ApiHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlsplit(self.path)
+        status, body, snapshot = respond(url.path.rstrip("/") or "/", url.query, self.headers)
+        if status == 304:
+            self.send_response(304)
+            self.send_header("ETag", validators(snapshot)[0])
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 200:
+            etag, modified = validators(snapshot)
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", email.utils.formatdate(modified, usegmt=True))
+            self.send_header("Cache-Control", "no-cache")  # always revalidate; 304s are cheap
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Pollers would otherwise flood the console
+        pass
+
+
+def make_server(host=API_HOST, port=API_PORT):
+    server = ThreadingHTTPServer((host, port), _ApiHandler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the dashboard's queries as JSON.")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    args = parser.parse_args()
+
+    data.start_watcher()
+    server = make_server(args.host, args.port)
+    print(f"Serving JSON API on http://{args.host}:{args.port}/v1/meta")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""k-means quality-of-life profiles, cached per (dataset version, k).
+
+Clustering runs on the standardized vectors of the neighbour index, so
+both features share one z-scored matrix per dataset version. When a new k
+is requested, Lloyd's iterations start from the centroids of the closest k
+already computed for that version instead of from scratch. Entities with
+no indicator values at all are left out of the clustering (``NO_DATA``).
+"""
+import threading
+
+import numpy as np
+
+import data
+import metrics
+import neighbors
+
+MAX_ITERATIONS = 100
+TOLERANCE = 1e-4  # relative inertia improvement at which Lloyd's iterations stop
+SEED = 0
+NO_DATA = -1  # label of entities with no indicator values
+
+_lock = threading.Lock()
+_results = {}  # (dataset version, k) -> Clustering
+data.on_swap(lambda version: data.evict(_lock, _results, version, lambda key: key[0]))
+
+
+class Clustering:
+    """One k-means solution, with clusters ordered by mean Quality of Life."""
+
+    def __init__(self, k, labels, centroids, inertia, iterations, names, profile_means, columns):
+        self.k = k
+        self.labels = labels  # cluster per entity row, 0 = best mean Quality of Life, NO_DATA if left out
+        self.centroids = centroids  # (k, indicators) in z-score units
+        self.inertia = inertia
+        self.iterations = iterations
+        self.names = names
+        self.profile_means = profile_means  # (k, indicators) in original units
+        self.columns = columns
+
+
+def _sq_distances(X, centroids):
+    return (
+        np.einsum("ij,ij->i", X, X)[:, None]
+        - 2.0 * X @ centroids.T
+        + np.einsum("ij,ij->i", centroids, centroids)[None, :]
+    )
+
+
+def _seed_more(X, centroids, k, rng, weights=None):
+    # k-means++: add centroids with probability proportional to squared distance
+    centroids = list(centroids)
+    if not centroids:
+        centroids.append(X[rng.choice(len(X), p=None if weights is None else weights / weights.sum())])
+    while len(centroids) < k:
+        d = np.maximum(_sq_distances(X, np.array(centroids)).min(axis=1), 0.0)
+        if weights is not None:
+            d = d * weights
+        total = d.sum()
+        pick = rng.choice(len(X), p=d / total) if total > 0 else rng.integers(len(X))
+        centroids.append(X[pick])
+    return np.array(centroids, dtype=X.dtype)
+
+
+def _initial_centroids(X, k, previous, rng):
+    if previous is None:
+        return _seed_more(X, [], k, rng)
+    if previous.k < k:
+        return _seed_more(X, previous.centroids, k, rng)
+    # Fewer clusters: reduce the previous centroids, weighted by their sizes
+    sizes = np.bincount(previous.labels[previous.labels != NO_DATA], minlength=previous.k).astype("float64")
+    return _seed_more(previous.centroids, [], k, rng, weights=sizes + 1e-9)
+
+
+def kmeans(X, k, init):
+    """Lloyd's algorithm from ``init``; returns (labels, centroids, inertia, iterations)."""
+    centroids = init.astype(X.dtype, copy=True)
+    inertia = np.inf
+    for iteration in range(1, MAX_ITERATIONS + 1):
+        d = _sq_distances(X, centroids)
+        labels = d.argmin(axis=1)
+        new_inertia = float(np.maximum(d[np.arange(len(X)), labels], 0.0).sum())
+
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, X)
+        empty = counts == 0
+        centroids = np.where(empty[:, None], centroids, sums / np.maximum(counts, 1)[:, None])
+        if empty.any():
+            # Re-seed empty clusters at the points farthest from their centroid
+            far = np.argsort(-d[np.arange(len(X)), labels])[:empty.sum()]
+            centroids[empty] = X[far]
+
+        if inertia - new_inertia <= TOLERANCE * max(new_inertia, 1e-12):
+            inertia = new_inertia
+            break
+        inertia = new_inertia
+    return labels, centroids, inertia, iteration
+
+
+def _describe(snapshot, labels, centroids, columns):
+    X = np.asarray(snapshot.matrix)[:, [snapshot.numeric_columns.index(c) for c in columns]]
+    k = len(centroids)
+    profile_means = np.array([np.nanmean(X[labels == c], axis=0) for c in range(k)])
+
+    # Best profile first: order clusters by mean Quality of Life
+    quality = columns.index("Quality of Life Value")
+    order = np.argsort(-profile_means[:, quality], kind="stable")
+    remap = np.full(k + 1, NO_DATA, dtype="int64")  # remap[NO_DATA] stays NO_DATA
+    remap[order] = np.arange(k)
+    labels, centroids, profile_means = remap[labels], centroids[order], profile_means[order]
+
+    names = []
+    for c in range(k):
+        # Name each profile by its two most distinctive indicators
+        traits = np.argsort(-np.abs(centroids[c]))[:2]
+        words = [("High " if centroids[c, j] > 0 else "Low ") + columns[j].replace(" Value", "") for j in traits]
+        names.append(f"Profile {c + 1}: " + ", ".join(words))
+    return labels, centroids, profile_means, names
+
+
+def get_clusters(k, snapshot=None):
+    """k-means profiles for ``snapshot`` (default: current), cached per version and k."""
+    snapshot = snapshot or data.get_snapshot()
+    with _lock:
+        result = _results.get((snapshot.version, k))
+        computed = sorted(kk for version, kk in _results if version == snapshot.version)
+    metrics.record_cache("clusters", result is not None)
+    if result is not None:
+        return result
+
+    columns = [c for c in snapshot.numeric_columns if c.endswith("Value")]
+    present = ~np.isnan(np.asarray(snapshot.matrix)[:, [snapshot.numeric_columns.index(c) for c in columns]]).all(axis=1)
+    X = neighbors.get_index(snapshot).vectors[present]
+    requested, k = k, max(1, min(k, len(X)))
+    previous = None
+    if computed:
+        # Warm start from the solution with the closest number of clusters
+        closest = min(computed, key=lambda kk: (abs(kk - k), kk))
+        with _lock:
+            previous = _results.get((snapshot.version, closest))
+
+    rng = np.random.default_rng(SEED)
+    labels, centroids, inertia, iterations = kmeans(X, k, _initial_centroids(X, k, previous, rng))
+    all_labels = np.full(len(present), NO_DATA, dtype="int64")
+    all_labels[present] = labels
+    labels, centroids, profile_means, names = _describe(snapshot, all_labels, centroids, columns)
+    result = Clustering(k, labels, centroids, inertia, iterations, names, profile_means, columns)
+    with _lock:
+        if not data.retired(snapshot.version):
+            _results[(snapshot.version, requested)] = result
+    return result
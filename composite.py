@@ -0,0 +1,118 @@
+"""User-weighted composite index over pre-normalized indicators.
+
+Each component indicator is min-max scaled to [0, 1] once per dataset
+version, with lower-is-better indicators inverted so 1 is always best.
+A score is then a single matrix-vector product. When only some weights
+change, the previous product is updated with just those columns. A what-if
+scenario's values get their own model, which the caller keeps.
+"""
+import threading
+
+import numpy as np
+
+import data
+import metrics
+
+# Quality of Life is itself a composite of the others, so it is not a component
+COMPONENTS = [col for col in data.INDICATOR_POLARITY if col != "Quality of Life Value"]
+FULL_RECOMPUTE_EVERY = 64  # incremental updates before re-deriving the product to shed rounding drift
+
+_lock = threading.Lock()
+_models = {}  # dataset version -> CompositeModel
+data.on_swap(lambda version: data.evict(_lock, _models, version))
+
+
+class CompositeModel:
+    """Normalized component matrix for one dataset version."""
+
+    def __init__(self, version, columns, normalized):
+        self.version = version  # dataset version, or (version, scenario) for a scenario's model
+        self.columns = columns
+        self.normalized = normalized  # (entities, components), column-major, 1 = best
+
+
+def _normalize(snapshot, values=None):
+    idx = [snapshot.numeric_columns.index(col) for col in COMPONENTS]
+    X = np.array(snapshot.matrix[:, idx], dtype="float64")
+    for j, col in enumerate(COMPONENTS):
+        if values and col in values:
+            X[:, j] = values[col]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        lo, hi = np.nanmin(X, axis=0), np.nanmax(X, axis=0)
+        Z = (X - lo) / np.where(hi > lo, hi - lo, 1.0)
+    lower_is_better = np.array([data.INDICATOR_POLARITY[col] == "lower_is_better" for col in COMPONENTS])
+    Z[:, lower_is_better] = 1.0 - Z[:, lower_is_better]
+    # Missing values count as a typical (median) entity rather than the worst one
+    Z = np.where(np.isnan(Z), np.nanmedian(Z, axis=0), Z)
+    return np.asfortranarray(Z)
+
+
+def scenario_model(snapshot, scenario, values):
+    """Uncached composite model of ``snapshot`` with a what-if scenario's ``{column: values}`` swapped in."""
+    return CompositeModel((snapshot.version, tuple(scenario)), list(COMPONENTS), _normalize(snapshot, values))
+
+
+def get_model(snapshot=None):
+    """Composite model for ``snapshot`` (default: current), cached per version."""
+    snapshot = snapshot or data.get_snapshot()
+    with _lock:
+        model = _models.get(snapshot.version)
+    metrics.record_cache("composite", model is not None)
+    if model is None:
+        model = CompositeModel(snapshot.version, list(COMPONENTS), _normalize(snapshot))
+        with _lock:
+            if not data.retired(snapshot.version):
+                _models[snapshot.version] = model
+    return model
+
+
+def scores(model, weights, state):
+    """Composite scores (0-100) for ``weights``, one per entity.
+
+    ``state`` is a dict the caller keeps between calls (e.g. in session
+    state); it holds the last weights and weighted sum so that changing one
+    weight costs one column update instead of the full product.
+    """
+    weights = np.asarray(weights, dtype="float64")
+    incremental = (
+        state.get("version") == model.version
+        and state.get("updates", 0) < FULL_RECOMPUTE_EVERY
+        and "raw" in state
+    )
+    if incremental:
+        delta = weights - state["weights"]
+        changed = np.flatnonzero(delta)
+        incremental = changed.size <= len(model.columns) // 2
+    if incremental:
+        raw = state["raw"]
+        for j in changed:
+            # Column views of the column-major matrix: no gather, one fused pass per weight
+            raw = raw + delta[j] * model.normalized[:, j]
+        state["updates"] = state.get("updates", 0) + 1
+    else:
+        raw = model.normalized @ weights
+        state["updates"] = 0
+    state.update(version=model.version, weights=weights.copy(), raw=raw)
+
+    total = weights.sum()
+    return raw * (100.0 / total) if total > 0 else np.zeros_like(raw)
+
+
+def contributions(model, weights, rows):
+    """Per-component share of the score (0-100 scale) for the given entity rows."""
+    weights = np.asarray(weights, dtype="float64")
+    total = weights.sum()
+    if total <= 0:
+        return np.zeros((len(rows), len(model.columns)))
+    return model.normalized[rows] * weights / total * 100
+
+
+def top_k(values, rows, k, largest=True):
+    """Positions from ``rows`` with the k largest (or smallest) values, best first."""
+    rows = np.asarray(rows)
+    k = min(k, rows.size)
+    if k == 0:
+        return rows[:0]
+    candidates = values[rows] if largest else -values[rows]
+    part = np.argpartition(-candidates, k - 1)[:k]
+    return rows[part[np.argsort(-candidates[part], kind="stable")]]
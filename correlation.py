@@ -0,0 +1,172 @@
+"""Indicator x indicator Pearson and Spearman correlations with bootstrap CIs.
+
+Both matrices are computed in one vectorized pass over the shared snapshot
+matrix (pairwise-complete, so missing values only drop the affected pairs)
+and cached per dataset version. Bootstrap confidence intervals are computed
+in fixed-size chunks on the shared process pool and cached as well. Pages
+use ``intervals_if_ready``, which starts that bootstrap on a background
+thread and shows point estimates until it finishes.
+"""
+import logging
+import threading
+
+import numpy as np
+
+import data
+import metrics
+import workers
+
+BOOTSTRAP_SAMPLES = 1000
+BOOTSTRAP_CHUNK = 125  # resamples per pool task; fixed so results do not depend on the worker count
+CONFIDENCE = 0.95
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_correlations = {}  # dataset version -> Correlations
+_intervals = {}  # (dataset version, samples, seed) -> {method: (lower, upper)}
+_running = set()  # interval keys being bootstrapped in the background
+data.on_swap(lambda version: data.evict(_lock, _correlations, version))
+data.on_swap(lambda version: data.evict(_lock, _intervals, version, lambda key: key[0]))
+
+
+class Correlations:
+    """Pearson and Spearman matrices for one dataset version."""
+
+    def __init__(self, columns, pearson, spearman, counts):
+        self.columns = columns
+        self.pearson = pearson
+        self.spearman = spearman
+        self.counts = counts  # rows with both values present, per pair
+
+    def get(self, a, b, method="pearson"):
+        i, j = self.columns.index(a), self.columns.index(b)
+        return float(getattr(self, method)[i, j])
+
+
+def pearson_matrix(X):
+    """Pairwise-complete Pearson correlation of the columns of ``X``."""
+    present = ~np.isnan(X)
+    M = present.astype("float64")
+    Z = np.where(present, X, 0.0)
+
+    n = M.T @ M                 # n[i, j]: rows where both i and j are present
+    sx = Z.T @ M                # sum of column i over those rows
+    sxx = (Z * Z).T @ M         # sum of squares of column i over those rows
+    sxy = Z.T @ Z
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = sxy - sx * sx.T / n
+        var = sxx - sx * sx / n
+        r = cov / np.sqrt(var * var.T)
+    return np.clip(r, -1.0, 1.0), n
+
+
+def rank_columns(X):
+    """Average ranks of each column (ties share their mean rank, NaN stays NaN)."""
+    n = X.shape[0]
+    order = np.argsort(X, axis=0, kind="mergesort")  # NaN sorts last
+    ordered = np.take_along_axis(X, order, axis=0)
+    positions = np.arange(1, n + 1, dtype="float64")[:, None] * np.ones((1, X.shape[1]))
+
+    starts = np.ones(X.shape, dtype=bool)
+    starts[1:] = ordered[1:] != ordered[:-1]
+    ends = np.ones(X.shape, dtype=bool)
+    ends[:-1] = starts[1:]
+
+    first = np.maximum.accumulate(np.where(starts, positions, 0), axis=0)
+    last = np.minimum.accumulate(np.where(ends, positions, n + 1)[::-1], axis=0)[::-1]
+    ranked = np.where(np.isnan(ordered), np.nan, (first + last) / 2)
+
+    ranks = np.empty_like(ranked)
+    np.put_along_axis(ranks, order, ranked, axis=0)
+    return ranks
+
+
+def compute(X):
+    """Return (pearson, spearman, counts) for the columns of ``X``.
+
+    Spearman ranks each column once over all its non-missing values, which
+    matches the textbook definition whenever the data has no gaps.
+    """
+    pearson, counts = pearson_matrix(X)
+    spearman, _ = pearson_matrix(rank_columns(X))
+    return pearson, spearman, counts
+
+
+def get_correlations(snapshot=None):
+    """Correlations for ``snapshot`` (default: current), cached per version."""
+    snapshot = snapshot or data.get_snapshot()
+    with _lock:
+        cached = _correlations.get(snapshot.version)
+    metrics.record_cache("correlations", cached is not None)
+    if cached is None:
+        pearson, spearman, counts = compute(np.asarray(snapshot.matrix))
+        cached = Correlations(list(snapshot.numeric_columns), pearson, spearman, counts)
+        with _lock:
+            if not data.retired(snapshot.version):
+                _correlations[snapshot.version] = cached
+    return cached
+
+
+def _bootstrap_chunk(X, samples, seed):
+    # Runs in a worker process
+    rng = np.random.default_rng(seed)
+    n, p = X.shape
+    pearson = np.empty((samples, p, p))
+    spearman = np.empty((samples, p, p))
+    for b in range(samples):
+        pearson[b], spearman[b], _ = compute(X[rng.integers(0, n, n)])
+    return pearson, spearman
+
+
+def intervals_if_ready(snapshot=None, samples=BOOTSTRAP_SAMPLES, seed=0):
+    """Cached ``get_intervals`` result, or None after starting it on a background thread."""
+    snapshot = snapshot or data.get_snapshot()
+    key = (snapshot.version, samples, seed)
+    with _lock:
+        cached = _intervals.get(key)
+        start = cached is None and key not in _running
+        if start:
+            _running.add(key)
+    if start:
+        threading.Thread(
+            target=_bootstrap_in_background, args=(snapshot, samples, seed), name="qol-bootstrap", daemon=True
+        ).start()
+    return cached
+
+
+def _bootstrap_in_background(snapshot, samples, seed):
+    try:
+        get_intervals(snapshot, samples, seed)
+    except Exception:
+        logger.exception("Bootstrapping correlation intervals failed")
+    finally:
+        with _lock:
+            _running.discard((snapshot.version, samples, seed))
+
+
+def get_intervals(snapshot=None, samples=BOOTSTRAP_SAMPLES, seed=0):
+    """Percentile bootstrap CIs: ``{"pearson": (lower, upper), "spearman": (lower, upper)}``."""
+    snapshot = snapshot or data.get_snapshot()
+    key = (snapshot.version, samples, seed)
+    with _lock:
+        cached = _intervals.get(key)
+    metrics.record_cache("correlation_intervals", cached is not None)
+    if cached is not None:
+        return cached
+
+    X = np.array(snapshot.matrix)  # plain array so it pickles without the memory map
+    sizes = workers.split(samples, -(-samples // BOOTSTRAP_CHUNK))
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    results = workers.map_chunks(_bootstrap_chunk, [(X, size, s) for size, s in zip(sizes, seeds)])
+
+    alpha = (1 - CONFIDENCE) / 2 * 100
+    cached = {}
+    for index, method in enumerate(("pearson", "spearman")):
+        stack = np.concatenate([result[index] for result in results])
+        lower, upper = np.nanpercentile(stack, [alpha, 100 - alpha], axis=0)
+        cached[method] = (lower, upper)
+    with _lock:
+        if not data.retired(snapshot.version):
+            _intervals[key] = cached
+    return cached
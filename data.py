@@ -0,0 +1,321 @@
+"""Shared, read-only dataset snapshot used by every page.
+
+The numeric indicator matrix is written once per dataset version to a
+``.npy`` file in ``QOL_CACHE_DIR`` and memory-mapped read-only. Every
+session in a process shares one ``Snapshot``. Every server process on the
+host maps the same file, so the operating system keeps a single copy in
+the page cache. Pages get zero-copy DataFrame views over that matrix.
+
+Ingest also runs a robust-statistics pass: values more than
+``OUTLIER_THRESHOLD`` modified z-scores from the column median (scaled by
+the median absolute deviation) are flagged. A winsorized copy of the
+matrix clips them to those fences. Both are stored next to the matrix, so
+the pages' "robust" mode costs nothing per rerun.
+
+The server runs a watcher thread (``start_watcher``) that polls the source
+file. Once a changed file has stopped changing for one poll, the watcher
+loads it off the request path and swaps the new snapshot in with a single
+assignment. A rerun reads the snapshot once and passes it down, so it sees
+one version throughout. Caches keyed by dataset version register with
+``on_swap`` and then drop the entries of other versions. A request that
+started before the swap can finish after it, so caches also check
+``retired`` before adding an entry. Once the caches are cleared, the old
+version's files are deleted from ``QOL_CACHE_DIR``; processes that still
+map them keep reading them until they swap too.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+import metrics
+
+# --- Configuration ---
+DATA_PATH = os.environ.get("QOL_DATA_PATH", "final_data.xlsx")
+CACHE_DIR = os.environ.get("QOL_CACHE_DIR", os.path.join(tempfile.gettempdir(), "qol_dashboard"))
+WATCH_INTERVAL = float(os.environ.get("QOL_WATCH_INTERVAL", "2"))  # seconds between source checks; 0 disables
+logger = logging.getLogger(__name__)
+
+ID_COLUMNS = ["country", "continent"]
+
+OUTLIER_THRESHOLD = 3.5  # modified z-score (0.6745 * |x - median| / MAD) above which a value is an outlier
+
+# Whether a higher value is better, per indicator column; the pages' polarity maps derive from this
+INDICATOR_POLARITY = {
+    "Quality of Life Value": "higher_is_better",
+    "Purchasing Power Value": "higher_is_better",
+    "Cost of Living Value": "lower_is_better",
+    "Property Price to Income Value": "lower_is_better",
+    "Safety Value": "higher_is_better",
+    "Health Care Value": "higher_is_better",
+    "Pollution Value": "lower_is_better",
+    "Traffic Commute Time Value": "lower_is_better",
+    "Climate Value": "higher_is_better",
+}
+
+# Column naming used by each page
+COLUMN_STYLES = {
+    "raw": lambda col: col,                       # WorldMap
+    "title": lambda col: col.strip().title(),     # GlobalMetrics, ComparisonOfCountries
+    "lower": lambda col: col.strip().lower(),     # TopvBottom
+}
+
+_lock = threading.Lock()
+_snapshot = None
+_watched = None  # path the watcher thread keeps current, if one is running
+_swap_callbacks = []
+_retired = set()  # versions swapped out (and not swapped back in)
+
+
+class Snapshot:
+    """One immutable version of the dataset."""
+
+    def __init__(self, path, version, stamp, columns, numeric_columns, matrix, labels, winsorized, outliers, robust):
+        self.path = path
+        self.version = version
+        self.stamp = stamp  # (mtime_ns, size) of the source file when loaded
+        self.columns = columns  # all columns in source order
+        self.numeric_columns = numeric_columns
+        self.matrix = matrix  # read-only float64, column-major, one column per numeric indicator
+        self.labels = labels  # column name -> object array for country, continent and categories
+        self.winsorized = winsorized  # matrix with outliers clipped to the robust fences
+        self.outliers = outliers  # bool, same shape as matrix
+        self.robust = robust  # numeric column -> {"median", "mad", "lower", "upper", "outliers"}
+        self._frames = {}
+        self._frames_lock = threading.Lock()
+
+    def frame(self, style="raw", robust=False):
+        """Return a DataFrame view of the snapshot with the page's column style.
+
+        With ``robust=True`` the numeric columns come from the winsorized matrix.
+        """
+        with self._frames_lock:
+            shared = self._frames.get((style, robust))
+            if shared is None:
+                shared = self._frames[(style, robust)] = self._build_frame(
+                    COLUMN_STYLES[style], self.winsorized if robust else self.matrix
+                )
+        # A shallow copy lets a page add columns without touching the shared frame;
+        # the numeric data itself stays on the read-only memory map.
+        return shared.copy(deep=False)
+
+    def _build_frame(self, rename, matrix):
+        import pandas as pd
+
+        df = pd.DataFrame(matrix, columns=[rename(c) for c in self.numeric_columns], copy=False)
+        for position, col in enumerate(self.columns):
+            if col in self.labels:
+                df.insert(position, rename(col), self.labels[col])
+        return df
+
+
+def _file_stamp(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _file_version(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def _atomic_write(target, write):
+    # Concurrent workers may build the same version; os.replace keeps readers safe
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp, target)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _robust_pass(matrix, numeric_columns):
+    """Return (winsorized, outliers, stats) for the columns of ``matrix``."""
+    with np.errstate(invalid="ignore"):
+        median = np.nanmedian(matrix, axis=0)
+        mad = np.nanmedian(np.abs(matrix - median), axis=0)
+        reach = OUTLIER_THRESHOLD / 0.6745 * mad
+        lower, upper = median - reach, median + reach
+        # A zero MAD (mostly identical values) gives no usable scale: flag nothing
+        outliers = ((matrix < lower) | (matrix > upper)) & (mad > 0)
+    winsorized = np.asfortranarray(np.where(outliers, np.clip(matrix, lower, upper), matrix))
+    stats = {
+        col: {
+            "median": float(median[j]), "mad": float(mad[j]),
+            "lower": float(lower[j]), "upper": float(upper[j]), "outliers": int(outliers[:, j].sum()),
+        }
+        for j, col in enumerate(numeric_columns)
+    }
+    return winsorized, np.asfortranarray(outliers), stats
+
+
+def _read_source(path):
+    # pandas is only needed to parse the source or build frames; matrix-only
+    # consumers (e.g. the home page's correlations) never import it
+    import pandas as pd
+
+    # Excel is the shipped format; CSV and Parquet keep large (e.g. synthetic) datasets fast to ingest
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return pd.read_csv(path)
+    if ext == ".parquet":
+        return pd.read_parquet(path)
+    return pd.read_excel(path)
+
+
+def _ingest(path, version):
+    """Parse the source file and write the shared matrix and label sidecar."""
+    import pandas as pd
+
+    df = _read_source(path)
+    columns = [str(c) for c in df.columns]
+    df.columns = columns
+    numeric_columns = [c for c in columns if c not in ID_COLUMNS and not c.endswith("Category")]
+
+    matrix = np.asfortranarray(
+        np.column_stack([pd.to_numeric(df[c], errors="coerce").to_numpy(dtype="float64") for c in numeric_columns])
+    )
+    labels = {
+        c: [None if pd.isna(v) else str(v) for v in df[c]]
+        for c in columns if c not in numeric_columns
+    }
+    winsorized, outliers, robust = _robust_pass(matrix, numeric_columns)
+    meta = {"columns": columns, "numeric_columns": numeric_columns, "labels": labels, "robust": robust}
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    base = os.path.join(CACHE_DIR, f"dataset-{version}")
+    _atomic_write(base + ".npy", lambda f: np.save(f, matrix))
+    _atomic_write(base + ".winsorized.npy", lambda f: np.save(f, winsorized))
+    _atomic_write(base + ".outliers.npy", lambda f: np.save(f, outliers))
+    # The sidecar goes last: its presence marks a complete ingest
+    _atomic_write(base + ".json", lambda f: f.write(json.dumps(meta).encode("utf-8")))
+
+
+def _load(path):
+    stamp = _file_stamp(path)
+    version = _file_version(path)
+    base = os.path.join(CACHE_DIR, f"dataset-{version}")
+    if not all(os.path.exists(base + suffix) for suffix in (".npy", ".winsorized.npy", ".outliers.npy", ".json")):
+        _ingest(path, version)
+
+    with open(base + ".json", encoding="utf-8") as f:
+        meta = json.load(f)
+    matrix = np.load(base + ".npy", mmap_mode="r")
+    winsorized = np.load(base + ".winsorized.npy", mmap_mode="r")
+    outliers = np.load(base + ".outliers.npy", mmap_mode="r")
+    labels = {c: np.array(values, dtype=object) for c, values in meta["labels"].items()}
+    return Snapshot(
+        path, version, stamp, meta["columns"], meta["numeric_columns"], matrix, labels,
+        winsorized, outliers, meta["robust"],
+    )
+
+
+def on_swap(callback):
+    """Call ``callback(version)`` whenever a snapshot of a new dataset ``version`` is swapped in."""
+    _swap_callbacks.append(callback)
+
+
+def retired(version):
+    """Whether dataset ``version`` has been swapped out; caches must not add entries for it."""
+    return version in _retired
+
+
+def evict(lock, cache, version, version_of=lambda key: key):
+    """Drop the entries of ``cache`` (guarded by ``lock``) built for another dataset version."""
+    with lock:
+        for key in [key for key in cache if version_of(key) != version]:
+            del cache[key]
+
+
+def _remove_files(version):
+    # Only the finished files: a concurrent ingest of this version would own its .tmp files
+    prefix = f"dataset-{version}."
+    try:
+        names = [name for name in os.listdir(CACHE_DIR) if name.startswith(prefix) and not name.endswith(".tmp")]
+    except FileNotFoundError:
+        return
+    for name in names:
+        try:
+            os.unlink(os.path.join(CACHE_DIR, name))
+        except FileNotFoundError:
+            pass  # another process swapped first
+        except OSError as exc:
+            logger.warning("Removing %s failed: %s", name, exc)
+
+
+def _swapped(previous, current):
+    if previous is not None and previous.version != current.version:
+        # Retire before evicting: an insert that misses the eviction then sees the version retired
+        with _lock:
+            _retired.add(previous.version)
+            _retired.discard(current.version)
+        for callback in list(_swap_callbacks):
+            callback(current.version)
+        _remove_files(previous.version)
+
+
+def get_snapshot(path=DATA_PATH):
+    """Return the current snapshot.
+
+    Without a watcher on ``path`` this checks the source file and reloads
+    it in line if it changed.
+    """
+    global _snapshot
+    with _lock:
+        previous = current = _snapshot
+        hit = current is not None and current.path == path and (_watched == path or current.stamp == _file_stamp(path))
+        if not hit:
+            current = _snapshot = _load(path)
+    metrics.record_cache("dataset", hit)
+    if not hit:
+        _swapped(previous, current)
+    return current
+
+
+def _watch(path):
+    global _snapshot
+    seen = None
+    while True:
+        time.sleep(WATCH_INTERVAL)
+        try:
+            stamp = _file_stamp(path)
+            if stamp == _snapshot.stamp or stamp != seen:
+                seen = stamp  # wait for a file being copied in to settle
+                continue
+            fresh = _load(path)
+        except Exception as exc:
+            # Keep serving the current snapshot; a later poll retries
+            logger.warning("Reloading %s failed: %s", path, exc)
+            continue
+        with _lock:
+            previous, _snapshot = _snapshot, fresh
+        _swapped(previous, fresh)
+        logger.info("Reloaded %s: dataset version %s -> %s", path, previous.version, fresh.version)
+
+
+def start_watcher(path=DATA_PATH):
+    """Keep the snapshot of ``path`` current from a background thread; safe to call on every rerun."""
+    global _watched
+    if WATCH_INTERVAL <= 0:
+        return
+    get_snapshot(path)
+    with _lock:
+        if _watched is not None:
+            return
+        _watched = path
+    threading.Thread(target=_watch, args=(path,), name="qol-data-watcher", daemon=True).start()
+
+
+def get_frame(style="raw"):
+    """Shortcut for ``get_snapshot().frame(style)``."""
+    return get_snapshot().frame(style)
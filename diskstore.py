@@ -0,0 +1,212 @@
+"""Disk-backed, content-addressed cache of built figures and aggregates.
+
+An entry's address is the SHA-256 of its canonical key, which starts with
+the entry's kind and the dataset version, plus a fingerprint of the code
+that built it: the dashboard's modules and the plotly, pandas and numpy
+versions. A deploy that changes any of these stops reading the old
+entries, which then age out of the store. Every server process and pool
+worker on the host shares the store in ``DIR``, and it survives restarts
+and rolling deploys. Values are pickled into a temporary file and renamed
+into place, so a reader in another process sees a whole entry or none.
+Reads refresh a file's mtime. Once a process has written
+``MAX_BYTES / 16``, it sweeps the store and deletes the least recently used
+files until the store is back under 90% of ``MAX_BYTES``. Sweeps need no
+lock: a file another process already deleted is skipped, and a file
+deleted while another process has it open stays readable until closed.
+
+Loading a pickle can run code, so the store lives in a per-user cache
+directory, not the shared temporary directory. It is created with mode
+0o700, and it is only used if it belongs to the current user and no one
+else can write to it. Otherwise the store turns itself off.
+"""
+import hashlib
+import json
+import logging
+import os
+import pickle
+import stat
+import tempfile
+import threading
+
+import metrics
+
+_USER_CACHE = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+DIR = os.environ.get("QOL_DISK_CACHE_DIR", os.path.join(_USER_CACHE, "qol_dashboard", "store"))
+MAX_BYTES = int(os.environ.get("QOL_DISK_CACHE_BYTES", str(512 * 1024 * 1024)))
+ENABLED = os.environ.get("QOL_DISK_CACHE", "1") != "0"
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_written = 0  # bytes this process wrote since its last sweep
+_written_total = 0  # bytes this process wrote since it started
+_private = None  # whether DIR passed the ownership check, once checked
+_code = None  # fingerprint of the code that builds cached values
+
+
+def _usable():
+    """Whether the store is on and ``DIR`` is private to this user (checked once)."""
+    global _private
+    if not ENABLED:
+        return False
+    if _private is None:
+        try:
+            os.makedirs(DIR, mode=0o700, exist_ok=True)
+            info = os.lstat(DIR)  # lstat: a planted symlink is not our directory
+            owned = not hasattr(os, "getuid") or info.st_uid == os.getuid()
+            private = stat.S_ISDIR(info.st_mode) and owned and not info.st_mode & 0o022
+        except OSError:
+            private = False
+        if not private:
+            logger.warning("Disk cache disabled: %s is not a directory owned by and writable only by this user", DIR)
+        _private = private
+    return _private
+
+
+def _plain(value):
+    # JSON has no tuples or numpy scalars; sets have no order
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(_plain(v) for v in value)
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def fingerprint():
+    """Hash of every dashboard module's source and the versions of the libraries values are built with."""
+    global _code
+    if _code is None:
+        import numpy
+        import pandas
+        import plotly
+
+        hasher = hashlib.sha256()
+        for version in (plotly.__version__, pandas.__version__, numpy.__version__):
+            hasher.update(version.encode("utf-8") + b"\0")
+        root = os.path.dirname(os.path.abspath(__file__))
+        for name in sorted(os.listdir(root)):
+            if name.endswith(".py"):
+                with open(os.path.join(root, name), "rb") as f:
+                    hasher.update(name.encode("utf-8") + b"\0" + f.read() + b"\0")
+        _code = hasher.hexdigest()[:16]
+    return _code
+
+
+def digest(key):
+    """Content address of ``key``: SHA-256 of the code fingerprint and the key's canonical JSON form."""
+    canonical = json.dumps([fingerprint(), _plain(key)], separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def path(key):
+    name = digest(key)
+    return os.path.join(DIR, name[:2], name + ".pkl")
+
+
+def load(key):
+    """``(value, stored bytes)`` for ``key``, or ``(None, 0)``."""
+    if not _usable():
+        return None, 0
+    target = path(key)
+    value, size = None, 0
+    try:
+        with open(target, "rb") as f:
+            value = pickle.load(f)
+            size = f.tell()
+        os.utime(target)  # mark as recently used
+    except FileNotFoundError:
+        pass
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        value = None  # unreadable, or written by code that no longer exists
+        _remove(target)
+    metrics.record_cache("disk", value is not None)
+    return value, size
+
+
+def get(key):
+    """Stored value for ``key`` or None."""
+    return load(key)[0]
+
+
+def put(key, value):
+    """Store ``value`` under ``key``; returns the bytes written (0 when disabled)."""
+    global _written, _written_total
+    if not _usable():
+        return 0
+    target = path(key)
+    os.makedirs(os.path.dirname(target), mode=0o700, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+            size = f.tell()
+        os.replace(tmp, target)
+    except BaseException:
+        _remove(tmp)
+        raise
+    with _lock:
+        _written += size
+        _written_total += size
+        due = _written > MAX_BYTES // 16
+        if due:
+            _written = 0
+    if due:
+        sweep()
+    return size
+
+
+def written_bytes():
+    """Bytes this process has written to the store since it started."""
+    with _lock:
+        return _written_total
+
+
+def _remove(target):
+    try:
+        os.unlink(target)
+    except FileNotFoundError:
+        pass
+
+
+def _files():
+    # (mtime, size, path) of every entry; entries may vanish while this runs
+    try:
+        shards = [entry.path for entry in os.scandir(DIR) if entry.is_dir()]
+    except FileNotFoundError:
+        return []
+    files = []
+    for shard in shards:
+        try:
+            entries = list(os.scandir(shard))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if not entry.name.endswith(".pkl"):
+                continue
+            try:
+                info = entry.stat()
+            except FileNotFoundError:
+                continue  # removed by another process since the listing
+            files.append((info.st_mtime, info.st_size, entry.path))
+    return files
+
+
+def total_bytes():
+    return sum(size for _, size, _ in _files())
+
+
+def sweep(max_bytes=None):
+    """Delete least recently used entries until the store fits 90% of ``max_bytes``; returns bytes freed."""
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    files = _files()
+    total = sum(size for _, size, _ in files)
+    if total <= max_bytes:
+        return 0
+    freed = 0
+    for _, size, target in sorted(files):
+        if total - freed <= 0.9 * max_bytes:
+            break
+        _remove(target)
+        freed += size
+    return freed
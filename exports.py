@@ -0,0 +1,59 @@
+"""Table exports as CSV, Parquet or Arrow IPC, built only when downloaded.
+
+Pages hand ``utils.export_buttons`` a function that returns the table, not
+the table's bytes, so a rerun costs nothing until someone clicks a button.
+The file is then encoded ``CHUNK_ROWS`` rows at a time, which bounds the
+intermediate text and Arrow buffers to one chunk. Streamlit serves the
+download from memory, so the finished file is held there as ``bytes``.
+Parquet and Arrow go through pyarrow, which Streamlit already depends on.
+"""
+import io
+import os
+
+CHUNK_ROWS = int(os.environ.get("QOL_EXPORT_CHUNK_ROWS", "50000"))
+
+# Format -> (file extension, MIME type)
+FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Arrow": ("arrow", "application/vnd.apache.arrow.file"),
+}
+
+
+def _chunks(frame):
+    for start in range(0, max(len(frame), 1), CHUNK_ROWS):
+        yield frame.iloc[start:start + CHUNK_ROWS]
+
+
+def _write_csv(frame, out):
+    for i, chunk in enumerate(_chunks(frame)):
+        out.write(chunk.to_csv(index=False, header=i == 0).encode("utf-8"))
+
+
+def _write_parquet(frame, out):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.Schema.from_pandas(frame, preserve_index=False)
+    with pq.ParquetWriter(out, schema) as writer:
+        for chunk in _chunks(frame):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def _write_arrow(frame, out):
+    import pyarrow as pa
+
+    schema = pa.Schema.from_pandas(frame, preserve_index=False)
+    with pa.ipc.new_file(out, schema) as writer:
+        for chunk in _chunks(frame):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+_WRITERS = {"CSV": _write_csv, "Parquet": _write_parquet, "Arrow": _write_arrow}
+
+
+def export(frame, fmt):
+    """``frame`` serialized as ``fmt``, as bytes."""
+    out = io.BytesIO()
+    _WRITERS[fmt](frame, out)
+    return out.getvalue()
@@ -0,0 +1,133 @@
+"""Process-wide cache of built figures and aggregates, shared by all sessions.
+
+Unlike ``session_cache`` (one session's derived views), entries here are
+keyed only by their inputs, including the dataset version, so any session
+(or the background prefetcher) can fill an entry another session reads.
+Values are treated as read-only: Streamlit only serializes figures, and
+pages must not modify a figure or frame they got from here.
+
+Keys start with the entry's kind and the dataset version. This in-memory
+LRU sits in front of ``diskstore``: every built entry is also written
+there, and a miss here falls back to it. Other server processes, pool
+workers and ``warm.py`` therefore fill entries this process reads, and
+they outlive restarts.
+"""
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import data
+import diskstore
+import metrics
+
+MAX_ENTRIES = int(os.environ.get("QOL_FIGCACHE_ENTRIES", "256"))
+MAX_BYTES = int(os.environ.get("QOL_FIGCACHE_BYTES", str(64 * 1024 * 1024)))
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # key -> (value, nbytes)
+_bytes = 0
+_prefetched = {}  # key -> nbytes, for entries the prefetcher added that no page has read yet
+_prefetched_bytes = 0
+
+
+def _drop(key):
+    # Caller holds _lock
+    global _bytes, _prefetched_bytes
+    _bytes -= _entries.pop(key)[1]
+    _prefetched_bytes -= _prefetched.pop(key, 0)
+
+
+def _evict(version):
+    with _lock:
+        for key in [key for key in _entries if key[1] != version]:
+            _drop(key)
+
+
+data.on_swap(_evict)
+
+
+def nbytes(value):
+    """Approximate memory held by a cached value the disk store did not size."""
+    if hasattr(value, "to_json") and hasattr(value, "layout"):  # plotly figure: its pickled size
+        return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    if hasattr(value, "memory_usage"):  # DataFrame / Series
+        usage = value.memory_usage(index=True)
+        return int(usage.sum() if hasattr(usage, "sum") else usage)
+    if isinstance(value, tuple):
+        return sum(nbytes(v) for v in value)
+    return 0
+
+
+def contains(key):
+    with _lock:
+        return key in _entries
+
+
+def total_bytes():
+    with _lock:
+        return _bytes
+
+
+def prefetched_bytes():
+    """Bytes held by prefetched entries that no page has read yet."""
+    with _lock:
+        return _prefetched_bytes
+
+
+def _lookup(key, prefetch=False):
+    global _prefetched_bytes
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None:
+            _entries.move_to_end(key)
+            if not prefetch:  # a page wanted it: no longer speculative
+                _prefetched_bytes -= _prefetched.pop(key, 0)
+    if entry is not None:
+        return entry[0]
+    value, size = diskstore.load(key)
+    return value if value is None else _remember(key, value, prefetch, size)
+
+
+def get(key):
+    """Cached value for ``key`` (from memory or disk) or None."""
+    value = _lookup(key)
+    metrics.record_cache("figures", value is not None)
+    return value
+
+
+def put(key, value, prefetch=False):
+    """Cache ``value`` in memory and on disk."""
+    return _remember(key, value, prefetch, diskstore.put(key, value))
+
+
+def _remember(key, value, prefetch=False, size=0):
+    # ``size``: the pickle the disk store wrote or read, so figures are not serialized again to size them
+    global _bytes, _prefetched_bytes
+    size = size or nbytes(value)
+    with _lock:
+        if data.retired(key[1]):
+            return value  # built for a dataset the swap already evicted
+        if key in _entries:
+            _drop(key)
+        _entries[key] = (value, size)
+        _bytes += size
+        if prefetch:
+            _prefetched[key] = size
+            _prefetched_bytes += size
+        while len(_entries) > 1 and (len(_entries) > MAX_ENTRIES or _bytes > MAX_BYTES):
+            _drop(next(iter(_entries)))
+    return value
+
+
+def get_or_build(key, build):
+    """Return the cached value for ``key``, building and caching it on a miss."""
+    value = get(key)
+    return put(key, build()) if value is None else value
+
+
+def fill(key, build):
+    """Like ``get_or_build`` for the prefetcher: not counted as a page lookup, and
+    a new entry counts toward ``prefetched_bytes`` until a page reads it."""
+    value = _lookup(key, prefetch=True)
+    return put(key, build(), prefetch=True) if value is None else value
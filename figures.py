@@ -0,0 +1,274 @@
+"""Chart builders shared by the pages and the background prefetcher.
+
+Each builder takes the page's already-filtered data and returns a finished
+figure. The same inputs always give the same figure, so results can be
+cached in ``figcache`` and built ahead of time by ``prefetch``. Builders
+never modify their input frames.
+
+Every figure is shipped to the browser as JSON on each rerun, so builders
+``project`` their input to the columns they render and ``compact`` the
+result: hover names that repeat the locations or x labels are sent once,
+and colour and size arrays go out in single precision. ``payload_bytes``
+measures what Streamlit sends; ``loadtest.py --payloads`` checks it
+against per-chart budgets.
+
+Scatter charts with one marker per country pick a mode from the point
+count (``render_mode``). Up to ``WEBGL_POINTS`` markers they are drawn as
+SVG, up to ``AGGREGATE_POINTS`` as WebGL (``scattergl``). Beyond that the
+points are binned here and the browser only receives the bins.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+
+DECIMALS = int(os.environ.get("QOL_CHART_DECIMALS", "2"))
+WEBGL_POINTS = int(os.environ.get("QOL_WEBGL_POINTS", "1000"))
+AGGREGATE_POINTS = int(os.environ.get("QOL_AGGREGATE_POINTS", "20000"))
+BINS = int(os.environ.get("QOL_AGGREGATE_BINS", "60"))  # per axis
+
+# Trace arrays that only drive colour or marker size, with the hover placeholder showing them
+_SINGLE_PRECISION = {"z": "z", "marker.color": "marker.color", "marker.size": "marker.size", "marker.colors": "color"}
+
+# Dark map styling shared by every WorldMap layer
+MAP_LAYOUT = dict(
+    paper_bgcolor='#0E1117',
+    plot_bgcolor='#0E1117',
+    font_color='white',
+    title_font_size=24,
+    geo=dict(
+        showframe=False,
+        showcoastlines=True,
+        coastlinecolor='rgba(255, 255, 255, 0.5)',
+        projection_type='equirectangular',
+        bgcolor='#0E1117',
+        landcolor='rgba(50, 50, 50, 0.2)',
+        lakecolor='#0E1117',
+        showcountries=True,
+        countrycolor='rgba(255, 255, 255, 0.3)',
+        showland=True
+    ),
+    margin={"r": 0, "t": 50, "l": 0, "b": 0}
+)
+
+
+def project(frame, columns, decimals=DECIMALS):
+    """Copy of ``frame`` with only ``columns``, floats rounded to ``decimals`` places."""
+    projected = frame[list(dict.fromkeys(columns))]
+    floats = {c: decimals for c in projected.columns if projected[c].dtype.kind == "f"}
+    return projected.round(floats) if floats else projected.copy()
+
+
+def compact(fig, decimals=DECIMALS):
+    """Drop redundant and over-precise trace data from a finished figure, in place."""
+    for trace in fig.data:
+        template = trace.hovertemplate or ""
+        hovertext = trace.hovertext if "hovertext" in trace else None
+        if hovertext is not None and "%{hovertext}" in template:
+            for field, placeholder in (("locations", "%{location}"), ("x", "%{x}")):
+                values = trace[field] if field in trace else None
+                if values is not None and len(values) == len(hovertext) and all(np.asarray(values) == np.asarray(hovertext)):
+                    template = template.replace("%{hovertext}", placeholder)
+                    trace.hovertext = None
+                    break
+        for path, placeholder in _SINGLE_PRECISION.items():
+            parent, _, name = path.rpartition(".")
+            if name not in (trace[parent] if parent else trace):
+                continue
+            values = trace[path]
+            if isinstance(values, np.ndarray) and values.dtype == np.float64:
+                trace[path] = values.astype(np.float32)
+                # Show the value as the data has it, not float32's trailing digits
+                template = template.replace(f"%{{{placeholder}}}", f"%{{{placeholder}:.{decimals}f}}")
+        if template:
+            trace.hovertemplate = template
+    return fig
+
+
+def render_mode(points):
+    """"svg", "webgl" or "aggregate" for a chart of ``points`` markers."""
+    if points > AGGREGATE_POINTS:
+        return "aggregate"
+    return "webgl" if points > WEBGL_POINTS else "svg"
+
+
+def _bin_index(values, bins):
+    # Equal-width bin of each value; the maximum falls in the last bin
+    lo, hi = values.min(), values.max()
+    if hi <= lo:
+        return np.zeros(len(values), dtype="int64")
+    return np.minimum(((values - lo) / (hi - lo) * bins).astype("int64"), bins - 1)
+
+
+def payload_bytes(fig):
+    """Size of the JSON spec Streamlit sends to the browser for ``fig``."""
+    return len(pio.to_json(fig, validate=False))
+
+
+def style_map(fig):
+    """Apply the WorldMap layout to a choropleth."""
+    fig.update_layout(**MAP_LAYOUT)
+    fig.update_traces(marker_line_color='white', marker_line_width=0.3)
+    fig.update_geos(fitbounds=False, visible=True)
+
+    # Enable map zoom and pan for better interactivity
+    fig.update_geos(projection_type="natural earth", showframe=True)
+
+    # Add source citation to the figure
+    fig.add_annotation(
+        xref="paper", yref="paper",
+        x=0.01, y=0.01,
+        text="",
+        showarrow=False,
+        font=dict(size=10, color="rgba(255,255,255,0.5)"),
+        align="left"
+    )
+    return fig
+
+
+def indicator_map(filtered_df, indicator, color_scale, log_color, range_color):
+    """Styled choropleth of a numeric indicator, optionally coloured on a log scale."""
+    plot_df = project(filtered_df, ['country', 'continent', indicator])
+    plot_df['Scale'] = np.log(plot_df[indicator]) if log_color else plot_df[indicator]
+    colorbar_title = f'Log of {indicator}' if log_color else indicator
+
+    fig = px.choropleth(
+        plot_df,
+        locations='country',
+        locationmode='country names',
+        color='Scale',
+        custom_data=[indicator, 'continent'],
+        color_continuous_scale=color_scale,
+        title=f'World Map of {indicator}',
+        range_color=range_color
+    )
+    # Written out so the colour scale (log or not) stays out of the hover and the payload
+    fig.update_traces(hovertemplate=(
+        f'<b>%{{location}}</b><br><br>country=%{{location}}<br>{indicator}=%{{customdata[0]:.2f}}'
+        '<br>continent=%{customdata[1]}<extra></extra>'
+    ))
+    fig.update_layout(coloraxis_colorbar=dict(title=colorbar_title))
+    return compact(style_map(fig))
+
+
+def continent_bar(df_continent, indicator, color_scale):
+    """GlobalMetrics bar of continent averages."""
+    fig = px.bar(
+        project(df_continent, ["Continent", indicator]), x="Continent", y=indicator, color=indicator,
+        color_continuous_scale=color_scale,
+        title=f"Average {indicator} Across Continents"
+    )
+    return compact(fig)
+
+
+def continent_sunburst(df_continent, indicator, color_scale):
+    """GlobalMetrics sunburst of continent averages."""
+    fig = px.sunburst(
+        project(df_continent, ["Continent", indicator]),
+        path=["Continent"],  # Show only continents
+        values=indicator,
+        color=indicator,
+        color_continuous_scale=color_scale,
+        title=f"{indicator} Distribution by Continent"
+    )
+    return compact(fig)
+
+
+def country_scatter(filtered_df, indicator, continent, color_scale):
+    """GlobalMetrics scatter of the countries of one continent (a histogram past ``AGGREGATE_POINTS``)."""
+    mode = render_mode(len(filtered_df))
+    if mode == "aggregate":
+        values = filtered_df[indicator].dropna().to_numpy()
+        counts, edges = np.histogram(values, bins=BINS)
+        binned = pd.DataFrame({indicator: ((edges[:-1] + edges[1:]) / 2).round(DECIMALS), "Countries": counts})
+        fig = px.bar(
+            binned,
+            x=indicator,
+            y="Countries",
+            color=indicator,
+            title=f"{indicator} Across {continent} ({len(values):,} countries, binned)",
+            color_continuous_scale=color_scale
+        )
+        fig.update_traces(width=edges[1] - edges[0])
+        x_title, y_title = indicator, "Countries"
+    else:
+        fig = px.scatter(
+            project(filtered_df, ["Country", indicator]),
+            x="Country",
+            y=indicator,
+            color=indicator,
+            size=indicator,
+            hover_name="Country",
+            title=f"{indicator} Across {continent}",
+            color_continuous_scale=color_scale,
+            render_mode=mode
+        )
+        x_title, y_title = "Country", indicator
+    fig.update_layout(
+        width=1200,
+        height=600,
+        xaxis_title=x_title,
+        yaxis_title=y_title,
+        margin=dict(l=20, r=20, t=40, b=40)
+    )
+    return compact(fig)
+
+
+def country_sunburst(df_country, indicator, continent, color_scale):
+    """GlobalMetrics continent -> country sunburst."""
+    fig = px.sunburst(
+        project(df_country, ["Continent", "Country", indicator]),
+        path=["Continent", "Country"],  # Continent → Country hierarchy
+        values=indicator,
+        color=indicator,
+        color_continuous_scale=color_scale,
+        title=f"{indicator} Distribution in {continent}"
+    )
+    return compact(fig)
+
+
+def pareto_scatter(ranked, columns, labels, title):
+    """TopvBottom scatter of the first two Pareto indicators coloured by front.
+
+    Past ``AGGREGATE_POINTS`` the countries are binned on a ``BINS`` x ``BINS``
+    grid; each cell is one marker at its countries' mean position, sized by
+    their number and coloured by the best front among them.
+    """
+    x, y = columns[:2]
+    mode = render_mode(len(ranked))
+    if mode == "aggregate":
+        points = ranked[[x, y, "Front"]].dropna()
+        cells = points.groupby(
+            [_bin_index(points[x].to_numpy(), BINS), _bin_index(points[y].to_numpy(), BINS)]
+        ).agg(**{x: (x, "mean"), y: (y, "mean"), "Front": ("Front", "min"), "Countries": ("Front", "size")})
+        fig = px.scatter(
+            project(cells, [x, y, "Front", "Countries"]),
+            x=x,
+            y=y,
+            color="Front",
+            size="Countries",
+            hover_data={x: ":.2f", y: ":.2f", "Countries": True},
+            color_continuous_scale="RdYlGn_r",
+            title=f"{title} ({len(points):,} countries, binned)",
+            render_mode="webgl"
+        )
+    else:
+        fig = px.scatter(
+            project(ranked, ["country", "Front"] + list(columns)),
+            x=x,
+            y=y,
+            color="Front",
+            hover_name="country",
+            hover_data={col: ":.2f" for col in columns},
+            color_continuous_scale="RdYlGn_r",
+            title=title,
+            render_mode=mode
+        )
+    fig.update_layout(
+        xaxis_title=labels[0],
+        yaxis_title=labels[1],
+        margin=dict(l=20, r=20, t=40, b=20)
+    )
+    return compact(fig)
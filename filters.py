@@ -0,0 +1,168 @@
+"""Precomputed bitset filters for continent and category selections.
+
+Every level of every label column (continents, indicator categories) is
+stored once per dataset version as a packed bitset of the rows that carry
+it, as are "value present" bitsets per numeric indicator. A multiselect
+combination is then a few word-wide ORs (within a column) and ANDs (across
+columns). Nothing scans the string columns per rerun. Summary statistics
+for a selection gather the selected values once and reduce them in a
+single vectorized step per statistic.
+"""
+import threading
+
+import numpy as np
+
+import data
+import metrics
+
+_lock = threading.Lock()
+_indexes = {}  # dataset version -> FilterIndex
+data.on_swap(lambda version: data.evict(_lock, _indexes, version))
+
+
+def _pack(flags):
+    # Little-endian bit order so bit i of the stream is row i; pad to whole 64-bit words
+    packed = np.packbits(np.asarray(flags, dtype=bool), bitorder="little")
+    return np.pad(packed, (0, -len(packed) % 8)).view(np.uint64)
+
+
+def _popcount(words):
+    if hasattr(np, "bitwise_count"):  # numpy >= 2.0
+        return int(np.bitwise_count(words).sum())
+    return int(np.unpackbits(words.view(np.uint8)).sum())
+
+
+class Selection:
+    """A packed row mask over one dataset version."""
+
+    def __init__(self, words, n):
+        self.words = words
+        self.n = n
+
+    def __and__(self, other):
+        return Selection(self.words & other.words, self.n)
+
+    def __or__(self, other):
+        return Selection(self.words | other.words, self.n)
+
+    @property
+    def rows(self):
+        """Selected row positions, ascending."""
+        bits = np.unpackbits(self.words.view(np.uint8), count=self.n, bitorder="little")
+        return np.flatnonzero(bits)
+
+    def count(self):
+        return _popcount(self.words)
+
+
+class Stats:
+    """Count, sum, squared deviations from the mean, min and max (with rows) of the selected values."""
+
+    def __init__(self, count, total, m2, lo, hi, lo_row, hi_row):
+        self.count = count
+        self.sum = total
+        self.m2 = m2  # sum of squared deviations; sum of squares minus sum * mean cancels for large values
+        self.min = lo
+        self.max = hi
+        self.min_row = lo_row
+        self.max_row = hi_row
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else np.nan
+
+    def std(self, ddof=1):
+        if self.count <= ddof:
+            return np.nan
+        return float(np.sqrt(self.m2 / (self.count - ddof)))
+
+
+def summarize(rows, values):
+    """Stats of ``values`` (a full column) at snapshot ``rows``, skipping missing values."""
+    rows = np.asarray(rows, dtype="int64")
+    values = np.asarray(values, dtype="float64")[rows]
+    present = ~np.isnan(values)
+    if not present.all():
+        rows, values = rows[present], values[present]
+    if not rows.size:
+        return Stats(0, 0.0, 0.0, np.nan, np.nan, None, None)
+    lo, hi = values.argmin(), values.argmax()
+    total = float(values.sum())
+    deviations = values - total / rows.size
+    return Stats(
+        rows.size, total, float(deviations @ deviations),
+        float(values[lo]), float(values[hi]), int(rows[lo]), int(rows[hi]),
+    )
+
+
+class FilterIndex:
+    """Bitsets for every label level and numeric column of one dataset version."""
+
+    def __init__(self, version, n, levels, present, columns):
+        self.version = version
+        self.n = n
+        self.levels = levels  # label column -> {level: bitset words}
+        self.present = present  # numeric column -> bitset words of non-missing rows
+        self.columns = columns  # numeric column -> position in the snapshot matrix
+
+    def all(self):
+        return Selection(_pack(np.ones(self.n, dtype=bool)), self.n)
+
+    def from_rows(self, rows):
+        """Selection of explicit row positions (e.g. after a value-range filter)."""
+        flags = np.zeros(self.n, dtype=bool)
+        flags[np.asarray(rows, dtype="int64")] = True
+        return Selection(_pack(flags), self.n)
+
+    def select(self, selections=None, present=None):
+        """Rows matching every ``{label column: levels}`` entry (any of the levels).
+
+        ``present`` names numeric columns that must not be missing.
+        """
+        words = self.all().words
+        for column, wanted in (selections or {}).items():
+            bitsets = self.levels[column]
+            either = np.zeros_like(words)
+            for level in wanted:
+                if level in bitsets:
+                    either |= bitsets[level]
+            words = words & either
+        for column in [present] if isinstance(present, str) else present or []:
+            words = words & self.present[column]
+        return Selection(words, self.n)
+
+    def counts(self, column, selection):
+        """{level: selected rows carrying it} for a label column."""
+        return {level: _popcount(bits & selection.words) for level, bits in self.levels[column].items()}
+
+    def stats(self, selection, column, values):
+        """Stats of ``column`` over the selection.
+
+        ``values`` is the full column as the page sees it (raw, winsorized or
+        scenario-adjusted); missing rows are dropped via the present bitset.
+        """
+        return summarize((selection & Selection(self.present[column], self.n)).rows, values)
+
+
+def get_index(snapshot=None):
+    """Filter index for ``snapshot`` (default: current), built once per version."""
+    snapshot = snapshot or data.get_snapshot()
+    with _lock:
+        index = _indexes.get(snapshot.version)
+    metrics.record_cache("filters", index is not None)
+    if index is None:
+        n = snapshot.matrix.shape[0]
+        levels = {}
+        for column, values in snapshot.labels.items():
+            if column == "country":
+                continue
+            levels[column] = {level: _pack(values == level) for level in sorted({v for v in values if v is not None})}
+        present = {
+            column: _pack(~np.isnan(snapshot.matrix[:, j])) for j, column in enumerate(snapshot.numeric_columns)
+        }
+        columns = {column: j for j, column in enumerate(snapshot.numeric_columns)}
+        index = FilterIndex(snapshot.version, n, levels, present, columns)
+        with _lock:
+            if not data.retired(snapshot.version):
+                _indexes[snapshot.version] = index
+    return index
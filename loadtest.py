@@ -0,0 +1,370 @@
+"""Headless load test: N concurrent simulated dashboard sessions in one process.
+
+Each session is a Streamlit ``AppTest`` running ``main.py`` with its own
+session state, driven through a seeded interaction script. Reruns run on
+threads inside this process, as they do inside the Streamlit server. Usage::
+
+    python loadtest.py --sessions 8 --rounds 5
+    python loadtest.py --sessions 16 --rows 20000 --json bench.json
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+PAGES = ["main", "WorldMap", "ComparisonOfCountries", "TopvBottom", "GlobalMetrics"]
+
+
+# --- Memory ---
+
+def rss_bytes():
+    """Resident set size of this process (Linux), or peak RSS elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class _RssSampler(threading.Thread):
+    def __init__(self, interval=0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = rss_bytes()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.peak = max(self.peak, rss_bytes())
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+# --- Interaction scripts ---
+
+def _find(widgets, label):
+    for widget in widgets:
+        if widget.label.startswith(label):
+            return widget
+    return None
+
+
+class Session:
+    """One simulated user: an AppTest plus a seeded random source."""
+
+    def __init__(self, session_id, seed, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.id = session_id
+        self.rng = random.Random(seed)
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.samples = []  # (step, seconds, error)
+
+    def _run(self, step):
+        start = time.perf_counter()
+        self.at.run()
+        self.samples.append((step, time.perf_counter() - start, bool(self.at.exception)))
+
+    def goto(self, page):
+        self.at.query_params["page"] = page
+        self._run(f"switch:{page}")
+
+    def home(self):
+        self.goto("main")
+        hypothesis = self.at.selectbox[0]
+        hypothesis.select_index(self.rng.randrange(len(hypothesis.options)))
+        self._run("main:hypothesis")
+
+    def world_map(self):
+        self.goto("WorldMap")
+        group = _find(self.at.sidebar.radio, "Select indicator category")
+        group.set_value(self.rng.choice(group.options))
+        self._run("WorldMap:group")
+        slider = _find(self.at.sidebar.slider, "Filter by Indicator Value")
+        if slider is not None:
+            lo, hi = sorted(self.rng.uniform(slider.min, slider.max) for _ in range(2))
+            slider.set_value((lo, hi))
+            self._run("WorldMap:slider")
+
+    def comparison(self):
+        self.goto("ComparisonOfCountries")
+        for label in ("Select Country 1", "Select Country 2"):
+            box = _find(self.at.sidebar.selectbox, label)
+            box.set_value(self.rng.choice(box.options))
+            self._run("ComparisonOfCountries:entity")
+
+    def top_bottom(self):
+        self.goto("TopvBottom")
+        view = _find(self.at.sidebar.radio, "📈 Choose Analysis Type")
+        view.set_value(self.rng.choice(view.options))
+        self._run("TopvBottom:view")
+        k = _find(self.at.sidebar.slider, "📌 Select Number of Countries")
+        k.set_value(self.rng.randint(3, 10))
+        self._run("TopvBottom:k")
+
+    def global_metrics(self):
+        self.goto("GlobalMetrics")
+        mode = _find(self.at.sidebar.radio, "Display Mode")
+        mode.set_value(self.rng.choice(mode.options))
+        self._run("GlobalMetrics:mode")
+
+    def play(self, rounds):
+        scripts = [self.home, self.world_map, self.comparison, self.top_bottom, self.global_metrics]
+        for _ in range(rounds):
+            self.rng.shuffle(scripts)
+            for script in scripts:
+                script()
+        return self.samples
+
+
+# --- Import time ---
+
+_IMPORT_MARKER = "qol-loadtest: route render starts"
+_IMPORT_PROBE = """
+import sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({app!r}, default_timeout=120)
+at.query_params["page"] = {page!r}
+sys.stderr.write({marker!r} + "\\n")
+start = time.perf_counter()
+at.run()
+print(time.perf_counter() - start)
+"""
+
+
+def import_times(page, top=8):
+    """Cold first render of ``page`` in a fresh ``python -X importtime`` process.
+
+    Only imports triggered by the render itself are counted (main.py, the
+    page module and whatever they pull in), not the test harness.
+    """
+    probe = _IMPORT_PROBE.format(app=APP_PATH, page=page, marker=_IMPORT_MARKER)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        capture_output=True, text=True, cwd=os.path.dirname(APP_PATH), check=True,
+    )
+    stderr = proc.stderr.split(_IMPORT_MARKER, 1)[1]
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        # Nested imports are indented below the package that triggered them
+        modules.append((name[1:].rstrip(), int(self_us), int(cumulative_us)))
+    top_level = [(name, cumulative) for name, _, cumulative in modules if not name.startswith(" ")]
+    return {
+        "render_ms": float(proc.stdout.split()[-1]) * 1000,
+        "import_ms": sum(cumulative for _, cumulative in top_level) / 1000,
+        "modules": len(modules),
+        "top": sorted(top_level, key=lambda item: -item[1])[:top],
+    }
+
+
+def print_import_report(report):
+    print(f"{'Route (cold, fresh process)':40s} {'Render ms':>10s} {'Import ms':>10s} {'Modules':>8s}")
+    for page, stats in report.items():
+        print(f"{page:40s} {stats['render_ms']:10.0f} {stats['import_ms']:10.0f} {stats['modules']:8d}")
+    for page, stats in report.items():
+        print()
+        print(f"{page}: slowest top-level imports")
+        print(f"{'cumulative [us]':>16s} | imported package")
+        for name, cumulative in stats["top"]:
+            print(f"{cumulative:16d} | {name}")
+
+
+# --- Chart payloads ---
+
+# Allowed JSON bytes per chart: (fixed layout and template bytes, bytes per plotted row).
+# Set about 15% above what the builders produce on the bundled and synthetic datasets.
+PAYLOAD_BUDGETS = {
+    "WorldMap indicator map": (5200, 44),
+    "GlobalMetrics continent bar": (5300, 60),
+    "GlobalMetrics continent sunburst": (5300, 60),
+    "GlobalMetrics country scatter": (5200, 44),
+    "GlobalMetrics country sunburst": (5000, 88),
+}
+
+
+def chart_payloads(snapshot=None):
+    """Payload of each shared chart on ``snapshot`` (default: current), with its ``PAYLOAD_BUDGETS`` budget."""
+    import data
+    import figures
+    import GlobalMetrics
+    import WorldMap
+
+    snapshot = snapshot or data.get_snapshot()
+    continents = sorted(snapshot.frame()["continent"].unique())
+    # Single-continent charts are measured on the largest continent
+    largest = snapshot.frame()["continent"].value_counts().index[0]
+    indicator = "Safety Value"
+    title = indicator.title()
+    color_scale = "RdYlGn"
+
+    world = snapshot.frame()
+    filtered, by_continent = GlobalMetrics.global_view(snapshot, title, continents)
+    countries, by_country = GlobalMetrics.continent_view(snapshot, title, largest)
+    charts = {
+        "WorldMap indicator map": (WorldMap.build_indicator_map(world, indicator, color_scale, False), len(world)),
+        "WorldMap indicator map (log)": (
+            WorldMap.build_indicator_map(world, "Cost of Living Value", color_scale, True), len(world)),
+        "GlobalMetrics continent bar": (figures.continent_bar(by_continent, title, color_scale), len(by_continent)),
+        "GlobalMetrics continent sunburst": (
+            figures.continent_sunburst(by_continent, title, color_scale), len(by_continent)),
+        "GlobalMetrics country scatter": (
+            figures.country_scatter(countries, title, largest, color_scale), len(countries)),
+        "GlobalMetrics country sunburst": (
+            figures.country_sunburst(by_country, title, largest, color_scale), len(by_country)),
+    }
+    report = {}
+    for name, (fig, rows) in charts.items():
+        fixed, per_row = PAYLOAD_BUDGETS[name.replace(" (log)", "")]
+        payload = figures.payload_bytes(fig)
+        report[name] = {"rows": rows, "bytes": payload, "budget": fixed + per_row * rows}
+    return report
+
+
+def print_payload_report(report):
+    print(f"{'Chart':40s} {'Rows':>7s} {'Bytes':>10s} {'Budget':>10s}")
+    for name, stats in report.items():
+        flag = "" if stats["bytes"] <= stats["budget"] else "  OVER BUDGET"
+        print(f"{name:40s} {stats['rows']:7d} {stats['bytes']:10d} {stats['budget']:10d}{flag}")
+
+
+# --- Reporting ---
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+def summarize(samples, wall_seconds, rss_start, rss_end, rss_peak, sessions):
+    latencies = sorted(s for _, s, _ in samples)
+    by_step = {}
+    for step, seconds, _ in samples:
+        by_step.setdefault(step, []).append(seconds)
+    return {
+        "sessions": sessions,
+        "reruns": len(samples),
+        "errors": sum(1 for _, _, error in samples if error),
+        "wall_seconds": wall_seconds,
+        "throughput_rps": len(samples) / wall_seconds if wall_seconds else float("nan"),
+        "latency": {
+            "p50": _percentile(latencies, 0.50),
+            "p95": _percentile(latencies, 0.95),
+            "p99": _percentile(latencies, 0.99),
+            "max": latencies[-1] if latencies else float("nan"),
+        },
+        "steps": {
+            step: {
+                "count": len(values),
+                "p50": _percentile(sorted(values), 0.50),
+                "p95": _percentile(sorted(values), 0.95),
+            }
+            for step, values in sorted(by_step.items())
+        },
+        "memory": {
+            "rss_start_mb": rss_start / 2**20,
+            "rss_end_mb": rss_end / 2**20,
+            "rss_peak_mb": rss_peak / 2**20,
+            "growth_mb": (rss_end - rss_start) / 2**20,
+            "growth_per_session_mb": (rss_end - rss_start) / 2**20 / sessions,
+        },
+    }
+
+
+def print_report(report):
+    lat = report["latency"]
+    mem = report["memory"]
+    print(f"Sessions:    {report['sessions']}")
+    print(f"Reruns:      {report['reruns']} ({report['errors']} with errors) in {report['wall_seconds']:.2f}s")
+    print(f"Throughput:  {report['throughput_rps']:.1f} reruns/s")
+    print(f"Latency:     p50 {lat['p50'] * 1000:.0f} ms | p95 {lat['p95'] * 1000:.0f} ms | "
+          f"p99 {lat['p99'] * 1000:.0f} ms | max {lat['max'] * 1000:.0f} ms")
+    print(f"Memory:      RSS {mem['rss_start_mb']:.0f} -> {mem['rss_end_mb']:.0f} MB "
+          f"(peak {mem['rss_peak_mb']:.0f} MB, +{mem['growth_per_session_mb']:.1f} MB/session)")
+    print()
+    print(f"{'Step':40s} {'Count':>6s} {'p50 ms':>8s} {'p95 ms':>8s}")
+    for step, stats in report["steps"].items():
+        print(f"{step:40s} {stats['count']:6d} {stats['p50'] * 1000:8.0f} {stats['p95'] * 1000:8.0f}")
+
+
+# --- Entry point ---
+
+def run(sessions, rounds, seed=0, timeout=120):
+    """Warm up once, then play ``sessions`` concurrent scripted sessions."""
+    # One untimed pass so imports and the dataset ingest do not count as growth
+    Session(-1, seed, timeout).play(1)
+
+    rss_start = rss_bytes()
+    sampler = _RssSampler()
+    sampler.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        results = list(pool.map(
+            lambda i: Session(i, seed + i + 1, timeout).play(rounds),
+            range(sessions),
+        ))
+    wall = time.perf_counter() - start
+    sampler.stop()
+
+    samples = [sample for result in results for sample in result]
+    return summarize(samples, wall, rss_start, rss_bytes(), sampler.peak, sessions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent dashboard sessions.")
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent simulated sessions")
+    parser.add_argument("--rounds", type=int, default=3, help="Passes over the interaction scripts per session")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rows", type=int, default=0, help="Run against a synthetic dataset with this many rows")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-rerun timeout in seconds")
+    parser.add_argument("--json", default=None, help="Also write the report to this JSON file")
+    parser.add_argument("--import-times", action="store_true",
+                        help="Add a -X importtime report of each route's cold first render")
+    parser.add_argument("--payloads", action="store_true",
+                        help="Add a report of each chart's JSON payload; exits 1 if one is over budget")
+    args = parser.parse_args()
+
+    if args.rows:
+        import synthetic
+        path = os.path.join(tempfile.mkdtemp(prefix="qol_loadtest_"), f"synthetic_{args.rows}.csv")
+        synthetic.generate(args.rows, seed=args.seed).to_csv(path, index=False)
+        # Must be set before the app imports data.py
+        os.environ["QOL_DATA_PATH"] = path
+
+    # Per-rerun deprecation notices from the pages would drown the report
+    logging.disable(logging.WARNING)
+
+    report = {}
+    if args.import_times:
+        report["imports"] = {page: import_times(page) for page in PAGES}
+        print_import_report(report["imports"])
+        print()
+    if args.payloads:
+        report["payloads"] = chart_payloads()
+        print_payload_report(report["payloads"])
+        print()
+    if args.sessions:
+        report.update(run(args.sessions, args.rounds, seed=args.seed, timeout=args.timeout))
+        print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if any(stats["bytes"] > stats["budget"] for stats in report.get("payloads", {}).values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
 import importlib
+import data
+import metrics
 from utils import custom_navigation
 
 
@@ -19,6 +19,16 @@ def main():
     query_params = st.query_params
     page = query_params.get("page", "main")
 
+    # Expose rerun latency, cache and session metrics for scraping
+    metrics.start_server()
+    # Pick up a replaced data file without a restart
+    data.start_watcher()
+
+    with metrics.timed_rerun(page):
+        render_page(page)
+
+
+def render_page(page):
     # Custom navigation
     custom_navigation()
 
@@ -194,15 +204,39 @@ def main():
             st.write("")
             st.write("")
             
-            fig = px.pie(values=[13.16, 15.79, 34.21, 34.21, 2.63 ], names=['Africa', 'Americas', 'Asia', 'Europe', 'Oceania'], 
-                    title='Distribution by Continents', height=250)
-            fig.update_layout(margin=dict(l=20, r=20, t=40, b=20))
+            # Imported here so the home page never loads plotly.express (and with it pandas)
+            import plotly.graph_objects as go
+
+            fig = go.Figure(go.Pie(values=[13.16, 15.79, 34.21, 34.21, 2.63 ], labels=['Africa', 'Americas', 'Asia', 'Europe', 'Oceania']))
+            fig.update_layout(title='Distribution by Continents', height=250, margin=dict(l=20, r=20, t=40, b=20))
             st.plotly_chart(fig, use_container_width=True)
 
 
 
         with tab3:
             st.markdown('<p class="sub-header">Hypothesis Testing</p>', unsafe_allow_html=True)
+
+            # Correlations come from the shared dataset and are cached per dataset version
+            import numpy as np
+            import plotly.graph_objects as go
+            import correlation
+
+            corr = correlation.get_correlations()
+            # st.tabs runs every tab on each render, so the bootstrap must not block the home page
+            intervals = correlation.intervals_if_ready()
+            if intervals is None:
+                st.info("95% confidence intervals are still being computed; showing point estimates for now.")
+                st.button("🔄 Show confidence intervals")  # any click reruns the page
+
+            def correlation_finding(x, y, expected_sign):
+                i, j = corr.columns.index(x), corr.columns.index(y)
+                r = corr.pearson[i, j]
+                if intervals is None:
+                    return r, "95% CI pending", corr.spearman[i, j], r * expected_sign > 0
+                lower, upper = intervals["pearson"][0][i, j], intervals["pearson"][1][i, j]
+                # Supported when the whole confidence interval has the expected sign
+                supported = lower * expected_sign > 0 and upper * expected_sign > 0
+                return r, f"95% CI {lower:.2f} to {upper:.2f}", corr.spearman[i, j], supported
             
             # Interactive hypothesis selection
             hypothesis = st.selectbox(
@@ -212,14 +246,15 @@ def main():
             )
             
             if hypothesis == "H1: Countries with higher Purchasing Power exhibit higher Cost of Living":
+                r, ci, rho, supported = correlation_finding("Purchasing Power Value", "Cost of Living Value", 1)
                 col1, col2 = st.columns([1, 3])
                 
                 with col1:
                     st.markdown('<div class="container"><span class="emoji-icon">💲</span></div>', unsafe_allow_html=True)
                 
                 with col2:
-                    st.markdown("""
-                    **Findings**: Data broadly supports this hypothesis, with a positive correlation (r ~ 0.71) between purchasing power and cost of living.
+                    st.markdown(f"""
+                    **Findings**: {'Data broadly supports' if supported else 'Data does not clearly support'} this hypothesis, with a {'positive' if r > 0 else 'negative'} correlation (r = {r:.2f}, {ci}; Spearman ρ = {rho:.2f}) between purchasing power and cost of living.
                     
                     **Key Insights**:
                     - Wealthier nations generally have higher price levels for goods, services, and housing
@@ -235,14 +270,15 @@ def main():
                 st.markdown('</div>', unsafe_allow_html=True)
                 
             else:
+                r, ci, rho, supported = correlation_finding("Purchasing Power Value", "Pollution Value", -1)
                 col1, col2 = st.columns([1, 3])
                 
                 with col1:
                     st.markdown('<div class="container"><span class="emoji-icon">🏭</span></div>', unsafe_allow_html=True)
                 
                 with col2:
-                    st.markdown("""
-                    **Findings**: Analysis supports this hypothesis, with a negative correlation (r ~ -0.63) between purchasing power and pollution.
+                    st.markdown(f"""
+                    **Findings**: {'Analysis supports' if supported else 'Analysis does not clearly support'} this hypothesis, with a {'negative' if r < 0 else 'positive'} correlation (r = {r:.2f}, {ci}; Spearman ρ = {rho:.2f}) between purchasing power and pollution.
                     
                     **Key Insights**:
                     - European countries generally show higher purchasing power and lower pollution values
@@ -257,6 +293,29 @@ def main():
                 - Rwanda demonstrates low pollution despite limited economic resources due to strong environmental policies
                 """)
                 st.markdown('</div>', unsafe_allow_html=True)
+
+            # --- Correlation Heatmap ---
+            st.markdown('<p class="sub-header">Correlation Matrix</p>', unsafe_allow_html=True)
+            method = st.radio("Correlation method:", ["Pearson", "Spearman"], horizontal=True).lower()
+            labels = [col.replace(' Value', '') for col in corr.columns]
+            if intervals is None:
+                customdata, ci_hover = None, '<br>95% CI pending'
+            else:
+                customdata = np.stack(intervals[method], axis=-1)
+                ci_hover = '<br>95% CI %{customdata[0]:.2f} to %{customdata[1]:.2f}'
+            heatmap = go.Figure(go.Heatmap(
+                z=getattr(corr, method),
+                x=labels,
+                y=labels,
+                zmin=-1,
+                zmax=1,
+                colorscale='RdBu',
+                texttemplate='%{z:.2f}',
+                customdata=customdata,
+                hovertemplate='%{y} vs %{x}<br>r = %{z:.2f}' + ci_hover + '<extra></extra>'
+            ))
+            heatmap.update_layout(height=550, margin=dict(l=20, r=20, t=20, b=20))
+            st.plotly_chart(heatmap, use_container_width=True)
             
             st.markdown('</div>', unsafe_allow_html=True)
 
@@ -0,0 +1,207 @@
+"""In-process Prometheus exporter for rerun latency, cache hit rates and sessions.
+
+The Streamlit server keeps imported modules alive between reruns, so the
+counters below live for the whole server process. ``start_server`` exposes
+them at ``http://127.0.0.1:<port>/metrics`` in the Prometheus text format.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Configuration ---
+METRICS_HOST = os.environ.get("QOL_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("QOL_METRICS_PORT", "9464"))  # 0 disables the exporter
+
+KNOWN_PAGES = ("main", "WorldMap", "ComparisonOfCountries", "TopvBottom", "GlobalMetrics")
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (0.5, 0.95, 0.99)
+RECENT_SAMPLES = 2048  # reruns per page kept for the quantile summary
+SESSION_WINDOW = 300  # seconds a session counts as active after its last rerun
+logger = logging.getLogger(__name__)
+
+# --- State ---
+_lock = threading.Lock()
+_reruns = {}  # page -> {"buckets": [...], "count": int, "sum": float, "recent": deque}
+_cache_lookups = {}  # (cache, "hit" | "miss") -> count
+_sessions = {}  # session id -> (page, last seen)
+_pruned = 0.0  # when _sessions was last cleared of expired sessions
+_server = None
+
+
+def _page_label(page):
+    # Query parameters are user input; keep the label set bounded
+    return page if page in KNOWN_PAGES else "other"
+
+
+def _current_session_id():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return None
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+
+def _prune(now):
+    # Caller holds _lock. Runs at most once per window, so a rerun pays for it rarely,
+    # and only sessions seen in the last two windows are ever kept.
+    global _pruned
+    if now - _pruned < SESSION_WINDOW:
+        return
+    _pruned = now
+    for session_id, (_, seen) in list(_sessions.items()):
+        if now - seen > SESSION_WINDOW:
+            del _sessions[session_id]
+
+
+def observe_rerun(page, seconds, session_id=None):
+    """Record one script rerun of ``page`` that took ``seconds``."""
+    page = _page_label(page)
+    with _lock:
+        series = _reruns.get(page)
+        if series is None:
+            series = _reruns[page] = {
+                "buckets": [0] * len(LATENCY_BUCKETS),
+                "count": 0,
+                "sum": 0.0,
+                "recent": deque(maxlen=RECENT_SAMPLES),
+            }
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                series["buckets"][i] += 1
+        series["count"] += 1
+        series["sum"] += seconds
+        series["recent"].append(seconds)
+        if session_id is not None:
+            now = time.time()
+            _sessions[session_id] = (page, now)
+            _prune(now)
+
+
+def record_cache(cache, hit):
+    """Count a lookup against the named cache."""
+    key = (cache, "hit" if hit else "miss")
+    with _lock:
+        _cache_lookups[key] = _cache_lookups.get(key, 0) + 1
+
+
+@contextmanager
+def timed_rerun(page):
+    """Time the body as one rerun of ``page``, including st.stop() exits."""
+    session_id = _current_session_id()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_rerun(page, time.perf_counter() - start, session_id)
+
+
+def _quantile(sorted_values, q):
+    if not sorted_values:
+        return float("nan")
+    pos = q * (len(sorted_values) - 1)
+    lower = int(pos)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (pos - lower)
+
+
+def render():
+    """Return all metrics in the Prometheus text exposition format."""
+    now = time.time()
+    with _lock:
+        _prune(now)
+        active = {page: 0 for page in _reruns}
+        for page, seen in _sessions.values():
+            if now - seen <= SESSION_WINDOW:
+                active[page] = active.get(page, 0) + 1
+        reruns = {
+            page: (list(s["buckets"]), s["count"], s["sum"], sorted(s["recent"]))
+            for page, s in _reruns.items()
+        }
+        cache_lookups = dict(_cache_lookups)
+
+    lines = [
+        "# HELP qol_rerun_duration_seconds Streamlit script rerun latency per page.",
+        "# TYPE qol_rerun_duration_seconds histogram",
+    ]
+    for page, (buckets, count, total, _) in sorted(reruns.items()):
+        for bound, n in zip(LATENCY_BUCKETS, buckets):
+            lines.append(f'qol_rerun_duration_seconds_bucket{{page="{page}",le="{bound}"}} {n}')
+        lines.append(f'qol_rerun_duration_seconds_bucket{{page="{page}",le="+Inf"}} {count}')
+        lines.append(f'qol_rerun_duration_seconds_sum{{page="{page}"}} {total:.6f}')
+        lines.append(f'qol_rerun_duration_seconds_count{{page="{page}"}} {count}')
+
+    lines += [
+        f"# HELP qol_rerun_latency_seconds Rerun latency quantiles over the last {RECENT_SAMPLES} reruns per page.",
+        "# TYPE qol_rerun_latency_seconds summary",
+    ]
+    for page, (_, count, total, recent) in sorted(reruns.items()):
+        for q in QUANTILES:
+            lines.append(f'qol_rerun_latency_seconds{{page="{page}",quantile="{q}"}} {_quantile(recent, q):.6f}')
+        lines.append(f'qol_rerun_latency_seconds_sum{{page="{page}"}} {total:.6f}')
+        lines.append(f'qol_rerun_latency_seconds_count{{page="{page}"}} {count}')
+
+    lines += [
+        "# HELP qol_cache_requests_total Cache lookups by cache and result.",
+        "# TYPE qol_cache_requests_total counter",
+    ]
+    for (cache, result), n in sorted(cache_lookups.items()):
+        lines.append(f'qol_cache_requests_total{{cache="{cache}",result="{result}"}} {n}')
+
+    lines += [
+        "# HELP qol_cache_hit_ratio Share of cache lookups that were hits.",
+        "# TYPE qol_cache_hit_ratio gauge",
+    ]
+    for cache in sorted({cache for cache, _ in cache_lookups}):
+        hits = cache_lookups.get((cache, "hit"), 0)
+        misses = cache_lookups.get((cache, "miss"), 0)
+        lines.append(f'qol_cache_hit_ratio{{cache="{cache}"}} {hits / (hits + misses):.6f}')
+
+    lines += [
+        f"# HELP qol_active_sessions Sessions whose last rerun on the page was within {SESSION_WINDOW}s.",
+        "# TYPE qol_active_sessions gauge",
+    ]
+    for page, n in sorted(active.items()):
+        lines.append(f'qol_active_sessions{{page="{page}"}} {n}')
+
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would otherwise flood the server log
+        pass
+
+
+def start_server(host=METRICS_HOST, port=METRICS_PORT):
+    """Start the exporter thread once per process; later calls are no-ops."""
+    global _server
+    if port == 0:
+        return None
+    with _lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as exc:
+                # Another worker on this host already owns the port
+                logger.info("Metrics exporter not started on %s:%s: %s", host, port, exc)
+                _server = False
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="qol-metrics", daemon=True).start()
+    return _server or None
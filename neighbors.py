@@ -0,0 +1,91 @@
+"""k-nearest-neighbour index over the standardized indicator vectors.
+
+Each entity is a float32 vector of its z-scored indicators (missing values
+sit at the mean). Queries are a blocked brute force: squared distances come
+from one matrix product per block of entities, and a running top-k is kept
+with argpartition. At city-level scale (tens of thousands of rows, nine
+dimensions) that answers in milliseconds without a tree structure.
+"""
+import threading
+
+import numpy as np
+
+import data
+import metrics
+
+BLOCK_ROWS = 32768  # entities per distance block; bounds memory at queries x BLOCK_ROWS floats
+
+_lock = threading.Lock()
+_indexes = {}  # dataset version -> NeighborIndex
+data.on_swap(lambda version: data.evict(_lock, _indexes, version))
+
+
+class NeighborIndex:
+    """Standardized vectors plus squared norms for one dataset version."""
+
+    def __init__(self, version, names, vectors):
+        self.version = version
+        self.names = names
+        self.rows = {name: i for i, name in enumerate(names)}
+        self.vectors = vectors
+        self.sq_norms = np.einsum("ij,ij->i", vectors, vectors)
+
+    def query(self, rows, k):
+        """Return (neighbour rows, distances), each shaped (len(rows), k), nearest first.
+
+        The query rows themselves are excluded from their own results.
+        """
+        rows = np.atleast_1d(np.asarray(rows))
+        k = min(k, len(self.names) - 1)
+        queries = self.vectors[rows]
+        best_d = np.full((rows.size, 0), np.inf, dtype="float32")
+        best_i = np.empty((rows.size, 0), dtype="int64")
+
+        for start in range(0, len(self.names), BLOCK_ROWS):
+            block = self.vectors[start:start + BLOCK_ROWS]
+            d = self.sq_norms[start:start + BLOCK_ROWS] - 2.0 * (queries @ block.T) + self.sq_norms[rows, None]
+            own = (rows >= start) & (rows < start + len(block))
+            d[np.flatnonzero(own), rows[own] - start] = np.inf
+
+            # Merge this block's candidates into the running top-k
+            cand_d = np.concatenate([best_d, d], axis=1)
+            cand_i = np.concatenate([best_i, np.broadcast_to(np.arange(start, start + len(block)), d.shape)], axis=1)
+            keep = np.argpartition(cand_d, k - 1, axis=1)[:, :k] if cand_d.shape[1] > k else np.argsort(cand_d, axis=1)
+            best_d = np.take_along_axis(cand_d, keep, axis=1)
+            best_i = np.take_along_axis(cand_i, keep, axis=1)
+
+        order = np.argsort(best_d, axis=1, kind="stable")
+        distances = np.sqrt(np.maximum(np.take_along_axis(best_d, order, axis=1), 0.0))
+        return np.take_along_axis(best_i, order, axis=1), distances
+
+    def similar(self, name, k):
+        """[(name, distance)] for the k entities nearest to ``name``."""
+        neighbours, distances = self.query([self.rows[name]], k)
+        return [(self.names[i], float(d)) for i, d in zip(neighbours[0], distances[0])]
+
+
+def _standardize(matrix):
+    X = np.array(matrix, dtype="float64")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean, std = np.nanmean(X, axis=0), np.nanstd(X, axis=0)
+        Z = (X - mean) / np.where(std > 0, std, 1.0)
+    return np.ascontiguousarray(np.nan_to_num(Z, nan=0.0), dtype="float32")
+
+
+def get_index(snapshot=None):
+    """Neighbour index for ``snapshot`` (default: current), built once per version."""
+    snapshot = snapshot or data.get_snapshot()
+    with _lock:
+        index = _indexes.get(snapshot.version)
+    metrics.record_cache("neighbors", index is not None)
+    if index is None:
+        value_columns = [i for i, col in enumerate(snapshot.numeric_columns) if col.endswith("Value")]
+        index = NeighborIndex(
+            snapshot.version,
+            list(snapshot.labels["country"]),
+            _standardize(snapshot.matrix[:, value_columns]),
+        )
+        with _lock:
+            if not data.retired(snapshot.version):
+                _indexes[snapshot.version] = index
+    return index
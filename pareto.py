@@ -0,0 +1,73 @@
+"""Pareto fronts over several indicators (efficient non-dominated sort).
+
+Indicators are first oriented so that higher is always better. Entities are
+then visited in lexicographic order, so nothing later can dominate anything
+earlier. Each one goes into the first front that has no member dominating it.
+Because dominance is transitive, "some member of front k dominates it" only
+holds for a prefix of the fronts, so that front is found by binary search
+(ENS-BS). Each check compares the entity against a whole front in one
+vectorized step, with no pairwise Python loops.
+"""
+import numpy as np
+
+import data
+
+
+def objectives(snapshot, columns, rows=None):
+    """Oriented (rows, columns) matrix of ``snapshot``'s published values."""
+    idx = [snapshot.numeric_columns.index(col) for col in columns]
+    return orient(snapshot.matrix[:, idx] if rows is None else snapshot.matrix[np.asarray(rows)][:, idx], columns)
+
+
+def orient(X, columns):
+    """Copy of the values ``X`` of ``columns`` with higher better and missing values ranked worst."""
+    X = np.array(X, dtype="float64")
+    lower_is_better = np.array([data.INDICATOR_POLARITY.get(col) == "lower_is_better" for col in columns])
+    X[:, lower_is_better] *= -1
+    return np.where(np.isnan(X), -np.inf, X)
+
+
+class _Front:
+    """Growable member buffer for one front."""
+
+    def __init__(self, width):
+        self.values = np.empty((8, width))
+        self.size = 0
+
+    def add(self, y):
+        if self.size == len(self.values):
+            self.values = np.concatenate([self.values, np.empty_like(self.values)])
+        self.values[self.size] = y
+        self.size += 1
+
+    def dominates(self, y):
+        members = self.values[:self.size]
+        # Weakly better everywhere, and not an exact duplicate
+        candidates = members[(members >= y).all(axis=1)]
+        return bool(candidates.size) and bool((candidates != y).any())
+
+
+def fronts(Y):
+    """Front number (0 = non-dominated) of each row of ``Y`` (higher is better)."""
+    Y = np.asarray(Y, dtype="float64")
+    n = len(Y)
+    depth = np.empty(n, dtype="int64")
+    if n == 0:
+        return depth
+    # Lexicographic order, best first: the first objective is the primary key
+    order = np.lexsort(-Y.T[::-1])
+    found = []
+    for i in order:
+        y = Y[i]
+        lo, hi = 0, len(found)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if found[mid].dominates(y):
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == len(found):
+            found.append(_Front(Y.shape[1]))
+        found[lo].add(y)
+        depth[i] = lo
+    return depth
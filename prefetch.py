@@ -0,0 +1,71 @@
+"""Background prefetch of likely-next figures into the shared figure cache.
+
+After a page renders it can hand over ``(key, build)`` pairs for the views a
+user is likely to open next, e.g. the neighbouring indicators of the same
+group. They are built on a small thread pool. Work is capped in
+two ways: at most ``MAX_PENDING`` builds are queued or running, and nothing
+more is prefetched while entries the prefetcher added, and no page has
+read yet, hold more than ``MEMORY_SHARE`` of the figure cache's byte
+budget. Speculative entries therefore never crowd out requested ones, and
+prefetching keeps running when the cache is full of requested views.
+Set ``QOL_PREFETCH=0`` to disable.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import figcache
+
+ENABLED = os.environ.get("QOL_PREFETCH", "1") != "0"
+WORKERS = int(os.environ.get("QOL_PREFETCH_WORKERS", "2"))
+MAX_PENDING = int(os.environ.get("QOL_PREFETCH_PENDING", "8"))
+MEMORY_SHARE = float(os.environ.get("QOL_PREFETCH_MEMORY_SHARE", "0.5"))
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pool = None
+_pending = set()
+
+
+def _get_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="qol-prefetch")
+        return _pool
+
+
+def _run(key, build):
+    try:
+        figcache.fill(key, build)
+    except Exception as exc:
+        # Best effort: a failed prefetch only means the view is built on demand
+        logger.warning("Prefetch of %s failed: %s", key[0], exc)
+    finally:
+        with _lock:
+            _pending.discard(key)
+
+
+def schedule(tasks):
+    """Queue ``(key, build)`` pairs not cached or in flight; returns how many were queued."""
+    if not ENABLED:
+        return 0
+    queued = 0
+    for key, build in tasks:
+        if figcache.contains(key):
+            continue
+        if figcache.prefetched_bytes() > MEMORY_SHARE * figcache.MAX_BYTES:
+            break
+        with _lock:
+            if key in _pending or len(_pending) >= MAX_PENDING:
+                continue
+            _pending.add(key)
+        _get_pool().submit(_run, key, build)
+        queued += 1
+    return queued
+
+
+def pending():
+    with _lock:
+        return len(_pending)
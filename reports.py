@@ -0,0 +1,164 @@
+"""Offline report pack: every indicator's charts and rankings, for every continent.
+
+For each numeric indicator and each continent (plus all continents
+together) this renders the WorldMap indicator map and the top/bottom
+ranking table. For the all-continents case it also renders the
+GlobalMetrics continent bar chart. Each artifact is written as a
+standalone HTML page, as JSON, or as both. The combinations are rendered
+in parallel on the shared process pool, one task per (indicator,
+continent). Workers read the dataset from the same memory-mapped cache as
+the dashboard, so the data is ingested at most once. The charts come from
+the page builders, so the artifacts match what the dashboard shows.
+
+    python reports.py --out reports [--format html|json|both] [--k 10] [--workers 4]
+
+The output directory gets an ``index.html`` linking every artifact and a
+``manifest.json`` with the dataset version and per-task timings. HTML
+pages share one ``plotly.min.js`` in the same directory and work offline.
+"""
+import argparse
+import json
+import os
+import re
+import time
+
+import data
+import filters
+import workers
+
+ALL = "All continents"
+DEFAULT_K = 10
+COLOR_SCALES = {"higher_is_better": "RdYlGn", "lower_is_better": "RdYlGn_r"}
+
+
+def slug(name):
+    return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+
+
+def top_bottom_table(snapshot, indicator, continents, k):
+    """Top and bottom ``k`` entities of ``indicator`` within ``continents``, as TopvBottom ranks them."""
+    import pandas as pd
+
+    import composite
+
+    rows = filters.get_index(snapshot).select({"continent": continents}, present=indicator).rows
+    values = snapshot.matrix[:, snapshot.numeric_columns.index(indicator)]
+    countries, labels = snapshot.labels["country"], snapshot.labels["continent"]
+    records = []
+    for order, largest in (("top", True), ("bottom", False)):
+        for rank, row in enumerate(composite.top_k(values, rows, k, largest=largest), start=1):
+            records.append({
+                "order": order, "rank": rank, "country": countries[row],
+                "continent": labels[row], indicator: round(float(values[row]), 2),
+            })
+    return pd.DataFrame(records)
+
+
+def _write_figure(fig, path, formats):
+    written = []
+    if "html" in formats:
+        fig.write_html(path + ".html", include_plotlyjs="directory")
+        written.append(path + ".html")
+    if "json" in formats:
+        with open(path + ".json", "w") as f:
+            f.write(fig.to_json())
+        written.append(path + ".json")
+    return written
+
+
+def _write_table(table, title, path, formats):
+    written = []
+    if "html" in formats:
+        with open(path + ".html", "w") as f:
+            f.write(f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{title}</title></head>"
+                    f"<body><h1>{title}</h1>{table.to_html(index=False)}</body></html>")
+        written.append(path + ".html")
+    if "json" in formats:
+        table.to_json(path + ".json", orient="records", indent=1)
+        written.append(path + ".json")
+    return written
+
+
+def render(indicator, continent, out_dir, formats, k):
+    """Render every artifact of one (indicator, continent); runs in a worker process."""
+    # Page modules are imported here so the parent process only needs the data layer
+    import GlobalMetrics
+    import WorldMap
+
+    start = time.perf_counter()
+    snapshot = data.get_snapshot()
+    continents = sorted(filters.get_index(snapshot).levels["continent"]) if continent == ALL else [continent]
+    stem = os.path.join(out_dir, f"{slug(indicator)}--{slug(continent)}")
+
+    _, build_map = WorldMap.indicator_map_task(snapshot, indicator, continents, False, True, COLOR_SCALES)
+    written = _write_figure(build_map(), stem + "--map", formats)
+    if continent == ALL:
+        (_, build_bar), _ = GlobalMetrics.global_charts(snapshot, indicator.title(), continents, False, COLOR_SCALES)
+        written += _write_figure(build_bar(), stem + "--continents", formats)
+    table = top_bottom_table(snapshot, indicator, continents, k)
+    written += _write_table(table, f"Top and bottom {k}: {indicator} ({continent})", stem + "--top-bottom", formats)
+    return [os.path.basename(path) for path in written], time.perf_counter() - start
+
+
+def _write_index(out_dir, manifest):
+    links = "".join(
+        f"<li>{task['indicator']} / {task['continent']}: "
+        + ", ".join(f"<a href='{name}'>{name.split('--')[-1]}</a>" for name in task["artifacts"])
+        + "</li>"
+        for task in manifest["tasks"]
+    )
+    with open(os.path.join(out_dir, "index.html"), "w") as f:
+        f.write(f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>Quality of Life report pack</title></head>"
+                f"<body><h1>Quality of Life report pack</h1><p>Dataset version {manifest['version']}</p>"
+                f"<ul>{links}</ul></body></html>")
+
+
+def generate(out_dir, formats=("html", "json"), k=DEFAULT_K, indicators=None):
+    """Render the full pack into ``out_dir`` and return its manifest."""
+    os.makedirs(out_dir, exist_ok=True)
+    # Ingest (or open) the cached dataset once here; workers then only map the files
+    snapshot = data.get_snapshot()
+    indicators = indicators or snapshot.numeric_columns
+    continents = [ALL] + sorted(filters.get_index(snapshot).levels["continent"])
+    combinations = [(indicator, continent) for indicator in indicators for continent in continents]
+
+    start = time.perf_counter()
+    results = workers.map_chunks(
+        render, [(indicator, continent, out_dir, tuple(formats), k) for indicator, continent in combinations]
+    )
+    manifest = {
+        "version": snapshot.version,
+        "workers": workers.MAX_WORKERS,
+        "seconds": round(time.perf_counter() - start, 3),
+        "tasks": [
+            {"indicator": indicator, "continent": continent, "artifacts": artifacts, "seconds": round(seconds, 3)}
+            for (indicator, continent), (artifacts, seconds) in zip(combinations, results)
+        ],
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=1)
+    _write_index(out_dir, manifest)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render every indicator and continent to static HTML/JSON.")
+    parser.add_argument("--out", default="reports", help="Output directory")
+    parser.add_argument("--format", choices=["html", "json", "both"], default="both")
+    parser.add_argument("--k", type=int, default=DEFAULT_K, help="Rows in each top and bottom table")
+    parser.add_argument("--workers", type=int, default=workers.MAX_WORKERS, help="Worker processes")
+    parser.add_argument("--indicators", nargs="*", default=None, help="Only these indicators (default: all)")
+    args = parser.parse_args()
+
+    workers.MAX_WORKERS = args.workers  # read when the pool starts
+    formats = ("html", "json") if args.format == "both" else (args.format,)
+    manifest = generate(args.out, formats, args.k, args.indicators)
+    artifacts = sum(len(task["artifacts"]) for task in manifest["tasks"])
+    busy = sum(task["seconds"] for task in manifest["tasks"])
+    print(f"Wrote {artifacts} artifacts for {len(manifest['tasks'])} combinations to {args.out}/ "
+          f"in {manifest['seconds']:.1f}s with {manifest['workers']} worker(s) "
+          f"({busy:.1f}s of rendering, {busy / max(manifest['seconds'], 1e-9):.1f}x parallel)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Case-insensitive substring search over country and continent names.
+
+Every lowercased country name is indexed once per dataset version by all
+of its 1-, 2- and 3-grams. A query of up to three characters is a single
+posting-list lookup. Longer queries intersect the posting lists of their
+trigrams, rarest first, and then confirm the few surviving candidates
+with a real substring check. Continent names are matched directly against
+the handful of continent levels and expanded through the bitset filters.
+Recent queries are memoized, since a typed query is re-run on every rerun
+of the page until it changes.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import data
+import filters
+import metrics
+
+GRAM = 3
+MAX_CACHED_QUERIES = 256
+
+_lock = threading.Lock()
+_indexes = {}  # dataset version -> SearchIndex
+data.on_swap(lambda version: data.evict(_lock, _indexes, version))
+
+
+class SearchIndex:
+    """N-gram index over the entity names of one dataset version."""
+
+    def __init__(self, snapshot):
+        self.names = [str(name).lower() for name in snapshot.labels["country"]]
+        self.n = len(self.names)
+        self.filters = filters.get_index(snapshot)
+        postings = {}
+        for row, name in enumerate(self.names):
+            grams = {name[i:i + size] for size in range(1, GRAM + 1) for i in range(len(name) - size + 1)}
+            for gram in grams:
+                postings.setdefault(gram, []).append(row)
+        self.postings = {gram: np.array(rows, dtype="int32") for gram, rows in postings.items()}
+        self._lock = threading.Lock()
+        self._queries = OrderedDict()  # query -> boolean row mask
+
+    def _country_rows(self, query):
+        if len(query) <= GRAM:
+            return self.postings.get(query, np.empty(0, dtype="int32"))
+        lists = sorted(
+            (self.postings.get(query[i:i + GRAM]) for i in range(len(query) - GRAM + 1)),
+            key=lambda rows: -1 if rows is None else len(rows)
+        )
+        if lists[0] is None:
+            return np.empty(0, dtype="int32")
+        candidates = lists[0]
+        for rows in lists[1:]:
+            if len(candidates) == 0:
+                break
+            candidates = np.intersect1d(candidates, rows, assume_unique=True)
+        # Shared trigrams are necessary, not sufficient: "abcxbcd" has every trigram of "abcd"
+        return np.array([row for row in candidates if query in self.names[row]], dtype="int32")
+
+    def mask(self, query):
+        """Boolean mask over snapshot rows whose country or continent contains ``query``."""
+        query = query.lower()
+        with self._lock:
+            cached = self._queries.get(query)
+            if cached is not None:
+                self._queries.move_to_end(query)
+        if cached is not None:
+            return cached
+
+        matched = np.zeros(self.n, dtype=bool)
+        matched[self._country_rows(query)] = True
+        continents = [level for level in self.filters.levels["continent"] if query in level.lower()]
+        if continents:
+            matched[self.filters.select({"continent": continents}).rows] = True
+        matched.flags.writeable = False
+        with self._lock:
+            self._queries[query] = matched
+            while len(self._queries) > MAX_CACHED_QUERIES:
+                self._queries.popitem(last=False)
+        return matched
+
+
+def get_index(snapshot=None):
+    """Search index for ``snapshot`` (default: current), built once per version."""
+    snapshot = snapshot or data.get_snapshot()
+    with _lock:
+        index = _indexes.get(snapshot.version)
+    metrics.record_cache("search", index is not None)
+    if index is None:
+        index = SearchIndex(snapshot)
+        with _lock:
+            if not data.retired(snapshot.version):
+                _indexes[snapshot.version] = index
+    return index
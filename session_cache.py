@@ -0,0 +1,72 @@
+"""Per-session memo of derived views (filters, groupbys, melts) across reruns.
+
+Toggling a widget back to an earlier state reruns the whole page script;
+keeping the recent derived frames in ``st.session_state`` makes that free.
+The memo is a small LRU bounded by entry count and by DataFrame bytes,
+including the strings held by object and string columns.
+"""
+import os
+from collections import OrderedDict
+
+import pandas as pd
+import streamlit as st
+
+import metrics
+
+SESSION_KEY = "_derived_views"
+MAX_ENTRIES = int(os.environ.get("QOL_SESSION_CACHE_ENTRIES", "64"))
+MAX_BYTES = int(os.environ.get("QOL_SESSION_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+
+def _freeze(value):
+    # Widget values arrive as lists; keys must be hashable
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, set):
+        return tuple(sorted(value))
+    return value
+
+
+def _nbytes(value):
+    # deep: without it, string columns count only their 8-byte pointers
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, tuple):
+        return sum(_nbytes(v) for v in value)
+    return 0
+
+
+def _detach(value):
+    # Shallow copies let callers add columns without altering the memoized frame
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=False)
+    if isinstance(value, tuple):
+        return tuple(_detach(v) for v in value)
+    return value
+
+
+def memo(name, params, compute):
+    """Return ``compute()`` memoized for this session under ``(name, params)``.
+
+    ``params`` must capture every input of ``compute``, including the dataset
+    version the source frame came from.
+    """
+    views = st.session_state.setdefault(SESSION_KEY, OrderedDict())
+    key = (name, _freeze(params))
+    entry = views.get(key)
+    metrics.record_cache("session_views", entry is not None)
+    if entry is not None:
+        views.move_to_end(key)
+        return _detach(entry[0])
+
+    value = compute()
+    views[key] = (value, _nbytes(value))
+    total = sum(size for _, size in views.values())
+    while len(views) > 1 and (len(views) > MAX_ENTRIES or total > MAX_BYTES):
+        _, (_, size) = views.popitem(last=False)
+        total -= size
+    return _detach(value)
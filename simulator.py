@@ -0,0 +1,111 @@
+"""What-if scenarios recomputed through Numbeo's Quality of Life formula.
+
+Numbeo derives the Quality of Life index linearly from the components:
+
+    max(0, 100 + purchasing_power / 2.5 - property_price_to_income
+           - cost_of_living / 10 + safety / 2 + health_care / 2.5
+           - traffic_commute_time / 2 - pollution * 2 / 3 + climate / 3)
+
+This reproduces the shipped values to within rounding (+/- 0.015).
+A scenario is a list of ``(indicator, continents, percent change)``
+adjustments. Applying a new scenario only rewrites the rows whose
+adjustments changed. Their index moves from the published value by the
+formula's change, so rows no adjustment covers keep exactly the published
+value. Published values clipped at 0 hide how far below 0 the formula
+was, so those rows start from the formula's unclipped value instead.
+"""
+from collections import Counter
+
+import numpy as np
+
+import filters
+
+QUALITY = "Quality of Life Value"
+BASE = 100.0
+COEFFICIENTS = {
+    "Purchasing Power Value": 1 / 2.5,
+    "Property Price to Income Value": -1.0,
+    "Cost of Living Value": -1 / 10,
+    "Safety Value": 1 / 2,
+    "Health Care Value": 1 / 2.5,
+    "Traffic Commute Time Value": -1 / 2,
+    "Pollution Value": -2 / 3,
+    "Climate Value": 1 / 3,
+}
+
+
+def linear(components):
+    """The formula before clipping at 0, from ``{indicator: values}`` for every component."""
+    return BASE + sum(coefficient * np.asarray(components[col]) for col, coefficient in COEFFICIENTS.items())
+
+
+def formula(components):
+    """Quality of Life from ``{indicator: values}`` for every component."""
+    return np.maximum(linear(components), 0.0)
+
+
+def describe(adjustment):
+    indicator, continents, percent = adjustment
+    return f"{indicator.replace(' Value', '')} {percent:+g}% in {', '.join(continents)}"
+
+
+def simulate(snapshot, scenario, state, robust=False):
+    """Apply ``scenario`` and return ``{column: values}`` for every column it changes.
+
+    ``state`` is a dict the caller keeps between reruns (e.g. in session
+    state). It holds the last scenario and its arrays, so a new scenario
+    only rewrites the rows its added or removed adjustments cover.
+    """
+    scenario = tuple((col, tuple(continents), float(percent)) for col, continents, percent in scenario)
+    key = (snapshot.version, robust)
+    if state.get("key") != key:
+        state.clear()
+        state.update(key=key, scenario=(), values={})
+    if scenario == state["scenario"]:
+        return state["values"]
+
+    matrix = snapshot.winsorized if robust else snapshot.matrix
+    position = {col: j for j, col in enumerate(snapshot.numeric_columns)}
+    index = filters.get_index(snapshot)
+
+    # Rows covered by adjustments that were added or removed since the last scenario
+    old, new = Counter(state["scenario"]), Counter(scenario)
+    changed = (old - new) + (new - old)
+    rows = index.from_rows([])
+    for _, continents, _ in changed:
+        rows = rows | index.select({"continent": continents})
+    rows = rows.rows
+
+    values = state["values"]
+    touched = {col for col, _, _ in changed}
+    for col in touched:
+        base = matrix[rows, position[col]]
+        factor = np.ones(rows.size)
+        for indicator, continents, percent in scenario:
+            if indicator == col:
+                factor[np.isin(rows, index.select({"continent": continents}).rows)] *= 1 + percent / 100
+        if col not in values:
+            values[col] = np.array(matrix[:, position[col]])
+        values[col][rows] = base * factor
+
+    # Quality moves by the formula's change on the affected rows only
+    if QUALITY not in values:
+        values[QUALITY] = np.array(matrix[:, position[QUALITY]])
+    published = matrix[rows, position[QUALITY]]
+    start = np.where(published > 0, published, linear({col: matrix[rows, position[col]] for col in COEFFICIENTS}))
+    shift = sum(
+        COEFFICIENTS[col] * (values[col][rows] - matrix[rows, position[col]])
+        for col in values if col in COEFFICIENTS
+    )
+    values[QUALITY][rows] = np.maximum(start + shift, 0.0)
+
+    state["scenario"] = scenario
+    return values
+
+
+def apply(df, values, rename=lambda col: col):
+    """Shallow copy of ``df`` with the scenario's columns replaced."""
+    df = df.copy(deep=False)
+    for col, column_values in values.items():
+        df[rename(col)] = column_values
+    return df
@@ -0,0 +1,133 @@
+"""Mergeable summary sketches per (indicator, continent).
+
+A sketch holds running moments (count, mean, sum of squared deviations,
+min and max with their rows) plus a t-digest of the values. Sketches for
+any set of continents merge in O(centroids) instead of rescanning rows,
+so the statistics and colour ranges for a continent filter come from a
+handful of small arrays. Below ``COMPRESSION`` values a digest keeps every
+value as its own centroid, so quantiles are exact at country scale.
+"""
+import threading
+
+import numpy as np
+
+import data
+import metrics
+
+COMPRESSION = 200  # t-digest delta: more centroids, tighter quantiles
+
+_lock = threading.Lock()
+_sketches = {}  # (dataset version, robust) -> {(column, continent): Sketch}
+data.on_swap(lambda version: data.evict(_lock, _sketches, version, lambda key: key[0]))
+
+
+class Sketch:
+    """Moments and t-digest centroids for one group of values."""
+
+    def __init__(self, n, mean, m2, lo, hi, lo_row, hi_row, means, weights):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+        self.min = lo
+        self.max = hi
+        self.min_row = lo_row
+        self.max_row = hi_row
+        self.means = means      # centroid means, ascending
+        self.weights = weights  # values per centroid
+
+    @classmethod
+    def from_values(cls, values, rows):
+        values = np.asarray(values, dtype="float64")
+        keep = ~np.isnan(values)
+        values, rows = values[keep], np.asarray(rows)[keep]
+        if values.size == 0:
+            return cls(0, 0.0, 0.0, np.nan, np.nan, None, None, values, values)
+        lo, hi = values.argmin(), values.argmax()
+        mean = values.mean()
+        means, weights = _compress(values, np.ones_like(values))
+        return cls(
+            values.size, mean, float(((values - mean) ** 2).sum()),
+            values[lo], values[hi], rows[lo], rows[hi], means, weights,
+        )
+
+    @classmethod
+    def merge(cls, sketches):
+        sketches = [s for s in sketches if s.n]
+        if not sketches:
+            return cls.from_values([], [])
+        n = np.array([s.n for s in sketches], dtype="float64")
+        means = np.array([s.mean for s in sketches])
+        total = n.sum()
+        mean = float((n * means).sum() / total)
+        m2 = float(sum(s.m2 for s in sketches) + (n * (means - mean) ** 2).sum())
+        lo = min(sketches, key=lambda s: s.min)
+        hi = max(sketches, key=lambda s: s.max)
+        centroids, weights = _compress(
+            np.concatenate([s.means for s in sketches]),
+            np.concatenate([s.weights for s in sketches]),
+        )
+        return cls(int(total), mean, m2, lo.min, hi.max, lo.min_row, hi.max_row, centroids, weights)
+
+    def std(self, ddof=1):
+        return float(np.sqrt(self.m2 / (self.n - ddof))) if self.n > ddof else np.nan
+
+    def quantile(self, q, transform=None):
+        """Quantile(s) ``q`` with pandas' linear interpolation.
+
+        ``transform`` is an optional monotone increasing function (e.g.
+        ``np.log``) applied to the centroids first; quantiles commute with
+        such transforms, so one digest answers both raw and log scales.
+        """
+        if self.n == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        # Centre of each centroid on the 0..n-1 rank axis, pinned to the exact extremes
+        centres = np.cumsum(self.weights) - (self.weights + 1) / 2
+        ranks = np.concatenate([[0.0], centres, [self.n - 1.0]])
+        values = np.concatenate([[self.min], self.means, [self.max]])
+        if transform is not None:
+            values = transform(values)
+        return np.interp(np.asarray(q) * (self.n - 1), ranks, values)
+
+
+def _compress(means, weights):
+    order = np.argsort(means, kind="stable")
+    means, weights = means[order], weights[order]
+    if means.size <= COMPRESSION:
+        return means, weights
+    # k1 scale function: every centroid spans at most one unit of k(q)
+    total = weights.sum()
+    q = (np.cumsum(weights) - weights / 2) / total
+    bucket = np.floor(COMPRESSION / (2 * np.pi) * np.arcsin(2 * q - 1)).astype("int64")
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    merged_weights = np.add.reduceat(weights, starts)
+    merged_means = np.add.reduceat(means * weights, starts) / merged_weights
+    return merged_means, merged_weights
+
+
+def get_sketches(snapshot=None, robust=False):
+    """{(column, continent): Sketch} for every numeric column, cached per version.
+
+    ``robust`` sketches the snapshot's winsorized matrix instead of the raw one.
+    """
+    snapshot = snapshot or data.get_snapshot()
+    with _lock:
+        cached = _sketches.get((snapshot.version, robust))
+    metrics.record_cache("sketches", cached is not None)
+    if cached is None:
+        matrix = snapshot.winsorized if robust else snapshot.matrix
+        continents = np.asarray(snapshot.labels["continent"])
+        cached = {}
+        for continent in np.unique(continents):
+            rows = np.flatnonzero(continents == continent)
+            for j, column in enumerate(snapshot.numeric_columns):
+                cached[(column, continent)] = Sketch.from_values(matrix[rows, j], rows)
+        with _lock:
+            if not data.retired(snapshot.version):
+                _sketches[(snapshot.version, robust)] = cached
+    return cached
+
+
+def summarize(column, continents, snapshot=None, robust=False):
+    """Merged sketch of ``column`` over the given continents."""
+    sketches = get_sketches(snapshot, robust)
+    return Sketch.merge([sketches[(column, c)] for c in continents if (column, c) in sketches])
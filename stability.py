@@ -0,0 +1,150 @@
+"""Rank stability of top-k lists under measurement noise.
+
+Crowd-sourced indices are noisy, so each indicator value is perturbed with
+multiplicative Gaussian noise thousands of times. The entities are ranked
+again in every draw. Draws run in fixed-size chunks on the shared process
+pool (seeded per chunk, so results do not depend on the worker count) and
+are cached per (dataset version, indicator, continent, k, direction, noise,
+scenario) in a small LRU bounded by entry count and by array bytes.
+Results are also kept in ``diskstore``, shared with other processes.
+Every entity gets its probability of staying in the top k and its mean
+rank. Full rank histograms are kept only for the entities ranked best at
+baseline (the "watch" set), so memory stays linear in the entity count.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import data
+import diskstore
+import filters
+import metrics
+import workers
+
+SAMPLES = 2000
+CHUNK = 250  # draws per pool task
+BATCH = 50  # draws ranked together in one vectorized argsort
+NOISE = 0.05  # default relative standard deviation of the perturbation
+MAX_ENTRIES = int(os.environ.get("QOL_STABILITY_CACHE_ENTRIES", "64"))
+MAX_BYTES = int(os.environ.get("QOL_STABILITY_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+_lock = threading.Lock()
+# (version, indicator, continent, k, largest, noise, samples, seed, scenario) -> Stability, oldest first
+_results = OrderedDict()
+data.on_swap(lambda version: data.evict(_lock, _results, version, lambda key: key[0]))
+
+
+class Stability:
+    """Rank distribution summary for one top-k list."""
+
+    def __init__(self, rows, baseline_rank, top_probability, mean_rank, watch, histograms, samples):
+        self.rows = rows  # snapshot rows that were ranked
+        self.baseline_rank = baseline_rank  # 1 = best
+        self.top_probability = top_probability
+        self.mean_rank = mean_rank
+        self.watch = watch  # positions (into rows) with a full rank histogram
+        self.histograms = histograms  # (len(watch), len(rows)) draws per rank
+        self.samples = samples
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.rows, self.baseline_rank, self.top_probability,
+                                      self.mean_rank, self.watch, self.histograms))
+
+    def rank_interval(self, position, coverage=0.9):
+        """(low, high) rank range holding ``coverage`` of a watched entity's draws."""
+        cumulative = np.cumsum(self.histograms[position]) / self.samples
+        tail = (1 - coverage) / 2
+        return int(np.searchsorted(cumulative, tail) + 1), int(np.searchsorted(cumulative, 1 - tail) + 1)
+
+
+def _ranks(values):
+    # Rank 0 is the largest value in each row
+    order = np.argsort(-values, axis=-1, kind="stable")
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(values.shape[-1]), axis=-1)
+    return ranks
+
+
+def _perturb_chunk(values, watch, k, samples, noise, seed):
+    # Runs in a worker process
+    rng = np.random.default_rng(seed)
+    n = len(values)
+    in_top = np.zeros(n, dtype="int64")
+    rank_sum = np.zeros(n, dtype="int64")
+    histograms = np.zeros((len(watch), n), dtype="int64")
+    for start in range(0, samples, BATCH):
+        draws = min(BATCH, samples - start)
+        ranks = _ranks(values * (1 + noise * rng.standard_normal((draws, n))))
+        in_top += (ranks < k).sum(axis=0)
+        rank_sum += ranks.sum(axis=0)
+        for w, position in enumerate(watch):
+            histograms[w] += np.bincount(ranks[:, position], minlength=n)
+    return in_top, rank_sum, histograms
+
+
+def _remember(key, result):
+    with _lock:
+        if data.retired(key[0]):
+            return
+        _results[key] = result
+        _results.move_to_end(key)
+        total = sum(cached.nbytes for cached in _results.values())
+        while len(_results) > 1 and (len(_results) > MAX_ENTRIES or total > MAX_BYTES):
+            _, evicted = _results.popitem(last=False)
+            total -= evicted.nbytes
+
+
+def store_key(snapshot, indicator, continent, k, largest=True, noise=NOISE, samples=SAMPLES, seed=0, scenario=()):
+    """Key of a result in ``diskstore``."""
+    return ("stability", snapshot.version, indicator, continent, k, largest, noise, samples, seed, tuple(scenario))
+
+
+def get_stability(indicator, continent, k, largest=True, noise=NOISE, snapshot=None, samples=SAMPLES, seed=0,
+                  scenario=(), column=None):
+    """Stability of the top-k (or bottom-k) list of ``indicator`` within ``continent`` (None: all).
+
+    ``column`` replaces the published values of ``indicator`` (one per
+    snapshot row), e.g. with a what-if scenario's; ``scenario`` must then
+    identify them.
+    """
+    snapshot = snapshot or data.get_snapshot()
+    scenario = tuple(scenario) if column is not None else ()
+    key = (snapshot.version, indicator, continent, k, largest, noise, samples, seed, scenario)
+    with _lock:
+        cached = _results.get(key)
+        if cached is not None:
+            _results.move_to_end(key)
+    if cached is None:
+        cached = diskstore.get(store_key(snapshot, indicator, continent, k, largest, noise, samples, seed, scenario))
+        if cached is not None:
+            _remember(key, cached)
+    metrics.record_cache("stability", cached is not None)
+    if cached is not None:
+        return cached
+
+    selections = {"continent": [continent]} if continent else None
+    rows = filters.get_index(snapshot).select(selections, present=indicator).rows
+    if column is None:
+        column = snapshot.matrix[:, snapshot.numeric_columns.index(indicator)]
+    values = np.array(column[rows])
+    if not largest:
+        values = -values  # multiplicative noise commutes with the sign flip
+
+    baseline = _ranks(values)
+    watch = np.argsort(baseline)[:min(len(rows), max(3 * k, 20))]
+    sizes = workers.split(samples, -(-samples // CHUNK))
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    results = workers.map_chunks(
+        _perturb_chunk, [(values, watch, k, size, noise, s) for size, s in zip(sizes, seeds)]
+    )
+
+    in_top = sum(result[0] for result in results)
+    rank_sum = sum(result[1] for result in results)
+    histograms = sum(result[2] for result in results)
+    cached = Stability(rows, baseline + 1, in_top / samples, rank_sum / samples + 1, watch, histograms, samples)
+    diskstore.put(store_key(snapshot, indicator, continent, k, largest, noise, samples, seed, scenario), cached)
+    _remember(key, cached)
+    return cached
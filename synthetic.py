@@ -0,0 +1,55 @@
+"""Synthetic large datasets in the final_data.xlsx schema.
+
+Rows are resampled from the real countries with multiplicative noise on
+every indicator, so distributions and correlations stay realistic while the
+row count scales to city level. Usage::
+
+    python synthetic.py --rows 20000 --out synthetic_20000.csv
+    QOL_DATA_PATH=synthetic_20000.csv streamlit run main.py
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+SOURCE_PATH = "final_data.xlsx"
+
+
+def generate(rows, seed=0, noise=0.08, source_path=SOURCE_PATH):
+    """Return a DataFrame with ``rows`` synthetic entities."""
+    rng = np.random.default_rng(seed)
+    source = pd.read_excel(source_path)
+    value_columns = [c for c in source.columns if c.endswith("Value")]
+
+    picks = rng.integers(0, len(source), size=rows)
+    df = source.iloc[picks].reset_index(drop=True)
+    for col in value_columns:
+        values = df[col].to_numpy(dtype="float64")
+        df[col] = np.round(values * rng.normal(1.0, noise, size=rows), 2)
+
+    # Unique entity names, e.g. "Albania 0042"
+    df["country"] = [f"{name} {i:04d}" for i, name in enumerate(df["country"])]
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Quality of Life dataset.")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--noise", type=float, default=0.08, help="Relative std dev of the per-value noise")
+    parser.add_argument("--out", default=None, help="Output .csv, .parquet or .xlsx path")
+    args = parser.parse_args()
+
+    out = args.out or f"synthetic_{args.rows}.csv"
+    df = generate(args.rows, seed=args.seed, noise=args.noise)
+    if out.endswith(".parquet"):
+        df.to_parquet(out, index=False)
+    elif out.endswith(".xlsx"):
+        df.to_excel(out, index=False)
+    else:
+        df.to_csv(out, index=False)
+    print(f"Wrote {len(df)} rows to {out}")
+
+
+if __name__ == "__main__":
+    main()
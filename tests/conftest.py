@@ -0,0 +1,42 @@
+"""Shared fixtures: the flat modules on sys.path, and a private cache directory."""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Read at import time by the modules under test, so set before any of them loads
+_cache_dir = tempfile.mkdtemp(prefix="qol_tests_")
+os.environ.setdefault("QOL_CACHE_DIR", _cache_dir)
+os.environ.setdefault("QOL_DISK_CACHE_DIR", os.path.join(_cache_dir, "store"))
+os.environ.setdefault("QOL_WATCH_INTERVAL", "0")
+os.environ.setdefault("QOL_PREFETCH", "0")
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def synthetic_path(tmp_path_factory):
+    """A 600-row synthetic dataset resampled from final_data.xlsx."""
+    import synthetic
+
+    path = tmp_path_factory.mktemp("data") / "synthetic.csv"
+    synthetic.generate(600, seed=1, source_path=os.path.join(ROOT, "final_data.xlsx")).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def published():
+    """Snapshot of the shipped final_data.xlsx, swapped in as the current one."""
+    import data
+
+    return data.get_snapshot(os.path.join(ROOT, "final_data.xlsx"))
+
+
+@pytest.fixture
+def snapshot(synthetic_path):
+    """Snapshot of the synthetic dataset, swapped in as the current one (caches skip retired versions)."""
+    import data
+
+    return data.get_snapshot(synthetic_path)
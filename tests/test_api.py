@@ -0,0 +1,82 @@
+import email.utils
+import json
+
+import pytest
+
+import api
+
+
+def _get(path, query="", headers=None):
+    status, body, _ = api.respond(path, query, headers)
+    return status, json.loads(body) if body else None
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Endpoint handler calls, counted per path."""
+    counts = {}
+    for path, handler in api.ROUTES.items():
+        def counting(snapshot, query, path=path, handler=handler):
+            counts[path] = counts.get(path, 0) + 1
+            return handler(snapshot, query)
+        monkeypatch.setitem(api.ROUTES, path, counting)
+    monkeypatch.setattr(api, "_responses", api.OrderedDict())
+    return counts
+
+
+def test_ok(published, calls):
+    status, body = _get("/v1/top", "indicator=Safety&k=3&order=bottom&continent=Europe")
+    assert status == 200
+    assert [r["rank"] for r in body["results"]] == [1, 2, 3]
+    assert {r["continent"] for r in body["results"]} == {"Europe"}
+    values = [r["value"] for r in body["results"]]
+    assert values == sorted(values)
+    assert _get("/v1/meta")[1]["version"] == published.version
+
+
+def test_repeated_query_is_served_from_cache(published, calls):
+    assert _get("/v1/meta") == _get("/v1/meta")
+    assert calls["/v1/meta"] == 1
+
+
+@pytest.mark.parametrize("headers", [
+    lambda etag, date: {"If-None-Match": etag},
+    lambda etag, date: {"If-None-Match": f'"other", {etag}'},
+    lambda etag, date: {"If-None-Match": "*"},
+    lambda etag, date: {"If-Modified-Since": date},
+])
+def test_not_modified_skips_the_query(published, calls, headers):
+    etag, modified = api.validators(published)
+    status, body = _get("/v1/top", "indicator=Safety", headers(etag, email.utils.formatdate(modified, usegmt=True)))
+    assert status == 304 and body is None
+    assert calls == {}  # answered from the validators alone, even on a cold cache
+
+
+@pytest.mark.parametrize("headers", [
+    {"If-None-Match": '"stale"'},
+    {"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"},
+    {"If-Modified-Since": "not a date"},
+    # If-None-Match wins over a matching date
+    {"If-None-Match": '"stale"', "If-Modified-Since": "Fri, 31 Dec 9999 23:59:59 GMT"},
+])
+def test_stale_validators_get_the_body(published, calls, headers):
+    status, body = _get("/v1/top", "indicator=Safety", headers)
+    assert status == 200 and body["results"]
+    assert calls == {"/v1/top": 1}
+
+
+@pytest.mark.parametrize("query, message", [
+    ("indicator=Happiness", "unknown indicator"),
+    ("indicator=Safety&k=0", "'k' must be between"),
+    ("indicator=Safety&k=100000", "'k' must be between"),
+    ("indicator=Safety&k=five", "'k' must be an integer"),
+    ("k=3", "missing 'indicator'"),
+])
+def test_bad_request(published, query, message):
+    status, body = _get("/v1/top", query)
+    assert status == 400 and message in body["error"]
+
+
+def test_unknown_endpoint(published):
+    status, body = _get("/v1/nothing")
+    assert status == 404 and "/v1/nothing" in body["error"]
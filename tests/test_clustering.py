@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import clustering
+
+COLUMNS = ["Quality of Life Value", "Safety Value", "Pollution Value", "Climate Value"]
+
+
+@pytest.fixture
+def results(monkeypatch):
+    """An empty clustering cache."""
+    monkeypatch.setattr(clustering, "_results", {})
+    return clustering._results
+
+
+def _blobs(version, per_blob=40, missing_rows=()):
+    # Four well separated groups of entities, each high on a different indicator
+    rng = np.random.default_rng(0)
+    centres = np.array([[150, 10, 20, 10], [100, 80, 20, 10], [60, 10, 95, 10], [20, 10, 20, 90]], dtype="float64")
+    matrix = np.concatenate([centre + rng.normal(0, 2, (per_blob, len(COLUMNS))) for centre in centres])
+    matrix[list(missing_rows)] = np.nan
+    return SimpleNamespace(
+        version=version, numeric_columns=COLUMNS, matrix=matrix,
+        labels={"country": np.array([f"e{i}" for i in range(len(matrix))], dtype=object)},
+    )
+
+
+def test_same_seed_same_clusters(snapshot, results):
+    first = clustering.get_clusters(4, snapshot)
+    results.clear()
+    second = clustering.get_clusters(4, snapshot)
+    assert first is not second
+    np.testing.assert_array_equal(first.labels, second.labels)
+    np.testing.assert_array_equal(first.centroids, second.centroids)
+    assert first.names == second.names
+
+
+def test_clusters_are_ordered_by_quality(results):
+    clusters = clustering.get_clusters(4, _blobs("blobs"))
+    assert list(clusters.labels[::40]) == [0, 1, 2, 3]  # one blob per profile, best first
+    assert (np.diff(clusters.profile_means[:, 0]) < 0).all()
+
+
+def test_k_above_the_row_count(results):
+    snapshot = _blobs("tiny", per_blob=2)
+    clusters = clustering.get_clusters(50, snapshot)
+    assert clusters.k == 8
+    assert sorted(clusters.labels) == list(range(8))
+    assert clustering.get_clusters(50, snapshot) is clusters  # cached under the k asked for
+
+
+def test_rows_without_values_are_left_out(results):
+    clean = clustering.get_clusters(4, _blobs("clean"))
+    gappy = clustering.get_clusters(4, _blobs("gappy", missing_rows=[3, 50, 121]))
+    assert list(gappy.labels[[3, 50, 121]]) == [clustering.NO_DATA] * 3
+    kept = np.setdiff1d(np.arange(160), [3, 50, 121])
+    np.testing.assert_array_equal(gappy.labels[kept], clean.labels[kept])
+    assert np.bincount(gappy.labels[kept]).sum() == 157
+    assert not np.isnan(gappy.profile_means).any()
+
+
+@pytest.mark.parametrize("start", [3, 5, 8])
+def test_warm_start_matches_a_cold_run(results, start):
+    snapshot = _blobs("warm")
+    cold = clustering.get_clusters(4, snapshot)
+    results.clear()
+    clustering.get_clusters(start, snapshot)
+    warm = clustering.get_clusters(4, snapshot)  # seeded from the k = start centroids
+    np.testing.assert_array_equal(warm.labels, cold.labels)
+    np.testing.assert_allclose(warm.inertia, cold.inertia, rtol=1e-6)
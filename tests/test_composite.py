@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import composite
+import simulator
+
+
+def _full(model, weights):
+    weights = np.asarray(weights, dtype="float64")
+    return model.normalized @ weights * (100.0 / weights.sum()) if weights.sum() > 0 else np.zeros(len(model.normalized))
+
+
+@pytest.fixture
+def model():
+    """A model over random components with some missing values and a fully missing row."""
+    rng = np.random.default_rng(5)
+    matrix = rng.lognormal(size=(500, len(composite.COMPONENTS))) * 50
+    matrix[rng.random(matrix.shape) < 0.05] = np.nan
+    matrix[7] = np.nan
+    snapshot = SimpleNamespace(numeric_columns=list(composite.COMPONENTS), matrix=matrix)
+    return composite.CompositeModel("v1", list(composite.COMPONENTS), composite._normalize(snapshot))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_incremental_scores_match_a_full_product(model, seed):
+    assert not np.isnan(model.normalized).any()  # missing values sit at the median
+    rng = np.random.default_rng(seed)
+    weights = rng.integers(0, 11, len(model.columns))
+    state = {}
+    for step in range(3 * composite.FULL_RECOMPUTE_EVERY):
+        if step % 5 == 4:  # now and then many weights at once, which takes the full product
+            weights = rng.integers(0, 11, len(model.columns))
+        else:
+            weights = weights.copy()
+            weights[rng.integers(len(weights))] = rng.integers(0, 11)
+        np.testing.assert_allclose(composite.scores(model, weights, state), _full(model, weights), atol=1e-9)
+    assert 0 < state["updates"] < composite.FULL_RECOMPUTE_EVERY
+
+
+def test_a_new_model_resets_the_state(model):
+    state = {}
+    composite.scores(model, np.ones(len(model.columns)), state)
+    other = composite.CompositeModel("v2", model.columns, np.asfortranarray(model.normalized[:, ::-1]))
+    weights = np.arange(len(model.columns), dtype="float64")
+    weights[0] = 1
+    np.testing.assert_allclose(composite.scores(other, weights, state), _full(other, weights))
+
+
+def test_scenario_model_scores_the_scenario_values(published):
+    scenario = [("Pollution Value", ("Asia",), -50)]
+    values = simulator.simulate(published, scenario, {})
+    base = composite.get_model(published)
+    adjusted = composite.scenario_model(published, scenario, values)
+    j = composite.COMPONENTS.index("Pollution Value")
+    asia = np.asarray(published.labels["continent"]) == "Asia"
+    # Lower pollution is better: Asia's normalized pollution scores rise
+    assert (adjusted.normalized[asia, j] >= base.normalized[asia, j]).all()
+    assert (adjusted.normalized[asia, j] > base.normalized[asia, j]).any()
+    untouched = [i for i in range(len(composite.COMPONENTS)) if i != j]
+    np.testing.assert_array_equal(adjusted.normalized[:, untouched], base.normalized[:, untouched])
@@ -0,0 +1,83 @@
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import correlation
+import workers
+
+
+@pytest.fixture
+def intervals(monkeypatch):
+    """Empty interval caches, with the bootstrap run in this process."""
+    monkeypatch.setattr(workers, "MAX_WORKERS", 1)
+    monkeypatch.setattr(correlation, "_intervals", {})
+    monkeypatch.setattr(correlation, "_running", set())
+
+
+def _frame(seed, rows=300, missing=0.0):
+    rng = np.random.default_rng(seed)
+    base = rng.normal(size=rows)
+    frame = pd.DataFrame({
+        "a": base,
+        "b": base + rng.normal(size=rows),
+        "c": np.exp(base) + rng.integers(0, 3, rows),  # monotone in a, with ties
+        "d": rng.integers(0, 5, rows).astype("float64"),
+    })
+    return frame.mask(rng.random(frame.shape) < missing)
+
+
+def test_pearson_matches_pandas_with_missing_values():
+    frame = _frame(0, missing=0.1)
+    pearson, _, counts = correlation.compute(frame.to_numpy())
+    np.testing.assert_allclose(pearson, frame.corr("pearson"), atol=1e-12)
+    np.testing.assert_array_equal(counts, frame.notna().astype(int).T @ frame.notna().astype(int))
+
+
+def test_spearman_matches_pandas_without_gaps():
+    frame = _frame(1)
+    _, spearman, _ = correlation.compute(frame.to_numpy())
+    np.testing.assert_allclose(spearman, frame.corr("spearman"), atol=1e-12)
+
+
+def test_spearman_with_missing_values_stays_close_to_pandas():
+    # Ranks come from each column's own non-missing values, pandas re-ranks per pair
+    frame = _frame(2, missing=0.1)
+    _, spearman, _ = correlation.compute(frame.to_numpy())
+    np.testing.assert_allclose(spearman, frame.corr("spearman"), atol=0.02)
+
+
+def test_rank_columns_average_ties_and_keep_nan():
+    ranks = correlation.rank_columns(np.array([[3.0], [1.0], [np.nan], [3.0], [2.0]]))
+    np.testing.assert_array_equal(ranks[:, 0], [3.5, 1.0, np.nan, 3.5, 2.0])
+
+
+def test_intervals_cover_the_true_correlation(intervals):
+    # Bivariate normal samples with a known correlation: 95% intervals should hold it most of the time
+    rho, hits, trials = 0.6, 0, 40
+    cov = [[1, rho], [rho, 1]]
+    for trial in range(trials):
+        X = np.random.default_rng(trial).multivariate_normal([0, 0], cov, size=200)
+        snapshot = SimpleNamespace(version=f"coverage-{trial}", matrix=X)
+        lower, upper = correlation.get_intervals(snapshot, samples=250, seed=trial)["pearson"]
+        assert lower[0, 1] <= correlation.compute(X)[0][0, 1] <= upper[0, 1]
+        hits += lower[0, 1] <= rho <= upper[0, 1]
+    assert hits >= 0.80 * trials, hits
+
+
+def test_intervals_if_ready_bootstraps_in_the_background(snapshot, intervals):
+    assert correlation.intervals_if_ready(snapshot, samples=50) is None
+    deadline = time.monotonic() + 60
+    while (ready := correlation.intervals_if_ready(snapshot, samples=50)) is None:
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    assert not correlation._running
+    expected = correlation.get_intervals(snapshot, samples=50)
+    for method in ("pearson", "spearman"):
+        np.testing.assert_array_equal(ready[method][0], expected[method][0])
+        lower, upper = ready[method]
+        point = getattr(correlation.get_correlations(snapshot), method)
+        inside = np.isnan(point) | ((lower <= point + 1e-9) & (point <= upper + 1e-9))
+        assert inside.mean() > 0.95
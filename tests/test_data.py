@@ -0,0 +1,32 @@
+import os
+
+import numpy as np
+
+import data
+import filters
+
+
+def _files(version):
+    return sorted(name for name in os.listdir(data.CACHE_DIR) if name.startswith(f"dataset-{version}."))
+
+
+def test_swap_retires_the_old_version(snapshot, tmp_path):
+    other = tmp_path / "other.csv"
+    snapshot.frame().head(100).to_csv(other, index=False)
+    assert len(_files(snapshot.version)) == 4
+
+    fresh = data.get_snapshot(str(other))
+    assert fresh.version != snapshot.version
+    assert data.retired(snapshot.version) and not data.retired(fresh.version)
+    assert _files(snapshot.version) == []  # superseded files are deleted
+    assert np.isfinite(np.nansum(snapshot.matrix))  # the old mapping stays readable
+
+    # A request still holding the old snapshot builds, but does not cache, its views
+    filters.get_index(snapshot)
+    assert snapshot.version not in filters._indexes
+
+    back = data.get_snapshot(snapshot.path)
+    assert back.version == snapshot.version and not data.retired(snapshot.version)
+    assert len(_files(snapshot.version)) == 4
+    filters.get_index(back)
+    assert back.version in filters._indexes
@@ -0,0 +1,98 @@
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+
+import diskstore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """An empty store in its own private directory."""
+    monkeypatch.setattr(diskstore, "DIR", str(tmp_path / "store"))
+    monkeypatch.setattr(diskstore, "_private", None)
+    monkeypatch.setattr(diskstore, "_written", 0)
+    return diskstore
+
+
+def test_store_is_created_private(store):
+    store.put(("kind", "v1", 1), [1, 2, 3])
+    assert os.stat(store.DIR).st_mode & 0o777 == 0o700
+    assert store.get(("kind", "v1", 1)) == [1, 2, 3]
+
+
+def test_writable_by_others_disables_store(store):
+    os.makedirs(store.DIR, mode=0o700)
+    os.chmod(store.DIR, 0o777)
+    assert store.put(("kind", "v1", 1), "value") == 0
+    assert store.get(("kind", "v1", 1)) is None
+    assert os.listdir(store.DIR) == []
+
+
+def test_symlinked_store_is_refused(store, tmp_path):
+    target = tmp_path / "elsewhere"
+    target.mkdir(mode=0o700)
+    os.symlink(target, store.DIR)
+    assert store.put(("kind", "v1", 1), "value") == 0
+    assert os.listdir(target) == []
+
+
+def test_code_changes_change_the_address(store, monkeypatch):
+    key = ("kind", "v1", ("Asia", "Europe"), 0.05)
+    store.put(key, "old chart")
+    assert store.digest(key) == store.digest(("kind", "v1", ["Asia", "Europe"], 0.05))
+    monkeypatch.setattr(diskstore, "_code", "another build")
+    assert store.get(key) is None
+
+
+def test_sweep_skips_files_removed_mid_scan(store, monkeypatch):
+    # Three keys in one shard, so an abandoned shard would lose the survivors too
+    by_shard = {}
+    for i in range(2000):
+        by_shard.setdefault(store.digest(("kind", "v1", i))[:2], []).append(("kind", "v1", i))
+    keys = next(keys for keys in by_shard.values() if len(keys) >= 3)[:3]
+    for key in keys:
+        store.put(key, bytes(1000))
+    real_scandir = os.scandir
+
+    def racing_scandir(path):
+        entries = list(real_scandir(path))
+        if path != store.DIR:
+            os.unlink(entries[0].path)  # another process deletes a file after the listing
+        return iter(entries)
+
+    monkeypatch.setattr(os, "scandir", racing_scandir)
+    assert len(store._files()) == 2
+
+
+def test_round_trip(store):
+    frame = pd.DataFrame({"country": ["A", "B"], "value": [1.5, np.nan]})
+    figure = go.Figure(go.Bar(x=["A", "B"], y=[1, 2]))
+    for key, value in [(("frame", "v1"), frame), (("figure", "v1", 0.05), figure), (("array", "v1"), np.arange(5))]:
+        size = store.put(key, value)
+        loaded, loaded_size = store.load(key)
+        assert loaded_size == size == os.path.getsize(store.path(key))
+        if isinstance(value, pd.DataFrame):
+            pd.testing.assert_frame_equal(loaded, value)
+        elif isinstance(value, go.Figure):
+            assert loaded.to_dict() == value.to_dict()
+        else:
+            np.testing.assert_array_equal(loaded, value)
+    assert store.get(("frame", "v2")) is None
+
+
+def test_store_stays_within_its_byte_budget(store, monkeypatch):
+    monkeypatch.setattr(diskstore, "MAX_BYTES", 40_000)
+    entry = len(pickle.dumps(bytes(1000), pickle.HIGHEST_PROTOCOL))
+    for i in range(200):
+        store.put(("kind", "v1", i), bytes(1000))
+        store.get(("kind", "v1", 0))  # read often: the least recently used entries go first
+        # Sweeps run every MAX_BYTES / 16 written, so the store overshoots by at most that much
+        assert store.total_bytes() <= store.MAX_BYTES + store.MAX_BYTES // 16 + entry
+    assert store.get(("kind", "v1", 0)) is not None
+    assert store.get(("kind", "v1", 1)) is None
+    store.sweep(store.MAX_BYTES // 2)  # a sweep brings the store back under 90% of its budget
+    assert store.total_bytes() <= 0.9 * store.MAX_BYTES // 2
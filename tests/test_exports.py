@@ -0,0 +1,50 @@
+import io
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+import exports
+import utils
+
+
+class _Column:
+    def __init__(self, buttons):
+        self.buttons = buttons
+
+    def download_button(self, **kwargs):
+        self.buttons.append(kwargs)
+
+
+def _parse(fmt, payload):
+    if fmt == "CSV":
+        return pd.read_csv(io.BytesIO(payload))
+    if fmt == "Parquet":
+        return pd.read_parquet(io.BytesIO(payload))
+    return pa.ipc.open_file(pa.BufferReader(payload)).read_pandas()
+
+
+def test_export_buttons_return_what_streamlit_accepts(monkeypatch):
+    frame = pd.DataFrame({
+        "country": [f"Country {i}" for i in range(11)],
+        "continent": ["Europe", "Asia"] * 5 + [None],
+        "Safety Value": [i * 1.25 for i in range(11)],
+    })
+    buttons = []
+    monkeypatch.setattr(exports, "CHUNK_ROWS", 4)  # several chunks per file
+    monkeypatch.setattr(utils.st, "columns", lambda n: [_Column(buttons) for _ in range(n)])
+    utils.export_buttons(lambda: frame, "table")
+
+    assert [button["file_name"] for button in buttons] == ["table.csv", "table.parquet", "table.arrow"]
+    for fmt, button in zip(exports.FORMATS, buttons):
+        payload, _ = convert_data_to_bytes_and_infer_mime(
+            button["data"](), unsupported_error=AssertionError(f"{fmt}: unsupported download type")
+        )
+        pd.testing.assert_frame_equal(_parse(fmt, payload), frame, check_dtype=fmt != "CSV")
+
+
+@pytest.mark.parametrize("fmt", list(exports.FORMATS))
+def test_empty_table_round_trips(fmt):
+    frame = pd.DataFrame({"country": pd.Series([], dtype=object), "Safety Value": pd.Series([], dtype=float)})
+    assert list(_parse(fmt, exports.export(frame, fmt)).columns) == list(frame.columns)
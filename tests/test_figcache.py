@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import diskstore
+import figcache
+import prefetch
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """An empty in-memory figure cache of 10 kB, without the disk store."""
+    monkeypatch.setattr(diskstore, "ENABLED", False)
+    monkeypatch.setattr(figcache, "MAX_BYTES", 10_000)
+    monkeypatch.setattr(figcache, "_entries", figcache.OrderedDict())
+    monkeypatch.setattr(figcache, "_bytes", 0)
+    monkeypatch.setattr(figcache, "_prefetched", {})
+    monkeypatch.setattr(figcache, "_prefetched_bytes", 0)
+    return figcache
+
+
+class _InlinePool:
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+@pytest.fixture
+def inline_prefetch(monkeypatch):
+    """Prefetching on, with builds run as they are scheduled."""
+    monkeypatch.setattr(prefetch, "ENABLED", True)
+    monkeypatch.setattr(prefetch, "_get_pool", _InlinePool)
+
+
+def _kb(i):
+    return pd.Series(np.full(125, float(i)))  # 1000 bytes of data plus a small index
+
+
+def test_full_cache_still_prefetches(cache, inline_prefetch):
+    for i in range(20):  # requested views fill the whole budget
+        cache.get_or_build(("page", "v1", i), lambda i=i: _kb(i))
+    assert cache.total_bytes() > 0.9 * cache.MAX_BYTES
+    queued = prefetch.schedule([(("next", "v1", i), lambda i=i: _kb(i)) for i in range(3)])
+    assert queued == 3
+    assert cache.prefetched_bytes() == sum(cache.nbytes(_kb(i)) for i in range(3))
+
+
+def test_prefetch_stops_at_its_share_and_reads_release_it(cache, inline_prefetch):
+    queued = prefetch.schedule([(("next", "v1", i), lambda i=i: _kb(i)) for i in range(9)])
+    assert queued < 9
+    assert cache.prefetched_bytes() <= prefetch.MEMORY_SHARE * cache.MAX_BYTES + cache.nbytes(_kb(0))
+
+    shown = ("next", "v1", 0)
+    cache.get(shown)
+    assert cache.prefetched_bytes() == (queued - 1) * cache.nbytes(_kb(0))
+
+
+def test_figures_are_sized_from_the_stored_pickle(cache, monkeypatch, tmp_path):
+    import plotly.graph_objects as go
+
+    monkeypatch.setattr(diskstore, "ENABLED", True)
+    monkeypatch.setattr(diskstore, "DIR", str(tmp_path / "store"))
+    monkeypatch.setattr(diskstore, "_private", None)
+    fig = go.Figure(go.Bar(x=["a", "b"], y=[1, 2]))
+
+    def no_json(*args, **kwargs):
+        raise AssertionError("figure serialized to JSON just to size it")
+
+    monkeypatch.setattr(go.Figure, "to_json", no_json)
+    key = ("bar", "v1", "Safety Value")
+    cache.put(key, fig)
+    size = cache.total_bytes()
+    assert size == diskstore.load(key)[1] > 0
+
+    cache._evict("v2")  # drop it from memory; the next read comes from disk
+    assert cache.total_bytes() == 0
+    assert cache.get(key) is not None
+    assert cache.total_bytes() == size
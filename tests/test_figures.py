@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+import data
+import figures
+import pareto
+import synthetic
+from conftest import ROOT
+
+INDICATOR = "Safety Value"
+PARETO = ["Safety Value", "Pollution Value"]
+ABOVE = figures.AGGREGATE_POINTS + 1
+
+
+@pytest.fixture(scope="module")
+def entities():
+    """Enough synthetic entities to cross every rendering threshold."""
+    return synthetic.generate(ABOVE, seed=2, source_path=f"{ROOT}/final_data.xlsx")
+
+
+@pytest.mark.parametrize("rows, mode", [
+    (figures.WEBGL_POINTS, "svg"),
+    (figures.WEBGL_POINTS + 1, "webgl"),
+    (figures.AGGREGATE_POINTS, "webgl"),
+    (ABOVE, "aggregate"),
+])
+def test_render_mode_thresholds(rows, mode):
+    assert figures.render_mode(rows) == mode
+
+
+@pytest.mark.parametrize("rows, trace_type", [
+    (figures.WEBGL_POINTS, "scatter"),
+    (figures.WEBGL_POINTS + 1, "scattergl"),
+    (figures.AGGREGATE_POINTS, "scattergl"),
+    (ABOVE, "bar"),
+])
+def test_country_scatter(entities, rows, trace_type):
+    frame = entities.head(rows).rename(columns=data.COLUMN_STYLES["title"])
+    indicator = INDICATOR.title()
+    fig = figures.country_scatter(frame, indicator, "the world", "RdYlGn")
+    assert {trace.type for trace in fig.data} == {trace_type}
+    trace = fig.data[0]
+    if trace_type == "bar":  # a histogram of every present value
+        assert trace.y.sum() == frame[indicator].notna().sum()
+        assert "binned" in fig.layout.title.text
+    else:  # one marker per country, labelled by name
+        assert list(trace.x) == list(frame["Country"])
+        assert "%{x}" in trace.hovertemplate
+        np.testing.assert_allclose(trace.y, frame[indicator], atol=1e-3)
+
+
+@pytest.mark.parametrize("rows, trace_type", [
+    (figures.WEBGL_POINTS, "scatter"),
+    (figures.WEBGL_POINTS + 1, "scattergl"),
+    (figures.AGGREGATE_POINTS, "scattergl"),
+    (ABOVE, "scattergl"),
+])
+def test_pareto_scatter(entities, rows, trace_type):
+    frame = entities.head(rows)
+    columns = [col.lower() for col in PARETO]
+    ranked = frame[["country"]].assign(
+        **{col.lower(): frame[col] for col in PARETO},
+        Front=pareto.fronts(pareto.orient(frame[PARETO].to_numpy(dtype="float64"), PARETO)) + 1,
+    )
+    fig = figures.pareto_scatter(ranked, columns, PARETO, "Fronts")
+    assert {trace.type for trace in fig.data} == {trace_type}
+    trace = fig.data[0]
+    if rows > figures.AGGREGATE_POINTS:  # one marker per grid cell, sized by its countries
+        assert len(trace.x) <= figures.BINS ** 2
+        assert trace.customdata[:, 0].sum() == len(ranked[columns].dropna())
+        assert "binned" in fig.layout.title.text
+    else:
+        assert len(trace.x) == rows
+        assert list(trace.hovertext) == list(frame["country"])
+        assert trace.marker.color.min() == 1
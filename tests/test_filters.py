@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+import filters
+
+
+@pytest.mark.parametrize("offset", [0.0, 1e6, 1e9])
+def test_std_matches_numpy_for_large_low_variance_values(offset):
+    rng = np.random.default_rng(0)
+    values = offset + rng.normal(0, 0.01, 5000)
+    values[::7] = np.nan
+    stats = filters.summarize(np.arange(values.size), values)
+    assert stats.count == np.count_nonzero(~np.isnan(values))
+    assert stats.mean == pytest.approx(np.nanmean(values), rel=1e-12)
+    assert stats.std() == pytest.approx(np.nanstd(values, ddof=1), rel=1e-6)
+    assert stats.min == np.nanmin(values) and stats.max == np.nanmax(values)
+
+
+def test_stats_of_a_selection(snapshot):
+    index = filters.get_index(snapshot)
+    column = snapshot.numeric_columns[0]
+    values = snapshot.matrix[:, index.columns[column]]
+    selection = index.select({"continent": ["Europe"]})
+    stats = index.stats(selection, column, values)
+    expected = values[selection.rows]
+    assert stats.count == np.count_nonzero(~np.isnan(expected))
+    assert stats.std() == pytest.approx(np.nanstd(expected, ddof=1))
+    assert values[stats.max_row] == np.nanmax(expected)
+
+
+def test_empty_and_single_value_stats():
+    assert filters.summarize([], np.array([1.0])).count == 0
+    assert np.isnan(filters.summarize([0], np.array([1.0])).std())
@@ -0,0 +1,86 @@
+import re
+
+import pytest
+
+import metrics
+
+SAMPLE = re.compile(r'^([a-z_]+)(\{([a-z_]+="[^"]*"(,[a-z_]+="[^"]*")*)\})? (-?[0-9.e+-]+|NaN)$')
+
+
+@pytest.fixture
+def fresh(monkeypatch):
+    """Empty metrics state, with a controllable clock."""
+    monkeypatch.setattr(metrics, "_reruns", {})
+    monkeypatch.setattr(metrics, "_cache_lookups", {})
+    monkeypatch.setattr(metrics, "_sessions", {})
+    monkeypatch.setattr(metrics, "_pruned", 0.0)
+    clock = {"now": 1_000_000.0}
+    monkeypatch.setattr(metrics.time, "time", lambda: clock["now"])
+    return clock
+
+
+def _samples(text):
+    families, samples = {}, {}
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            families.setdefault(line.split()[2], {})["help"] = True
+        elif line.startswith("# TYPE "):
+            _, _, name, kind = line.split()
+            families.setdefault(name, {})["type"] = kind
+        else:
+            match = SAMPLE.match(line)
+            assert match, line
+            samples[(match.group(1), match.group(3) or "")] = float(match.group(5))
+    return families, samples
+
+
+def test_exposition_format(fresh):
+    for seconds in (0.01, 0.2, 0.2, 3.0):
+        metrics.observe_rerun("WorldMap", seconds, session_id="a")
+    metrics.observe_rerun("evil\"page", 0.1)
+    metrics.record_cache("figures", True)
+    metrics.record_cache("figures", False)
+    metrics.record_cache("figures", True)
+    text = metrics.render()
+    assert text.endswith("\n")
+    families, samples = _samples(text)
+    assert families == {
+        "qol_rerun_duration_seconds": {"help": True, "type": "histogram"},
+        "qol_rerun_latency_seconds": {"help": True, "type": "summary"},
+        "qol_cache_requests_total": {"help": True, "type": "counter"},
+        "qol_cache_hit_ratio": {"help": True, "type": "gauge"},
+        "qol_active_sessions": {"help": True, "type": "gauge"},
+    }
+    for name, _ in samples:  # every sample belongs to a declared family
+        assert name.removesuffix("_bucket").removesuffix("_sum").removesuffix("_count") in families
+
+    buckets = [samples[("qol_rerun_duration_seconds_bucket", f'page="WorldMap",le="{bound}"')]
+               for bound in metrics.LATENCY_BUCKETS]
+    assert buckets == sorted(buckets)  # cumulative
+    assert samples[("qol_rerun_duration_seconds_bucket", 'page="WorldMap",le="0.25"')] == 3
+    assert samples[("qol_rerun_duration_seconds_bucket", 'page="WorldMap",le="+Inf"')] == 4
+    assert samples[("qol_rerun_duration_seconds_count", 'page="WorldMap"')] == 4
+    assert samples[("qol_rerun_duration_seconds_sum", 'page="WorldMap"')] == pytest.approx(3.41)
+    assert samples[("qol_rerun_latency_seconds", 'page="WorldMap",quantile="0.5"')] == pytest.approx(0.2)
+    assert samples[("qol_cache_requests_total", 'cache="figures",result="hit"')] == 2
+    assert samples[("qol_cache_hit_ratio", 'cache="figures"')] == pytest.approx(2 / 3)
+    assert samples[("qol_active_sessions", 'page="WorldMap"')] == 1
+    assert samples[("qol_active_sessions", 'page="other"')] == 0  # unknown pages share one label
+
+
+def test_expired_sessions_are_dropped_without_scrapes(fresh):
+    for i in range(100):
+        metrics.observe_rerun("main", 0.1, session_id=f"old-{i}")
+    fresh["now"] += metrics.SESSION_WINDOW + 1
+    metrics.observe_rerun("main", 0.1, session_id="new")
+    assert set(metrics._sessions) == {"new"}
+
+
+def test_sessions_expire_from_the_gauge(fresh):
+    metrics.observe_rerun("main", 0.1, session_id="a")
+    fresh["now"] += metrics.SESSION_WINDOW / 2
+    metrics.observe_rerun("WorldMap", 0.1, session_id="b")
+    fresh["now"] += metrics.SESSION_WINDOW / 2 + 1  # "a" has expired, "b" has not
+    _, samples = _samples(metrics.render())
+    assert samples[("qol_active_sessions", 'page="main"')] == 0
+    assert samples[("qol_active_sessions", 'page="WorldMap"')] == 1
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+import neighbors
+
+
+def _brute_force(vectors, rows, k):
+    X = vectors.astype("float64")
+    d = np.sqrt(((X[rows, None, :] - X[None, :, :]) ** 2).sum(axis=2))
+    d[np.arange(len(rows)), rows] = np.inf  # a row is not its own neighbour
+    order = np.argsort(d, axis=1, kind="stable")[:, :k]
+    return order, np.take_along_axis(d, order, axis=1)
+
+
+@pytest.mark.parametrize("block_rows", [7, 64, neighbors.BLOCK_ROWS])
+@pytest.mark.parametrize("k", [1, 5, 30])
+def test_query_matches_brute_force(monkeypatch, block_rows, k):
+    monkeypatch.setattr(neighbors, "BLOCK_ROWS", block_rows)
+    vectors = neighbors._standardize(np.random.default_rng(3).normal(size=(200, 9)))
+    index = neighbors.NeighborIndex("v1", [f"e{i}" for i in range(200)], vectors)
+    rows = np.array([0, 6, 7, 63, 64, 199])
+    found, distances = index.query(rows, k)
+    expected, expected_distances = _brute_force(vectors, rows, k)
+    np.testing.assert_array_equal(found, expected)
+    np.testing.assert_allclose(distances, expected_distances, rtol=1e-4, atol=1e-4)
+
+
+def test_similar_on_a_snapshot(snapshot):
+    index = neighbors.get_index(snapshot)
+    name = index.names[10]
+    similar = index.similar(name, 5)
+    expected, expected_distances = _brute_force(index.vectors, np.array([10]), 5)
+    assert [n for n, _ in similar] == [index.names[i] for i in expected[0]]
+    np.testing.assert_allclose([d for _, d in similar], expected_distances[0], rtol=1e-4, atol=1e-4)
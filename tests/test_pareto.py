@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+import pareto
+
+
+def _naive_fronts(Y):
+    # Peel off the non-dominated rows, one front at a time
+    depth = np.full(len(Y), -1)
+    remaining = list(range(len(Y)))
+    front = 0
+    while remaining:
+        current = [
+            i for i in remaining
+            if not any((Y[j] >= Y[i]).all() and (Y[j] > Y[i]).any() for j in remaining)
+        ]
+        depth[current] = front
+        remaining = [i for i in remaining if i not in current]
+        front += 1
+    return depth
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("width", [2, 3, 5])
+def test_fronts_match_naive_dominance_sort(seed, width):
+    rng = np.random.default_rng(seed)
+    X = rng.integers(0, 6, size=(120, width)).astype("float64")  # few levels: many ties and duplicates
+    X[rng.random(X.shape) < 0.1] = np.nan
+    Y = pareto.orient(X, ["Pollution Value"] + ["Safety Value"] * (width - 1))
+    np.testing.assert_array_equal(pareto.fronts(Y), _naive_fronts(Y))
+
+
+def test_missing_values_rank_worst():
+    X = np.array([[1.0, 1.0], [np.nan, 5.0], [0.0, 0.0]])
+    Y = pareto.orient(X, ["Safety Value", "Health Care Value"])
+    assert Y[1, 0] == -np.inf
+    assert list(pareto.fronts(Y)) == [0, 0, 1]
+
+
+def test_lower_is_better_is_flipped():
+    X = np.array([[10.0, 1.0], [20.0, 1.0]])
+    assert list(pareto.fronts(pareto.orient(X, ["Pollution Value", "Safety Value"]))) == [0, 1]
+
+
+def test_duplicates_share_a_front_and_empty_input():
+    assert list(pareto.fronts(np.ones((3, 2)))) == [0, 0, 0]
+    assert pareto.fronts(np.empty((0, 2))).size == 0
@@ -0,0 +1,11 @@
+import pytest
+
+import loadtest
+
+
+@pytest.mark.parametrize("dataset", ["published", "snapshot"])
+def test_charts_stay_within_payload_budgets(dataset, request):
+    report = loadtest.chart_payloads(request.getfixturevalue(dataset))
+    assert set(name.replace(" (log)", "") for name in report) == set(loadtest.PAYLOAD_BUDGETS)
+    over = {name: stats for name, stats in report.items() if stats["bytes"] > stats["budget"]}
+    assert not over
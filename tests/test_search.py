@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+import search
+from WorldMap import sorted_positions
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_sorted_positions_match_a_stable_argsort(seed):
+    rng = np.random.default_rng(seed)
+    key = rng.integers(0, 20, size=300).astype("float64")  # many ties
+    key[rng.random(key.size) < 0.15] = np.nan
+    positions = np.sort(rng.choice(1000, size=key.size, replace=False))
+    expected = positions[np.argsort(key, kind="stable")]
+    for stop in [1, 7, 50, 254, 255, 256, 299, 300, 400]:
+        np.testing.assert_array_equal(sorted_positions(key, positions, stop), expected[:stop])
+
+
+def test_pages_cover_the_sorted_table_once():
+    key = np.random.default_rng(9).normal(size=137)
+    positions = np.arange(key.size)
+    page_size = 25
+    pages = [
+        sorted_positions(key, positions, start + page_size)[start:] for start in range(0, key.size, page_size)
+    ]
+    np.testing.assert_array_equal(np.concatenate(pages), np.argsort(key, kind="stable"))
+
+
+def test_search_mask_matches_substring_scan(snapshot):
+    index = search.get_index(snapshot)
+    countries = [str(name).lower() for name in snapshot.labels["country"]]
+    continents = [str(name).lower() for name in snapshot.labels["continent"]]
+    queries = ["a", "an", "AN", "lan", "land", "stan", "rope", "ia", "zzz", "q", countries[0], countries[-1][1:]]
+    for query in queries:
+        q = query.lower()
+        expected = np.array([q in country or q in continent for country, continent in zip(countries, continents)])
+        np.testing.assert_array_equal(index.mask(query), expected, err_msg=query)
+        np.testing.assert_array_equal(index.mask(query), expected, err_msg=f"{query} (memoized)")
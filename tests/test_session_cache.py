@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import session_cache
+
+
+@pytest.fixture
+def views(monkeypatch):
+    """A fresh session's memo, with small limits."""
+    monkeypatch.setattr(session_cache, "st", SimpleNamespace(session_state={}))
+    monkeypatch.setattr(session_cache, "MAX_ENTRIES", 4)
+    return lambda: session_cache.st.session_state[session_cache.SESSION_KEY]
+
+
+def _names(i, rows=1000):
+    return pd.DataFrame({"country": [f"Country with a long name {i} {j:05d}" for j in range(rows)]}, dtype=object)
+
+
+def test_string_columns_count_their_strings(views):
+    frame = _names(0)
+    assert session_cache._nbytes(frame) > 50 * len(frame)  # not just one pointer per row
+    assert session_cache._nbytes(frame["country"]) == session_cache._nbytes(frame)
+
+
+def test_evicts_least_recently_used_first(views):
+    calls = []
+    for i in range(4):
+        session_cache.memo("view", i, lambda i=i: calls.append(i) or pd.DataFrame({"x": [i]}))
+    session_cache.memo("view", 0, lambda: calls.append("again"))  # a hit moves 0 to the back
+    session_cache.memo("view", 4, lambda: calls.append(4) or pd.DataFrame({"x": [4]}))
+    assert calls == [0, 1, 2, 3, 4]
+    assert [params for _, params in views()] == [2, 3, 0, 4]
+
+
+def test_stays_within_the_byte_budget(views, monkeypatch):
+    size = session_cache._nbytes(_names(0))
+    monkeypatch.setattr(session_cache, "MAX_BYTES", int(2.5 * size))
+    for i in range(4):
+        session_cache.memo("names", i, lambda i=i: _names(i))
+    assert [params for _, params in views()] == [2, 3]
+    assert sum(bytes_ for _, bytes_ in views().values()) <= session_cache.MAX_BYTES
+
+
+def test_hits_are_detached_copies(views):
+    session_cache.memo("view", 1, lambda: pd.DataFrame({"x": np.arange(3)}))
+    copy = session_cache.memo("view", 1, lambda: None)
+    copy["y"] = 1
+    assert "y" not in session_cache.memo("view", 1, lambda: None).columns
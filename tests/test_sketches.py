@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+import sketches
+
+QS = np.array([0.0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0])
+
+
+def _merged(values, parts):
+    rows = np.arange(values.size)
+    return sketches.Sketch.merge([
+        sketches.Sketch.from_values(values[chunk], rows[chunk]) for chunk in np.array_split(rows, parts)
+    ])
+
+
+def test_small_groups_are_exact():
+    values = np.random.default_rng(1).lognormal(size=150)
+    values[::11] = np.nan
+    sketch = _merged(values, 3)
+    np.testing.assert_allclose(sketch.quantile(QS), np.nanquantile(values, QS))
+    assert sketch.std() == pytest.approx(np.nanstd(values, ddof=1))
+    assert sketch.min == np.nanmin(values) and sketch.max == np.nanmax(values)
+
+
+@pytest.mark.parametrize("distribution", ["normal", "lognormal", "uniform"])
+def test_merged_quantiles_stay_within_rank_tolerance(distribution):
+    values = getattr(np.random.default_rng(2), distribution)(size=50_000)
+    sketch = _merged(values, 7)
+    ranks = np.searchsorted(np.sort(values), sketch.quantile(QS)) / values.size
+    # k1 digests are tightest in the tails: within 1% of rank in the middle, 0.1% at the ends
+    assert np.abs(ranks - QS).max() <= 0.01
+    assert np.abs(ranks - QS)[[0, 1, -2, -1]].max() <= 0.001
+    assert sketch.n == values.size
+    assert sketch.mean == pytest.approx(values.mean())
+    assert sketch.std() == pytest.approx(values.std(ddof=1))
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+import diskstore
+import stability
+import workers
+
+
+@pytest.fixture
+def results(monkeypatch):
+    """An empty in-process stability cache, without the disk store or the process pool."""
+    monkeypatch.setattr(diskstore, "ENABLED", False)
+    monkeypatch.setattr(workers, "MAX_WORKERS", 1)
+    monkeypatch.setattr(stability, "_results", stability.OrderedDict())
+    return stability._results
+
+
+def _indicator(snapshot):
+    return snapshot.numeric_columns[0]
+
+
+def test_cache_is_bounded_by_entries(snapshot, results, monkeypatch):
+    monkeypatch.setattr(stability, "MAX_ENTRIES", 3)
+    for k in range(3, 8):
+        stability.get_stability(_indicator(snapshot), None, k, snapshot=snapshot, samples=50)
+    assert len(results) == 3
+    assert [key[3] for key in results] == [5, 6, 7]  # least recently used went first
+
+
+def test_cache_is_bounded_by_bytes(snapshot, results, monkeypatch):
+    first = stability.get_stability(_indicator(snapshot), None, 3, snapshot=snapshot, samples=50)
+    monkeypatch.setattr(stability, "MAX_BYTES", int(first.nbytes * 2.5))
+    for k in range(4, 8):
+        stability.get_stability(_indicator(snapshot), None, k, snapshot=snapshot, samples=50)
+    assert len(results) == 2
+    assert sum(cached.nbytes for cached in results.values()) <= stability.MAX_BYTES
+
+
+def test_scenario_values_are_ranked(snapshot, results):
+    indicator = _indicator(snapshot)
+    column = np.arange(len(snapshot.matrix), dtype=float)  # later rows rank higher
+    base = stability.get_stability(indicator, None, 5, snapshot=snapshot, samples=50)
+    flipped = stability.get_stability(
+        indicator, None, 5, snapshot=snapshot, samples=50, scenario=[(indicator, ("Europe",), 10.0)], column=column
+    )
+    assert flipped is not base
+    np.testing.assert_array_equal(flipped.rows, base.rows)
+    np.testing.assert_array_equal(flipped.baseline_rank, np.arange(len(base.rows), 0, -1))
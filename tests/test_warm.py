@@ -0,0 +1,33 @@
+from collections import Counter
+
+import pytest
+
+import diskstore
+import warm
+import workers
+from reports import ALL
+
+
+@pytest.fixture
+def puts(tmp_path, monkeypatch):
+    """Keys written to an empty store, counted per key."""
+    monkeypatch.setattr(diskstore, "DIR", str(tmp_path / "store"))
+    monkeypatch.setattr(diskstore, "_private", None)
+    monkeypatch.setattr(workers, "MAX_WORKERS", 1)
+    counts = Counter()
+    put = diskstore.put
+
+    def counting_put(key, value):
+        counts[diskstore.digest(key)] += 1
+        return put(key, value)
+
+    monkeypatch.setattr(diskstore, "put", counting_put)
+    return counts
+
+
+@pytest.mark.parametrize("continent", [ALL, "Europe"])
+def test_every_entry_is_written_once(puts, continent):
+    states, stored, _ = warm.warm("Safety Value", continent, (5,))
+    assert all(warmed == tried for warmed, tried in states.values())
+    assert puts and max(puts.values()) == 1
+    assert stored == diskstore.total_bytes()
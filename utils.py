@@ -68,4 +68,57 @@ def custom_navigation():
         <a href="?page=TopvBottom" class="nav-button {'active' if current_page == 'TopvBottom' else ''}" aria-label="Top vs Bottom"><i class="fas fa-sort-amount-up"></i> Top vs Bottom</a>
         <a href="?page=GlobalMetrics" class="nav-button {'active' if current_page == 'GlobalMetrics' else ''}" aria-label="Global Metrics"><i class="fas fa-chart-line"></i> Global Metrics</a>
     </div>
-    """, unsafe_allow_html=True)
\ No newline at end of file
+    """, unsafe_allow_html=True)
+
+
+def export_buttons(build, file_stem):
+    """Download buttons for the table ``build()`` returns, one per export format.
+
+    ``build`` runs only when a button is clicked, on Streamlit's download
+    thread, so the export costs nothing on ordinary reruns.
+    """
+    import exports
+
+    columns = st.columns(len(exports.FORMATS))
+    for column, (fmt, (extension, mime)) in zip(columns, exports.FORMATS.items()):
+        column.download_button(
+            label=f"Download data as {fmt}",
+            data=lambda fmt=fmt: exports.export(build(), fmt),
+            file_name=f"{file_stem}.{extension}",
+            mime=mime,
+            on_click="ignore",
+        )
+
+
+def scenario_controls(continents):
+    """Sidebar editor for the what-if scenario; returns the active adjustments.
+
+    The scenario lives in session state, so it survives reruns of the page.
+    """
+    import simulator  # deferred so pages without the editor don't load numpy here
+
+    scenario = st.session_state.setdefault("_scenario", [])
+
+    def add_adjustment():
+        scenario.append((
+            st.session_state["scenario_indicator"],
+            tuple(st.session_state["scenario_continents"]),
+            st.session_state["scenario_percent"],
+        ))
+
+    with st.sidebar.expander("🧪 What-if Scenario", expanded=bool(scenario)):
+        st.selectbox(
+            "Indicator to change", list(simulator.COEFFICIENTS),
+            format_func=lambda col: col.replace(" Value", ""), key="scenario_indicator"
+        )
+        st.multiselect("In continents", continents, default=continents, key="scenario_continents")
+        st.slider("Change (%)", -50, 50, 0, step=5, key="scenario_percent")
+        st.button(
+            "Add to scenario", on_click=add_adjustment,
+            disabled=not st.session_state["scenario_continents"] or st.session_state["scenario_percent"] == 0
+        )
+        for adjustment in scenario:
+            st.markdown(f"- {simulator.describe(adjustment)}")
+        if scenario:
+            st.button("Clear scenario", on_click=scenario.clear)
+    return list(scenario)
@@ -0,0 +1,139 @@
+"""Deploy-time cache warming: build every page's default views ahead of the first visitor.
+
+The state space a visitor can reach without touching the finer controls is
+small and finite. It covers each numeric indicator (every entry of the pages'
+indicator groups) for all continents together and for each single
+continent. For each of these states this builds:
+
+* WorldMap: the indicator map with the value filter untouched;
+* GlobalMetrics: the Global View bar, sunburst and continent averages, or
+  the Single Continent View scatter, sunburst and country values;
+* TopvBottom: the top and bottom rank stability at the default k values.
+
+Robust mode, scenarios and the value sliders start switched off, so they
+are not warmed. States are built in parallel on the shared process pool,
+one task per (indicator, continent). Each worker writes what it builds
+straight into ``diskstore``, where every server process on the host finds
+it on its first miss. Store keys include a fingerprint of the code, so
+run this after every deploy, not only when the data changes.
+
+    python warm.py [--k 5] [--workers 4] [--indicators ...]
+
+Prints the coverage per page and the time taken. A state that fails to
+build is reported and skipped; the page builds it on demand as before.
+"""
+import argparse
+import multiprocessing
+import sys
+import time
+
+import data
+import diskstore
+import figcache
+import filters
+import workers
+from reports import ALL, COLOR_SCALES
+
+DEFAULT_KS = (5,)  # TopvBottom's "Number of Countries" slider starts at 5
+PAGES = ("WorldMap", "GlobalMetrics", "TopvBottom")
+
+
+def warm(indicator, continent, ks):
+    """Build every cached view of one (indicator, continent); runs in a worker process.
+
+    Returns ``(states, stored, seconds)``: per page, how many states were
+    warmed out of how many tried, and the bytes written to the store.
+    """
+    # Page modules are imported here so the parent process only needs the data layer
+    import GlobalMetrics
+    import WorldMap
+    import stability
+
+    if multiprocessing.parent_process() is not None:
+        workers.MAX_WORKERS = 1  # already on a pool worker: run the stability draws inline
+
+    start = time.perf_counter()
+    snapshot = data.get_snapshot()
+    continents = sorted(filters.get_index(snapshot).levels["continent"]) if continent == ALL else [continent]
+    title = indicator.title()
+    states = {page: [0, 0] for page in PAGES}
+
+    def keep(page, builds):
+        # One state per call: it counts as warmed only if every view in it built.
+        # Each build writes its own result through to the store, as on the page.
+        states[page][1] += 1
+        try:
+            for build in builds():
+                build()
+        except Exception as exc:
+            print(f"{page} {indicator} / {continent} failed: {exc}", file=sys.stderr)
+            return
+        states[page][0] += 1
+
+    def charts(pairs):
+        return [lambda key=key, build=build: figcache.get_or_build(key, build) for key, build in pairs]
+
+    written = diskstore.written_bytes()
+    keep("WorldMap", lambda: charts([
+        WorldMap.indicator_map_task(snapshot, indicator, continents, False, True, COLOR_SCALES)
+    ]))
+    if continent == ALL:
+        keep("GlobalMetrics", lambda: [lambda: GlobalMetrics.global_view(snapshot, title, continents)]
+             + charts(GlobalMetrics.global_charts(snapshot, title, continents, False, COLOR_SCALES)))
+    else:
+        keep("GlobalMetrics", lambda: [lambda: GlobalMetrics.continent_view(snapshot, title, continent)]
+             + charts(GlobalMetrics.continent_charts(snapshot, title, continent, False, COLOR_SCALES)))
+    for k in ks:
+        for largest in (True, False):
+            selected = None if continent == ALL else continent
+            keep("TopvBottom", lambda: [
+                lambda: stability.get_stability(indicator, selected, k, largest, snapshot=snapshot)
+            ])
+    return states, diskstore.written_bytes() - written, time.perf_counter() - start
+
+
+def warm_all(ks=DEFAULT_KS, indicators=None):
+    """Warm every state into the store; returns a summary dict."""
+    # Ingest (or open) the cached dataset once here; workers then only map the files
+    snapshot = data.get_snapshot()
+    indicators = indicators or snapshot.numeric_columns
+    continents = [ALL] + sorted(filters.get_index(snapshot).levels["continent"])
+
+    start = time.perf_counter()
+    results = workers.map_chunks(
+        warm, [(indicator, continent, tuple(ks)) for indicator in indicators for continent in continents]
+    )
+    coverage = {page: [0, 0] for page in PAGES}
+    for states, _, _ in results:
+        for page, (warmed, tried) in states.items():
+            coverage[page][0] += warmed
+            coverage[page][1] += tried
+    diskstore.sweep()
+    return {
+        "version": snapshot.version,
+        "stored": sum(stored for _, stored, _ in results),
+        "store": diskstore.total_bytes(),
+        "coverage": coverage,
+        "seconds": time.perf_counter() - start,
+        "busy": sum(seconds for _, _, seconds in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute every page's default views into the warm pack.")
+    parser.add_argument("--k", type=int, nargs="+", default=list(DEFAULT_KS), help="TopvBottom k values to warm")
+    parser.add_argument("--workers", type=int, default=workers.MAX_WORKERS, help="Worker processes")
+    parser.add_argument("--indicators", nargs="*", default=None, help="Only these indicators (default: all)")
+    args = parser.parse_args()
+
+    workers.MAX_WORKERS = args.workers  # read when the pool starts
+    summary = warm_all(args.k, args.indicators)
+    for page, (warmed, tried) in summary["coverage"].items():
+        print(f"{page:<14} {warmed:>4}/{tried:<4} states ({warmed / max(tried, 1):.0%})")
+    print(f"Stored {summary['stored'] / 1e6:.1f} MB for version {summary['version']} in {diskstore.DIR} "
+          f"({summary['store'] / 1e6:.1f} MB in use) in {summary['seconds']:.1f}s with {args.workers} worker(s) "
+          f"({summary['busy']:.1f}s of building)")
+
+
+if __name__ == "__main__":
+    main()
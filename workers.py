@@ -0,0 +1,59 @@
+"""Shared process pool for CPU-heavy analytics (bootstraps, simulations).
+
+Workers are started with the ``spawn`` method: the Streamlit server is
+multi-threaded, and forking a threaded process can deadlock the child.
+Task functions must therefore live at module level in an importable module.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+MAX_WORKERS = int(os.environ.get("QOL_WORKERS", str(os.cpu_count() or 1)))
+
+_lock = threading.Lock()
+_pool = None
+
+
+def get_pool():
+    """Return the process-wide pool, starting it on first use."""
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=MAX_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def map_chunks(fn, chunks):
+    """Run ``fn(*chunk)`` for every chunk on the pool and return results in order.
+
+    Falls back to running in-process when only one worker is configured or
+    the pool cannot be used (e.g. a worker died).
+    """
+    chunks = list(chunks)
+    if MAX_WORKERS <= 1 or len(chunks) <= 1:
+        return [fn(*chunk) for chunk in chunks]
+    try:
+        futures = [get_pool().submit(fn, *chunk) for chunk in chunks]
+        return [future.result() for future in futures]
+    except BrokenProcessPool:
+        _reset_pool()
+        return [fn(*chunk) for chunk in chunks]
+
+
+def split(total, parts):
+    """Split ``total`` work items into at most ``parts`` near-equal counts."""
+    parts = max(1, min(parts, total))
+    base, extra = divmod(total, parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]